@@ -1,42 +1,69 @@
 # This file includes the definitions of the Node classes to build the AST tree.
 # The initial grammar program -> declarations stmt_block can be split into two individual parts:
-# 1. The declarations part is handled mid-parsing, in the parser file we build the symbol_table that includes a
-# dictionary with all the identifiers and their type.
-# 2. the stmt_block part is handled after the parsing step is complete, we use code_gen functions to generate the quad
-# code while also doing semantic analysis for the identifiers.
-from sys import stderr
+# 1. The declarations part is handled by the semantic analysis (semantic.py) before code gen, it fills the
+# symbol_table of the session with a dictionary of all the identifiers and their type.
+# 2. the stmt_block part is checked by the semantic analysis too, which gives every expression its type (exp_type)
+# and every assignment and input the type of its identifier (id_type). after that we use code_gen functions to
+# generate the quad code from those annotations.
+# Every code_gen function receives the session, which owns the symbol_table, the temp / label counters and the emitter.
+# code_gen appends the instructions of the node to session.emitter, the code_gen of an expression returns the place
+# (identifier, temp or number) that holds its result.
+# Boolean expressions only decide where to jump, so instead of code_gen they have jump_code_gen(session, label_true,
+# label_false): exactly one of the labels is given and the code jumps there, or falls through to the next
+# instruction when the expression has the other value. if / while branch directly on the relops without
+# computing 0 / 1 temps.
+# To handle very deep trees without Python recursion, a code_gen that has children is a generator: it yields the
+# code_gen of a child and gets the child's result back from run_iteratively (header.py), which keeps the pending
+# nodes on an explicit stack.
+# The tree has a node only where the program has something to compute: the parser doesn't wrap a statement in a
+# statement node, a block is its StmtListNode, and an expression without an addop is its term (a term without a mulop
+# is its factor). Every node has __slots__, large programs have millions of them.
 from header import *
+from quad_ir import *
 
 
 class ProgramNode:
+    __slots__ = ('declarations', 'stmt_block')
+
     def __init__(self, declarations, stmt_block):
         self.declarations = declarations
         self.stmt_block = stmt_block
 
-    def code_gen(self):
-        return self.stmt_block.code_gen() + "HALT\n"
+    def code_gen(self, session):
+        yield self.stmt_block.code_gen(session)
+        session.emitter.emit(HALT)
 
 
 class DeclarationsNode:
+    __slots__ = ('declarations',)
+
     def __init__(self):
         self.declarations = []
 
     def add_declaration(self, declaration):
         self.declarations.append(declaration)
 
+    def build_symbol_table(self, session):
+        symbol_table = session.symbol_table
+        for declaration in self.declarations:
+            for variable in declaration.idList.ids:
+                if variable in symbol_table:
+                    session.report_error(f"Semantic Error: Identifier {variable} was already declared.")
+                symbol_table[variable] = declaration.idtype
 
+
+# idtype is "int" or "float"
 class DeclarationNode:
+    __slots__ = ('idList', 'idtype')
+
     def __init__(self, idlist, idtype):
         self.idList = idlist
         self.idtype = idtype
 
 
-class TypeNode:
-    def __init__(self, idtype):
-        self.idtype = idtype
-
-
 class IdListNode:
+    __slots__ = ('ids',)
+
     def __init__(self):
         self.ids = []
 
@@ -44,407 +71,336 @@ class IdListNode:
         self.ids.append(identifier)
 
 
-class StmtNode:
-    def __init__(self, stmt):
-        self.stmt = stmt
-
-    def code_gen(self):
-        return self.stmt.code_gen()
-
-
+# id_type is the type of the identifier, set by the semantic analysis
 class AssignmentStmtNode:
+    __slots__ = ('identifier', 'expression', 'id_type')
+
     def __init__(self, identifier, expression):
         self.identifier = identifier
         self.expression = expression
-
-    def code_gen(self):
-        if self.identifier in symbol_table:
-            if isinstance(self.expression, ExpressionNode):
-                self.expression.parent_id = self.identifier
-            expression_type = symbol_table[self.identifier]
-            expression_code = self.expression.code_gen()
-            # If the parent id was used by the son , it means that the expression had addop , mulop or was a cast
-            if not self.expression.parent_id_used:
-                return f'{"RASN" if expression_type == "float" else "IASN"} {self.identifier} {expression_code}'
-            else:
-                return expression_code
+        self.id_type = None
+
+    def code_gen(self, session):
+        # an addop , a mulop or a cast computes its result straight into the identifier (the parent id),
+        # an identifier or a number is assigned with ASN
+        if isinstance(self.expression, FactorNode):
+            result = yield self.expression.code_gen(session)
+            session.emitter.emit(typed_opcode("ASN", self.id_type), self.identifier, result)
         else:
-            stderr.write(f"Semantic Error, Identifier {self.identifier} wasn't defined.")
+            self.expression.parent_id = self.identifier
+            yield self.expression.code_gen(session)
 
 
 class InputStmtNode:
+    __slots__ = ('identifier', 'id_type')
+
     def __init__(self, identifier):
         self.identifier = identifier
+        self.id_type = None
 
-    def code_gen(self):
-        if self.identifier in symbol_table:
-            if symbol_table[self.identifier] == "float":
-                return f"RINP {self.identifier}"
-            else:
-                return f"IINP {self.identifier}"
-        else:
-            stderr.write(f"Semantic Error, Identifier {self.identifier} wasn't defined.")
+    def code_gen(self, session):
+        session.emitter.emit(RINP if self.id_type == "float" else IINP, self.identifier)
 
 
 class OutputStmtNode:
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
-    def code_gen(self):
-        expression_code = self.expression.code_gen()
-        exp_type = self.expression.exp_type
-        # If the expression had a temp it means that the expression had more than 2 operations
-        # and it used temp while converting the code to the quad language
-        if self.expression.temp is not None:
-            return f'{expression_code}\n {"R" if exp_type == "float" else "I"}PRT {self.expression.temp}'
-        else:
-            return f'{"R" if exp_type == "float" else "I"}PRT {self.expression.code_gen()}'
+    def code_gen(self, session):
+        result = yield self.expression.code_gen(session)
+        session.emitter.emit(typed_opcode("PRT", self.expression.exp_type), src1=result)
 
 
 class IfStmtNode:
+    __slots__ = ('boolexpr', 'true_stmt', 'false_stmt')
+
     def __init__(self, boolexpr, true_stmt, false_stmt):
         self.boolexpr = boolexpr
         self.true_stmt = true_stmt
         self.false_stmt = false_stmt
 
-    def code_gen(self):
-        boolexpr_code = self.boolexpr.code_gen()
-        true_stmt_code = self.true_stmt.code_gen()
-        false_stmt_code = self.false_stmt.code_gen()
-        label_false = gen_label()
-        label_exit = gen_label()
-        # Replace the labels we jump to if the statement is not
-        if (type(self.boolexpr)) == NotExprNode:
-            return (f"{boolexpr_code}\nJMPZ {label_false} {self.boolexpr.temp}\n"
-                f"{false_stmt_code}\nJUMP {label_exit}\n{label_false}:\n{true_stmt_code:}\n{label_exit}:")
-        else:
-            return (f"{boolexpr_code}\nJMPZ {label_false} {self.boolexpr.temp}\n"
-                    f"{true_stmt_code}\nJUMP {label_exit}\n{label_false}:\n{false_stmt_code:}\n{label_exit}:")
+    def code_gen(self, session):
+        emitter = session.emitter
+        label_false = session.gen_label()
+        label_exit = session.gen_label()
+        # The condition falls through to the true statement and jumps to label_false when it's false
+        yield self.boolexpr.jump_code_gen(session, None, label_false)
+        yield self.true_stmt.code_gen(session)
+        emitter.emit(JUMP, label=label_exit)
+        emitter.label(label_false)
+        yield self.false_stmt.code_gen(session)
+        emitter.label(label_exit)
 
 
 class WhileStmtNode:
+    __slots__ = ('boolexpr', 'stmt')
+
     def __init__(self, boolexpr, stmt):
         self.boolexpr = boolexpr
         self.stmt = stmt
 
-    def code_gen(self):
-        label_entry = gen_label()
-        label_exit = gen_label()
-        boolexpr_code = self.boolexpr.code_gen()
-        stmt_code = self.stmt.code_gen()
-        # Returns the while code while matching the labels at the right place according to the boolean expression
-        return f"{label_entry}:\n{boolexpr_code}\nJMPZ {label_exit} {self.boolexpr.temp} \n{stmt_code}JUMP {label_entry}\n{label_exit}:"
-
-
-class StmtBlockNode:
-    def __init__(self, stmtlist):
-        self.stmtlist = stmtlist
-
-    def code_gen(self):
-        return self.stmtlist.code_gen()
+    def code_gen(self, session):
+        emitter = session.emitter
+        label_entry = session.gen_label()
+        label_exit = session.gen_label()
+        # The condition is checked at the entry label, while it's false we jump to the exit label
+        emitter.label(label_entry)
+        yield self.boolexpr.jump_code_gen(session, None, label_exit)
+        yield self.stmt.code_gen(session)
+        emitter.emit(JUMP, label=label_entry)
+        emitter.label(label_exit)
 
 
 class StmtListNode:
+    __slots__ = ('stmts',)
+
     def __init__(self):
         self.stmts = []
 
     def add_stmt(self, stmt):
         self.stmts.append(stmt)
 
-    def code_gen(self):
-        stmts_code = ""
+    def code_gen(self, session):
         for stmt in self.stmts:
-            stmts_code += stmt.code_gen() + "\n"
-        return stmts_code
+            yield stmt.code_gen(session)
+
+
+# A boolean expression whose value is already known, created by constant folding (constant_folding.py)
+class BoolConstantNode:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def jump_code_gen(self, session, label_true, label_false):
+        if self.value and label_true is not None:
+            session.emitter.emit(JUMP, label=label_true)
+        elif not self.value and label_false is not None:
+            session.emitter.emit(JUMP, label=label_false)
 
 
 class OrExprNode:
-    def __init__(self, boolterm1, boolterm2=None, temp=None):
+    __slots__ = ('boolterm1', 'boolterm2')
+
+    def __init__(self, boolterm1, boolterm2=None):
         self.boolterm1 = boolterm1
         self.boolterm2 = boolterm2
-        self.temp = temp
-
-    def code_gen(self):
-        boolterm1_code = self.boolterm1.code_gen()
-        if self.boolterm2 is not None:
-            boolterm2_code = self.boolterm2.code_gen()
-            boolterm1_temp = self.boolterm1.temp
-            boolterm2_temp = self.boolterm2.temp
-            self.temp = gen_temp()
-            label_or = gen_label()
-            label_assign_true = gen_label()
-            label_assign_false = gen_label()
-            label_exit = gen_label()
-            # Add labels to jump between the booleans expression in the following way:
-            # if the first expression is true it jumps to the "True" part. Otherwise,
-            # it jumps to the second boolean expression . if the second expression is true
-            # it jumps to the "True" part but otherwise it skips goes false
-            return (
-                f"{boolterm1_code}\nJMPZ {label_or} {boolterm1_temp}\nJMP {label_assign_true}\n{label_or}:\n"
-                f"{boolterm2_code}\nJMPZ {label_assign_false} {boolterm2_temp}\n{label_assign_true}:\nIASN "
-                f"{self.temp} 1\nJMP {label_exit}\n{label_assign_false}:\nIASN {self.temp} 0 \n{label_exit}:")
-        # if there's no boolterm2 the rule was '''boolexpr : boolterm'''
+
+    def jump_code_gen(self, session, label_true, label_false):
+        # a || b || c is a chain of OrExprNodes on the left side, it's walked with a loop instead of recursion
+        chain = left_chain(self, OrExprNode, 'boolterm1')
+        boolterms = [chain[-1].boolterm1] + [node.boolterm2 for node in reversed(chain) if node.boolterm2 is not None]
+        # if any of the boolterms is true the whole expression is true, so every boolterm but the last one jumps to
+        # the "True" part when it's true. when the "True" part is right after the expression it gets a new label
+        label_end = None
+        if label_true is None:
+            label_end = label_true = session.gen_label()
+        for boolterm in boolterms[:-1]:
+            yield boolterm.jump_code_gen(session, label_true, None)
+        # the last boolterm decides the value of the expression
+        if label_end is None:
+            yield boolterms[-1].jump_code_gen(session, label_true, None)
         else:
-            self.temp = self.boolterm1.temp
-            return boolterm1_code
+            yield boolterms[-1].jump_code_gen(session, None, label_false)
+            session.emitter.label(label_end)
 
 
 class AndExprNode:
-    def __init__(self, boolfactor1, boolfactor2=None, temp=None):
+    __slots__ = ('boolfactor1', 'boolfactor2')
+
+    def __init__(self, boolfactor1, boolfactor2=None):
         self.boolfactor1 = boolfactor1
         self.boolfactor2 = boolfactor2
-        self.temp = temp
-
-    def code_gen(self):
-        boolfactor1_code = self.boolfactor1.code_gen()
-        if self.boolfactor2 is not None:
-            boolfactor2_code = self.boolfactor2.code_gen()
-            boolfactor1_temp = self.boolfactor1.temp
-            boolfactor2_temp = self.boolfactor2.temp
-            self.temp = gen_temp()
-            label_false = gen_label()
-            label_skip_false = gen_label()
-            # Add labels to jump between the booleans expression in the following way:
-            # if the first expression is true it jumps to the second boolean expression to check it. Otherwise,
-            # it jumps to "False" part . if the second expression is true it continues to the "True" part ,
-            # after that it jumps to skip the "False" part. Otherwise, it jumps straight to the "False" part.
-            return (f"{boolfactor1_code}\nJMPZ {label_false} {boolfactor1_temp}\n{boolfactor2_code}\nJMPZ {label_false} {boolfactor2_temp}\n"
-                    f"IASN {self.temp} 1 \nJUMP {label_skip_false}\n{label_false}:\nIASN {self.temp} 0\n{label_skip_false}:")
-        # if there's no boolterm2 the rule was '''boolterm : boolfactor''''''
+
+    def jump_code_gen(self, session, label_true, label_false):
+        # a && b && c is a chain of AndExprNodes on the left side, it's walked with a loop instead of recursion
+        chain = left_chain(self, AndExprNode, 'boolfactor1')
+        boolfactors = ([chain[-1].boolfactor1] +
+                       [node.boolfactor2 for node in reversed(chain) if node.boolfactor2 is not None])
+        # if any of the boolfactors is false the whole expression is false, so every boolfactor but the last one
+        # jumps to the "False" part when it's false. when the "False" part is right after the expression it gets
+        # a new label
+        label_end = None
+        if label_false is None:
+            label_end = label_false = session.gen_label()
+        for boolfactor in boolfactors[:-1]:
+            yield boolfactor.jump_code_gen(session, None, label_false)
+        # the last boolfactor decides the value of the expression
+        if label_end is None:
+            yield boolfactors[-1].jump_code_gen(session, None, label_false)
         else:
-            self.temp = self.boolfactor1.temp
-            return boolfactor1_code
+            yield boolfactors[-1].jump_code_gen(session, label_true, None)
+            session.emitter.label(label_end)
 
 
 class NotExprNode:
-    def __init__(self, boolexpr, temp=None):
+    __slots__ = ('boolexpr',)
+
+    def __init__(self, boolexpr):
         self.boolexpr = boolexpr
-        self.temp = temp
 
-    def code_gen(self):
-        # Stimulates not expression in the boolexpr node by replacing the location of the labels
-        boolexpr_code = self.boolexpr.code_gen()
-        self.temp = self.boolexpr.temp
-        return boolexpr_code
+    def jump_code_gen(self, session, label_true, label_false):
+        # Stimulates the not expression by swapping the labels we jump to
+        return self.boolexpr.jump_code_gen(session, label_false, label_true)
 
 
 class RelExprNode:
-    def __init__(self, expression1, relop, expression2, temp=None, exp_type=None ):
+    __slots__ = ('expression1', 'relop', 'expression2', 'exp_type')
+
+    def __init__(self, expression1, relop, expression2, exp_type=None):
         self.expression1 = expression1
         self.relop = relop
         self.expression2 = expression2
-        self.temp = temp
         self.exp_type = exp_type
 
-    def code_gen(self):
-        expression1_code = self.expression1.code_gen()
-        expression2_code = self.expression2.code_gen()
-        self.temp = gen_temp()
-        self.exp_type = get_expression_type(self.expression1.exp_type, self.expression2.exp_type)
-        if self.relop == '==' or self.relop == '<' or self.relop == '>' or self.relop == '!=':
-            relop_code = self.handle_relop_with_one_operations(expression1_code, expression2_code,
-                                    self.expression1.temp, self.expression2.temp, self.relop, self.temp, self.exp_type)
-        # relop is >= or <=
-        else:
-            relop_code = self.handle_relop_with_two_operations(expression1_code, expression2_code,
-                                                    self.expression1.temp, self.expression2.temp, self.relop, self.temp, self.exp_type)
-        return relop_code
-
-    # Handles the relops < , > , == , !=
-    @staticmethod
-    def handle_relop_with_one_operations(expression1_code, expression2_code, expression1_temp, expression2_temp, relop, temp, exp_type):
-        temp_string = "R" if exp_type == 'float' else "I"
-        if relop == '<':
-            temp_string += f"LSS {temp}"
-        elif relop == '>':
-            temp_string += f"GRT {temp}"
-        elif relop == '==':
-            temp_string += f"EQL {temp}"
-        else:
-            temp_string += f"NQL {temp}"
-        # creates the matching output according to the expressions results
-        # if the expression created temps it used those temps with the relop operation
-        if expression1_temp is not None and expression2_temp is not None:
-            return f"{expression1_code} \n{temp_string} {expression1_temp} {expression2_temp} \n{expression2_code}"
-        elif expression1_temp is not None:
-            return f"{expression1_code}\n{temp_string} {expression1_temp} {expression2_code}"
-        elif expression2_temp is not None:
-            return f"{temp_string} {expression1_code} {expression2_temp} \n{expression2_code}"
+    def jump_code_gen(self, session, label_true, label_false):
+        emitter = session.emitter
+        expression1_result = yield self.expression1.code_gen(session)
+        expression2_result = yield self.expression2.code_gen(session)
+        # JMPZ jumps when its operand is 0. to jump to label_false we compute the relop itself,
+        # to jump to label_true we compute the opposite relop
+        if label_false is not None:
+            relop = self.relop
+            label = label_false
         else:
-            return f"{temp_string} {expression1_code} {expression2_code}"
-
-    # Handles the relops <= , >=
-    @staticmethod
-    def handle_relop_with_two_operations(expression1_code, expression2_code, expression1_temp, expression2_temp, relop, temp, exp_type):
-        boolexp1_code = RelExprNode.handle_relop_with_one_operations(expression1_code, expression2_code, expression1_temp,
-                                                    expression2_temp, "=", temp, exp_type)
-        if relop == "<=":
-            boolexp2_code = RelExprNode.handle_relop_with_one_operations(expression1_code, expression2_code, expression1_temp, expression2_temp, "<", temp, exp_type)
+            relop = RelExprNode.NEGATED_RELOPS[self.relop]
+            label = label_true
+        temp = session.gen_temp()
+        if relop in RelExprNode.ONE_OPERATION_RELOPS:
+            emitter.emit(typed_opcode(RelExprNode.ONE_OPERATION_RELOPS[relop], self.exp_type), temp,
+                         expression1_result, expression2_result)
+        # relop is >= or <=. a <= b is computed as not (a > b) and a >= b as not (a < b),
+        # so every operand is computed once
         else:
-            boolexp2_code = RelExprNode.handle_relop_with_one_operations(expression1_code, expression2_code, expression1_temp, expression2_temp, ">", temp, exp_type)
-        label_or = gen_label()
-        label_assign_true = gen_label()
-        label_assign_false = gen_label()
-        label_exit = gen_label()
-        # Stimulates a boolean expression, for example , a <= b as a < b and a = b.
-        # It does that by using jumps the same way as we did in the "And" boolean expression
-        return (
-            f"{boolexp1_code}\nJMPZ {label_or}\n{boolexp1_code}\nJMP {label_assign_true}\n{label_or}:\n"
-            f"{boolexp2_code}\nJMPZ {label_assign_false}\n{boolexp2_code}\n{label_assign_true}:\nIASN "
-            f"{temp} 1\nJMP {label_exit}\n{label_assign_false}:\nIASN {temp} 0 \n{label_exit}:")
+            opposite_temp = temp
+            temp = session.gen_temp()
+            emitter.emit(typed_opcode(RelExprNode.OPPOSITE_RELOPS[relop], self.exp_type), opposite_temp,
+                         expression1_result, expression2_result)
+            emitter.emit(IEQL, temp, opposite_temp, 0)
+        emitter.emit(JMPZ, src1=temp, label=label)
 
+    # The relops that have a matching QUAD instruction
+    ONE_OPERATION_RELOPS = {'<': 'LSS', '>': 'GRT', '==': 'EQL', '!=': 'NQL'}
+    # The instruction whose opposite is the relop <= or >=
+    OPPOSITE_RELOPS = {'<=': 'GRT', '>=': 'LSS'}
+    NEGATED_RELOPS = {'<': '>=', '>': '<=', '==': '!=', '!=': '==', '<=': '>', '>=': '<'}
 
+
+# left addop right, a chain of them on the left side is a + b - c ...
 class ExpressionNode:
-    def __init__(self, left, addop=None, right=None, temp=None, exp_type=None, parent_id = None, parent_id_used = None):
+    __slots__ = ('left', 'addop', 'right', 'exp_type', 'parent_id')
+
+    def __init__(self, left, addop, right):
         self.left = left
         self.addop = addop
         self.right = right
-        self.temp = temp
-        self.exp_type = exp_type
-        self.parent_id = parent_id
-        self.parent_id_used = False
-
-    def code_gen(self):
-        if self.addop is not None:
-            left_code = self.left.code_gen()
-            right_code = self.right.code_gen()
-            self.exp_type = get_expression_type(self.left.exp_type, self.right.exp_type)
-            temp_string = "R" if self.exp_type == 'float' else "I"
-            temp_string = (temp_string+"ADD" if self.addop == '+' else temp_string+"SUB")
-            # if there's no parent_id it means the expression didn't come from an assignment node
-            if self.parent_id is None:
-                self.temp = gen_temp()
-                temp_string = temp_string + f" {self.temp}"
-            # set the parent_id_used to True so we know the assignment operation was addop
-            else:
-                temp_string = temp_string + f" {self.parent_id}"
-                self.parent_id_used = True
-            # creates the code depending on the temps created from left and right expression
-            if self.left.temp is not None and self.right.temp is not None:
-                return f"{left_code}\n{right_code}\n{temp_string} {self.left.temp} {self.right.temp}"
-            elif self.left.temp is not None:
-                return f"{left_code}\n{temp_string} {self.left.temp} {right_code}"
-            elif self.right.temp is not None:
-                return f"{temp_string} {left_code} {self.right.temp}\n{right_code}"
-            else:
-                return f"{temp_string} {left_code} {right_code}"
-        # if there's no addop the used rule was '''expression : term'''
-        else:
-            self.left.parent_id = self.parent_id
-            left_code = self.left.code_gen()
-            self.temp = self.left.temp
-            self.exp_type = self.left.exp_type
-            self.parent_id_used = self.left.parent_id_used
-            return left_code
-
-
+        self.exp_type = None
+        # the identifier the expression is assigned to, if it is the whole right side of an assignment
+        self.parent_id = None
+
+    def code_gen(self, session):
+        # a + b - c ... is a chain of ExpressionNodes on the left side, it's walked with a loop instead of
+        # recursion so long expressions don't need a Python frame for every operand
+        chain = left_chain(self, ExpressionNode, 'left')
+        left_result = yield chain[-1].left.code_gen(session)
+        for node in reversed(chain):
+            left_result = yield from node.gen_addop(session, left_result)
+        return left_result
+
+    def gen_addop(self, session, left_result):
+        right_result = yield self.right.code_gen(session)
+        opcode = typed_opcode("ADD" if self.addop == '+' else "SUB", self.exp_type)
+        # if there's no parent_id it means the expression didn't come from an assignment node
+        result = self.parent_id if self.parent_id is not None else session.gen_temp()
+        session.emitter.emit(opcode, result, left_result, right_result)
+        return result
+
+
+# left mulop right, walked like ExpressionNode
 class TermNode:
-    def __init__(self, left, mulop=None, right=None, temp=None, exp_type=None, parent_id = None, parent_id_used = None ):
+    __slots__ = ('left', 'mulop', 'right', 'exp_type', 'parent_id')
+
+    def __init__(self, left, mulop, right):
         self.left = left
         self.mulop = mulop
         self.right = right
-        self.temp = temp
-        self.exp_type = exp_type
-        self.parent_id = parent_id
-        self.parent_id_used = False
-
-    def code_gen(self):
-        if self.mulop is not None:
-            left_code = self.left.code_gen()
-            right_code = self.right.code_gen()
-            self.exp_type = get_expression_type(self.left.exp_type,self.right.exp_type)
-            temp_string = "R" if self.exp_type == 'float' else "I"
-            temp_string = (temp_string + "MLT" if self.mulop == '*' else temp_string + "DIV")
-            # if there's no parent_id it means the expression didn't come from an assignment node
-            if self.parent_id is None:
-                self.temp = gen_temp()
-                temp_string = temp_string + f" {self.temp}"
-            # set the parent_id_used to True so we know the assignment operation was mulop
-            else:
-                temp_string = temp_string + f" {self.parent_id}"
-                self.parent_id_used = True
-            # creates the code depending on the temps created from left and right expression
-            if self.left.temp is not None and self.right.temp is not None:
-                return f"{left_code} \n{right_code}\n{temp_string} {self.left.temp} {self.right.temp}"
-            elif self.left.temp is not None:
-                return f"{left_code}\n {temp_string} {self.left.temp} {right_code}"
-            elif self.right.temp is not None:
-                return f"{temp_string} {left_code} {self.right.temp} \n{right_code}"
-            else:
-                return f"{temp_string} {left_code} {right_code}"
-        # if there's no mulop the used rule was '''term : factor'''
-        else:
-            # checks if the son is a cast to pass the parent id. also,cast always uses the parent id
-            # so it sets the variable to true
-            if isinstance(self.left,CastFloatExpressionNode) or isinstance(self.left,CastIntExpressionNode):
-                self.left.parent_id = self.parent_id
-                self.parent_id_used = True
-            left_code = self.left.code_gen()
-            self.temp = self.left.temp
-            self.exp_type = self.left.exp_type
-            return left_code
-
-
+        self.exp_type = None
+        self.parent_id = None
+
+    def code_gen(self, session):
+        chain = left_chain(self, TermNode, 'left')
+        left_result = yield chain[-1].left.code_gen(session)
+        for node in reversed(chain):
+            left_result = yield from node.gen_mulop(session, left_result)
+        return left_result
+
+    def gen_mulop(self, session, left_result):
+        right_result = yield self.right.code_gen(session)
+        opcode = typed_opcode("MLT" if self.mulop == '*' else "DIV", self.exp_type)
+        # if there's no parent_id it means the expression didn't come from an assignment node
+        result = self.parent_id if self.parent_id is not None else session.gen_temp()
+        session.emitter.emit(opcode, result, left_result, right_result)
+        return result
+
+
+# attribute is an identifier or a number. a number has its type from the start, the type of an identifier is set by
+# the semantic analysis
 class FactorNode:
+    __slots__ = ('attribute', 'exp_type')
+
     def __init__(self, attribute, exp_type=None):
         self.attribute = attribute
-        self.temp = None
+        if exp_type is None and not isinstance(attribute, str):
+            exp_type = "float" if isinstance(attribute, float) else "int"
         self.exp_type = exp_type
 
-    def code_gen(self):
-        # sets the type of the expression to integer or float according to the attribute.
-        # uses the expression type to know what code output to use in the quad language
-        self.exp_type = self.is_integer_or_float(self.attribute)
-        return f"{self.attribute}"
-
-    @staticmethod
-    def is_integer_or_float(attribute):
-        # checks the type of the attribute
-        if isinstance(attribute, int):
-            return "int"
-        elif isinstance(attribute, float):
-            return "float"
-        else:
-            return symbol_table[attribute]
+    def code_gen(self, session):
+        return self.attribute
 
 
 class CastIntExpressionNode:
-    def __init__(self, expression, temp=None, exp_type=None, parent_id=None):
+    __slots__ = ('expression', 'exp_type', 'parent_id')
+
+    def __init__(self, expression, exp_type=None, parent_id=None):
         self.expression = expression
-        self.temp = temp
         self.exp_type = exp_type
         self.parent_id = parent_id
 
-    def code_gen(self):
-        expression_code = self.expression.code_gen()
-        self.temp = self.expression.temp
-        self.exp_type = "int"
-        # if the expression used temp it will use that temp in the cast output. otherwise,
-        # it means that the expression was an id or number so it will use that.
-        if self.temp is None:
-            temp_code = "RTOI " + self.parent_id + " " + expression_code
-        else:
-            temp_code = expression_code + "\n" + "RTOI " + self.parent_id + " " + self.temp
-        return temp_code
+    def code_gen(self, session):
+        expression_result = yield self.expression.code_gen(session)
+        # the cast is written straight into the assigned identifier, otherwise into a new temp
+        result = self.parent_id if self.parent_id is not None else session.gen_temp()
+        session.emitter.emit(RTOI, result, expression_result)
+        return result
 
 
 class CastFloatExpressionNode:
-    def __init__(self, expression, temp=None, exp_type=None, parent_id=None):
+    __slots__ = ('expression', 'exp_type', 'parent_id')
+
+    def __init__(self, expression, exp_type=None, parent_id=None):
         self.expression = expression
-        self.temp = temp
         self.exp_type = exp_type
         self.parent_id = parent_id
 
-    def code_gen(self):
-        expression_code = self.expression.code_gen()
-        self.temp = self.expression.temp
-        self.exp_type = "float"
-        # if the expression used temp it will use that temp in the cast output. otherwise,
-        # it means that the expression was an id or number so it will use that.
-        if self.temp is None:
-            temp_code = "ITOR " + self.parent_id + " " + expression_code
-        else:
-            temp_code = expression_code + "\n" + "RTOI " + self.parent_id + " " +  self.temp
-        return temp_code
-
-
+    def code_gen(self, session):
+        expression_result = yield self.expression.code_gen(session)
+        # the cast is written straight into the assigned identifier, otherwise into a new temp
+        result = self.parent_id if self.parent_id is not None else session.gen_temp()
+        session.emitter.emit(ITOR, result, expression_result)
+        return result
+
+
+# The number of nodes in a tree, every node that can be reached from root
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif type(node).__module__ == __name__:
+            count += 1
+            stack.extend(getattr(node, name) for name in type(node).__slots__)
+    return count
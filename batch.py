@@ -0,0 +1,162 @@
+# This file implements the batch mode of cpq.py: many .ou files , directories or glob patterns are compiled by a pool
+# of worker processes. Every worker imports the lexer and the parser once and then compiles a fresh
+# CompilationSession per file, so the cost of starting Python and building the PLY tables is paid once per worker
+# instead of once per file.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+import glob
+import json
+import os
+import sys
+
+from compile_stats import CompileStats, publish, total
+from file_io import open_output, open_source, write_binary, write_quad
+
+
+# Expands the command line arguments into a sorted list of .ou files without duplicates.
+# an argument can be a file , a directory (searched recursively) or a glob pattern
+def expand_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', '*.ou'), recursive=True)
+        elif glob.has_magic(path):
+            matches = [match for match in glob.glob(path, recursive=True) if match.endswith('.ou')]
+        else:
+            matches = [path]
+        files.extend(matches)
+    return sorted(set(files))
+
+
+# Compiles a single file and returns (file_path, success, diagnostics, cached, stats), the diagnostics of a file that
+# compiled are the reports that were asked for (CompilationSession.REPORTS). cached is True if the file was taken from
+# the compile cache, False if it was looked up and not found and None without a cache. stats is the
+# CompileStats.as_dict of the file with collect_stats, None without.
+# compile_text(text, optimize, stats) compiles the text of the program (compiler.compile_with_diagnostics by default,
+# the client of the compile server sends it to the server), everything the compiler prints is captured so the output
+# of the workers doesn't get mixed together. with binary the code is written to a .qbc file (quad_binary.py) instead of
+# a .qud file
+def compile_file(file_path, optimize=False, reports=(), cache=None, compile_text=None, collect_stats=False,
+                 binary=False):
+    # tracemalloc is shared by the whole process, the memory isn't traced by the threads that wait for compile_text
+    # (the phases of the compile itself come with their memory from the server)
+    stats = CompileStats(trace_memory=compile_text is None) if collect_stats else None
+    if compile_text is None:
+        from compiler import compile_with_diagnostics
+        compile_text = partial(compile_with_diagnostics, text=False)
+
+    if not file_path.endswith('.ou'):
+        return file_path, False, "The file extension must be .ou", None, None
+    target = file_path[:-3] + ('.qbc' if binary else '.qud')
+
+    def phase(name):
+        return stats.phase(name) if stats is not None else nullcontext()
+
+    def finish(success, diagnostics, cached):
+        if stats is None:
+            return file_path, success, diagnostics, cached, None
+        stats.cached = cached
+        return file_path, success, diagnostics, cached, stats.as_dict()
+
+    cached = None
+    try:
+        # the compiler reads the text from the mapped file
+        with open_source(file_path) as content:
+            if cache is not None:
+                with phase('cache'):
+                    key = cache.key(content, optimize, binary)
+                    cached_reports = cache.fetch(key, target)
+                if cached_reports is not None:
+                    return finish(True, "\n".join(cached_reports[name] for name in reports), True)
+                cached = False
+            result = compile_text(content, optimize, stats=collect_stats)
+    except OSError as error:
+        return finish(False, f"{type(error).__name__}: {error}", cached)
+    if stats is not None and 'stats' in result:
+        stats.merge(result['stats'])
+    diagnostics = result['stdout'] + result['stderr']
+    if result['quad'] is None:
+        return finish(False, f"{diagnostics}\n{result['exception']}", cached)
+    # Syntax and semantic errors are only reported as messages, any message means the file failed
+    if diagnostics:
+        return finish(False, diagnostics, cached)
+    # a file that can't be written fails on its own, the other files of the batch go on
+    try:
+        with phase('write'), open_output(target, binary) as file:
+            (write_binary if binary else write_quad)(file, result['quad'])
+        if cache is not None:
+            cache.store(key, target, result['reports'])
+    except OSError as error:
+        return finish(False, f"{target}: {type(error).__name__}: {error}", cached)
+    return finish(True, "\n".join(result['reports'][name] for name in reports), cached)
+
+
+# Importing the compiler builds the lexer and the parser, done once when the worker starts
+def init_worker():
+    import compiler
+
+
+# Compiles all the files with the given number of workers and prints a summary.
+# the workers only look up and store entries of the cache, the hits and misses are counted and the cache is trimmed
+# to its size here. With compile_text (see compile_file) the compiling is done somewhere else and the workers are
+# threads that wait for it. With collect_stats the stats of every file are handed to the hooks of compile_stats.py
+# here, and with write_stats they are written to stderr too. returns the number of files that failed
+def run_batch(paths, jobs=None, out=None, optimize=False, reports=(), cache=None, compile_text=None,
+              collect_stats=False, write_stats=False, binary=False):
+    files = expand_inputs(paths)
+    compile_one = partial(compile_file, optimize=optimize, reports=reports, cache=cache, compile_text=compile_text,
+                          collect_stats=collect_stats, binary=binary)
+    extension = '.qbc' if binary else '.qud'
+    stats_stream = sys.stderr if write_stats else None
+    stats = cache.stats if cache is not None else None
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(files) or 1))
+    if jobs == 1:
+        results = map(compile_one, files)
+        failed = report(results, out, stats, stats_stream, extension)
+    elif compile_text is not None:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            failed = report(executor.map(compile_one, files), out, stats, stats_stream, extension)
+    else:
+        # map keeps the order of the input files so the summary is the same on every run
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as executor:
+            chunksize = max(1, len(files) // (jobs * 4))
+            failed = report(executor.map(compile_one, files, chunksize=chunksize), out, stats,
+                            stats_stream, extension)
+    # the workers change the size of the cache at the same time, the entries are listed once to set the total right
+    if cache is not None:
+        cache.evict(scan=True)
+    return failed
+
+
+# Prints the summary, stats (CacheStats) counts the files that were looked up in the cache. the stats of the compiles
+# are published (compile_stats.publish) to stats_stream with a line of their total at the end. extension is the one of
+# the files that were written
+def report(results, out=None, stats=None, stats_stream=None, extension='.qud'):
+    failed = 0
+    compiled = 0
+    from_cache = 0
+    all_stats = []
+    for file_path, success, diagnostics, cached, file_stats in results:
+        if cached is not None and stats is not None:
+            stats.record(cached)
+        if file_stats is not None:
+            publish(file_path, file_stats, stats_stream)
+            all_stats.append(file_stats)
+        if success:
+            compiled += 1
+            from_cache += bool(cached)
+            print(f"OK     {file_path} -> {file_path[:-3]}{extension}{' (cached)' if cached else ''}", file=out)
+            for line in diagnostics.splitlines():
+                print(f"    {line}", file=out)
+        else:
+            failed += 1
+            print(f"FAILED {file_path}", file=out)
+            for line in diagnostics.strip().splitlines():
+                print(f"    {line}", file=out)
+    print(f"{compiled} compiled, {failed} failed{f', {from_cache} from the cache' if from_cache else ''}", file=out)
+    if stats_stream is not None and all_stats:
+        stats_stream.write(json.dumps({'total': total(all_stats)}) + "\n")
+    return failed
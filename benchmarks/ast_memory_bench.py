@@ -0,0 +1,60 @@
+# Memory of the AST of a large program, per token of the source (tracemalloc): the bytes the tree keeps once it is
+# built, the peak while the parser builds it and the peak of the whole compile. The program is one block with many
+# copies of a loop with assignments, conditions and casts.
+#
+# Usage: python benchmarks/ast_memory_bench.py [copies]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ast_nodes import count_nodes  # noqa: E402
+from compiler import CompilationSession  # noqa: E402
+from tokenizer import tokenize  # noqa: E402
+
+DECLARATIONS = "N, num, sum1, i : int;\naverage, scale: float;\n"
+BODY = """
+    sum1 = 0;
+    input(N);
+    while (N > 0 && sum1 <= 1000000) {
+        input(num);
+        if (num != 0 || N == 1) sum1 = sum1 + num * 2 - 1; else sum1 = (sum1 / 3);
+        N = N - 1;
+    }
+    scale = staticcastfloat(sum1) / 2.5 + (average - 1.5) * scale;
+    { output(scale); }
+"""
+
+
+def build_program(copies):
+    return DECLARATIONS + "{" + BODY * copies + "}\n"
+
+
+def main(copies):
+    source = build_program(copies)
+    tokens = len(tokenize(source))
+    tracemalloc.start()
+    session = CompilationSession()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    ast = session.parse(source)
+    parse_seconds = time.perf_counter() - start
+    parse_peak = tracemalloc.get_traced_memory()[1] - before
+    # the token arrays of the lexer are freed, what is left is the tree
+    session.lexer.input('')
+    tree = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.reset_peak()
+    session.code_gen(ast)
+    compile_peak = max(tracemalloc.get_traced_memory()[1] - before, parse_peak)
+    tracemalloc.stop()
+    nodes = count_nodes(ast)
+    print(f"{len(source) / 1e6:.1f} MB source, {tokens} tokens, {nodes} nodes ({nodes / tokens:.2f} per token), "
+          f"parsed in {parse_seconds:.2f} s")
+    print(f"tree           {tree / tokens:7.0f} B/token  {tree / nodes:5.0f} B/node  {tree / 2 ** 20:8.1f} MiB")
+    print(f"parse peak     {parse_peak / tokens:7.0f} B/token                {parse_peak / 2 ** 20:8.1f} MiB")
+    print(f"compile peak   {compile_peak / tokens:7.0f} B/token                {compile_peak / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,61 @@
+# Cost per run of one program run over many inputs: every run in the QUAD virtual machine (quad_vm.py) one after the
+# other, and all the runs at once in the NumPy batch executor (quad_vector.py). The runs of the program loop a
+# different number of times, so the lanes of the batch diverge.
+#
+# Usage: python benchmarks/batch_bench.py [runs]
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiler import CompilationSession  # noqa: E402
+from quad_vector import VectorVM  # noqa: E402
+from quad_vm import QuadVM  # noqa: E402
+
+# The integer square root of a number by Newton's method and its average with a real weight
+SCORE = """
+n, root, next, steps: int;
+weight, score: float;
+{
+    input(n);
+    input(weight);
+    steps = 0;
+    if (n < 2) root = n; else {
+        root = n;
+        next = (root + n / root) / 2;
+        while (next < root) {
+            root = next;
+            next = (root + n / root) / 2;
+            steps = steps + 1;
+        }
+    }
+    score = (root + weight * steps) / 2.0;
+    output(root);
+    output(score);
+}
+"""
+
+# Runs in the virtual machine, the rest of the runs is estimated from them
+VM_RUNS = 2000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = np.random.default_rng(1)
+    inputs = np.column_stack([rng.integers(0, 10 ** 9, runs), rng.random(runs)])
+    for optimize in (False, True):
+        session = CompilationSession(optimize=optimize)
+        session.compile(SCORE)
+        instructions = session.emitter.instructions
+        vm = QuadVM(instructions)
+        sample = min(runs, VM_RUNS)
+        seconds = sum(vm.run(row).seconds for row in inputs[:sample].tolist())
+        batch = VectorVM(instructions).run_batch(inputs)
+        label = "score -O" if optimize else "score"
+        print(f"{label:<10}vm {seconds / sample * 1e6:8.2f} us/run   batch {batch.seconds / runs * 1e6:8.3f} us/run "
+              f"({runs} runs, {batch.seconds:.3f} s)   {seconds / sample / (batch.seconds / runs):6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
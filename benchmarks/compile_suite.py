@@ -0,0 +1,194 @@
+# Throughput of the compiler on generated programs (cpl_generator.py) at several scales: lines of source per second
+# of the lexer, the parser and code gen, of the optimizations (-O) all together and pass by pass, and of the whole
+# compile of a .ou file into a .qud file (cpq.compile_single, without the cache), and the peak memory of the compile
+# (tracemalloc). Every time is the best of a few runs, the phases are timed by CompileStats (compile_stats.py) without
+# tracing the memory.
+# The results are compared with a baseline file, benchmarks/baseline.json by default: the change of every number is
+# printed and the script exits with a non-zero code if a throughput fell or a peak grew by more than the threshold.
+# --save-baseline writes the results as the new baseline instead. A baseline is only meaningful on the machine (and
+# the Python) that wrote it, they're kept in the file and a note is printed if they differ.
+#
+# Usage: python benchmarks/compile_suite.py [--quick] [--repeat N] [--threshold PERCENT] [--baseline FILE]
+#                                           [--save-baseline]
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compile_stats import CompileStats  # noqa: E402
+from compiler import CompilationSession  # noqa: E402
+from cpl_generator import generate_program  # noqa: E402
+import cpq  # noqa: E402
+
+# name -> knobs of cpl_generator, the large scale is skipped with --quick
+SCALES = {
+    'small': {'statements': 500},
+    'medium': {'statements': 5000, 'declarations': 50},
+    'complex': {'statements': 1000, 'declarations': 50, 'width': 8, 'depth': 4, 'nesting': 6, 'boolean': 5},
+    'large': {'statements': 20000, 'declarations': 200},
+}
+QUICK_SKIPS = ('large',)
+SEED = 1
+
+# measure -> the phases of CompileStats that it adds up
+PHASES = {
+    'lex': ('lex',),
+    'parse': ('parse',),
+    'code_gen': ('semantic', 'code_gen'),
+    'optimize': ('fold', 'peephole', 'value_numbering', 'dead_code', 'loop_invariants', 'temp_alloc'),
+}
+# the passes of -O that are also measured on their own, a pass that got slower shows up even when the optimize total
+# hides it
+PASSES = ('peephole', 'value_numbering', 'dead_code', 'loop_invariants', 'temp_alloc')
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+USAGE = ("Usage: compile_suite.py [--quick] [--repeat N] [--threshold PERCENT] [--baseline FILE] "
+         "[--save-baseline]")
+
+
+# The fastest time of every phase over repeat compiles of the source
+def time_phases(source, optimize, repeat):
+    best = {}
+    measures = dict(PHASES, **{name: (name,) for name in PASSES}) if optimize else PHASES
+    for _ in range(repeat):
+        stats = CompileStats(trace_memory=False)
+        CompilationSession(optimize=optimize, stats=stats).compile(source)
+        for measure, names in measures.items():
+            seconds = sum(stats.phases[name]['seconds'] for name in names if name in stats.phases)
+            if seconds:
+                best[measure] = min(best.get(measure, seconds), seconds)
+    return best
+
+
+# The fastest compile of the file at path into a .qud file by cpq.py
+def time_end_to_end(path, optimize, repeat):
+    best = None
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            cpq.compile_single(path, optimize)
+            seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def peak_memory(source, optimize):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    CompilationSession(optimize=optimize).compile(source)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return peak
+
+
+# The results of one scale: the lines of the program, lines per second of every measure and the peaks in bytes
+def run_scale(knobs, directory, repeat):
+    source = generate_program(SEED, **knobs)
+    lines = source.count("\n")
+    path = os.path.join(directory, 'program.ou')
+    with open(path, 'w') as file:
+        file.write(source)
+    result = {'lines': lines}
+    for measure, seconds in time_phases(source, False, repeat).items():
+        result[measure] = lines / seconds
+    optimized = time_phases(source, True, repeat)
+    result['optimize'] = lines / optimized['optimize']
+    for name in PASSES:
+        if name in optimized:
+            result[name] = lines / optimized[name]
+    result['end_to_end'] = lines / time_end_to_end(path, False, repeat)
+    result['end_to_end_O'] = lines / time_end_to_end(path, True, repeat)
+    result['peak_memory'] = peak_memory(source, False)
+    result['peak_memory_O'] = peak_memory(source, True)
+    return result
+
+
+# Prints the results of a scale and their changes from the baseline, returns the measures that regressed
+def compare(name, result, baseline, threshold):
+    regressions = []
+    print(f"{name} ({result['lines']} lines)")
+    for measure, value in result.items():
+        if measure == 'lines':
+            continue
+        memory = measure.startswith('peak_memory')
+        text = f"{value / 2 ** 20:10.1f} MiB   " if memory else f"{value:10.0f} lines/s"
+        old = baseline.get(measure)
+        change = ""
+        if old:
+            percent = (value / old - 1) * 100
+            # a throughput regresses when it falls, a peak when it grows
+            regressed = percent > threshold if memory else percent < -threshold
+            change = f"  {percent:+6.1f}%" + ("  REGRESSION" if regressed else "")
+            if regressed:
+                regressions.append(f"{name} {measure}")
+        print(f"  {measure:<14}{text}{change}")
+    return regressions
+
+
+def main(argv):
+    repeat = 3
+    threshold = 15.0
+    baseline_path = BASELINE
+    quick = save = False
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--quick':
+            quick = True
+        elif argv[i] == '--save-baseline':
+            save = True
+        elif argv[i] in ('--repeat', '--threshold', '--baseline') and i + 1 < len(argv):
+            value = argv[i + 1]
+            if argv[i] == '--baseline':
+                baseline_path = value
+            elif not value.replace('.', '', 1).isdigit() or (argv[i] == '--repeat' and not value.isdigit()):
+                print(USAGE, file=sys.stderr)
+                return 1
+            elif argv[i] == '--repeat':
+                repeat = max(1, int(value))
+            else:
+                threshold = float(value)
+            i += 1
+        else:
+            print(USAGE, file=sys.stderr)
+            return 1
+        i += 1
+
+    baseline = {}
+    if not save and os.path.exists(baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        if baseline.get('python') != platform.python_version() or baseline.get('machine') != platform.machine():
+            print(f"note: the baseline is of Python {baseline.get('python')} on {baseline.get('machine')}")
+    elif not save:
+        print(f"no baseline at {baseline_path}, run with --save-baseline to write one")
+
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, knobs in SCALES.items():
+            if quick and name in QUICK_SKIPS:
+                continue
+            results[name] = run_scale(knobs, directory, repeat)
+            regressions += compare(name, results[name], baseline.get('scales', {}).get(name, {}), threshold)
+
+    if save:
+        with open(baseline_path, 'w') as file:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'seed': SEED,
+                       'scales': results}, file, indent=2)
+            file.write("\n")
+        print(f"baseline written to {baseline_path}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regressions of more than {threshold:g}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
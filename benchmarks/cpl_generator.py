@@ -0,0 +1,181 @@
+# Seeded generator of valid CPL programs for the benchmarks. The same seed and knobs always give the same program.
+# Every identifier is declared, an int identifier is only assigned int expressions, divisions are by non-zero
+# numbers and every while loop counts down a counter of its own that nothing else assigns, so the programs compile
+# without errors and end on any input.
+# The knobs:
+#   declarations  how many identifiers are declared (besides the loop counters), a quarter of them are float
+#   statements    how many statements the program has in all, nested ones included
+#   width         operands of an arithmetic expression
+#   depth         how deep a parenthesized sub-expression can nest inside an expression
+#   nesting       how deep if / while statements can nest
+#   boolean       relops in a condition, joined by && / || and sometimes negated with !( )
+#
+# Usage: python benchmarks/cpl_generator.py [--seed N] [--declarations N] [--statements N] [--width N] [--depth N]
+#                                           [--nesting N] [--boolean N] > program.ou
+import random
+import sys
+
+DEFAULTS = {'declarations': 20, 'statements': 200, 'width': 4, 'depth': 2, 'nesting': 3, 'boolean': 2}
+
+RELOPS = ('==', '!=', '<', '>', '<=', '>=')
+
+
+class ProgramGenerator:
+    def __init__(self, seed=0, declarations=20, statements=200, width=4, depth=2, nesting=3, boolean=2):
+        self.random = random.Random(seed)
+        self.statements = statements
+        self.width = max(1, width)
+        self.depth = depth
+        self.nesting = nesting
+        self.boolean = max(1, boolean)
+        declarations = max(2, declarations)
+        floats = max(1, declarations // 4)
+        self.int_ids = [f"i{number}" for number in range(declarations - floats)]
+        self.float_ids = [f"f{number}" for number in range(floats)]
+        # one counter per level of nested while loops
+        self.counters = [f"k{level}" for level in range(max(1, nesting))]
+        self.remaining = 0
+
+    def program(self):
+        self.remaining = self.statements
+        lines = [self.declaration(self.int_ids + self.counters, 'int'), self.declaration(self.float_ids, 'float'), "{"]
+        while self.remaining > 0:
+            lines.extend(self.statement(1, 0))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def declaration(identifiers, id_type):
+        # a long list of identifiers is split over several declarations of the same type
+        return "\n".join(f"{', '.join(identifiers[start:start + 10])} : {id_type};"
+                         for start in range(0, len(identifiers), 10))
+
+    # Operand of an expression, an int expression only has int identifiers and numbers
+    def operand(self, real):
+        roll = self.random.random()
+        if roll < 0.55:
+            return self.random.choice(self.int_ids + self.float_ids if real else self.int_ids)
+        if roll < 0.75 or not real:
+            return str(self.random.randint(0, 100))
+        return f"{self.random.randint(0, 99)}.{self.random.randint(1, 9)}"
+
+    def expression(self, real, depth=None):
+        depth = self.depth if depth is None else depth
+        parts = []
+        for index in range(self.random.randint(1, self.width)):
+            roll = self.random.random()
+            if depth > 0 and roll < 0.2:
+                part = f"({self.expression(real, depth - 1)})"
+            elif depth > 0 and roll < 0.25:
+                cast = 'staticcastfloat' if real else 'staticcastint'
+                part = f"{cast}({self.expression(not real and self.random.random() < 0.5, depth - 1)})"
+            else:
+                part = self.operand(real)
+            if index:
+                operator = self.random.choice('+-*/')
+                # a division is always by a number that isn't 0
+                if operator == '/':
+                    part = str(self.random.randint(1, 9))
+                parts.append(operator)
+            parts.append(part)
+        return " ".join(parts)
+
+    # A condition with the given number of relops: terms joined by ||, a term is relops (or negated conditions)
+    # joined by &&
+    def condition(self, relops=None):
+        relops = self.boolean if relops is None else relops
+        terms = []
+        while relops > 0:
+            size = self.random.randint(1, relops)
+            terms.append(self.and_condition(size))
+            relops -= size
+        return " || ".join(terms)
+
+    def and_condition(self, relops):
+        factors = []
+        while relops > 0:
+            if relops > 1 and self.random.random() < 0.15:
+                size = self.random.randint(2, relops)
+                factors.append(f"!({self.condition(size)})")
+            else:
+                size = 1
+                real = self.random.random() < 0.3
+                factors.append(f"{self.expression(real, 0)} {self.random.choice(RELOPS)} {self.expression(real, 0)}")
+            relops -= size
+        return " && ".join(factors)
+
+    # The lines of one statement and the statements nested in it, level is the nesting of if / while
+    def statement(self, indent, level):
+        self.remaining -= 1
+        pad = "    " * indent
+        roll = self.random.random()
+        if level < self.nesting and self.remaining > 0 and roll < 0.15:
+            lines = [f"{pad}if ({self.condition()})"]
+            lines.extend(self.body(indent, level + 1))
+            lines.append(f"{pad}else")
+            lines.extend(self.body(indent, level + 1))
+            return lines
+        if level < self.nesting and self.remaining > 0 and roll < 0.25:
+            counter = self.counters[level]
+            lines = [f"{pad}{counter} = {self.random.randint(1, 5)};",
+                     f"{pad}while ({counter} > 0 && {self.and_condition(self.boolean)}) {{",
+                     f"{pad}    {counter} = {counter} - 1;"]
+            lines.extend(self.block(indent + 1, level + 1))
+            lines.append(f"{pad}}}")
+            return lines
+        if roll < 0.35:
+            return [f"{pad}input({self.random.choice(self.int_ids + self.float_ids)});"]
+        if roll < 0.45:
+            return [f"{pad}output({self.expression(self.random.random() < 0.3)});"]
+        identifier = self.random.choice(self.int_ids + self.float_ids)
+        return [f"{pad}{identifier} = {self.expression(identifier in self.float_ids)};"]
+
+    # A block of a few statements
+    def block(self, indent, level):
+        lines = []
+        for _ in range(self.random.randint(1, 4)):
+            if self.remaining <= 0:
+                break
+            lines.extend(self.statement(indent, level))
+        return lines
+
+    # The body of an if branch, a single statement or a block
+    def body(self, indent, level):
+        if self.remaining <= 0 or self.random.random() < 0.5:
+            # a branch that has no statements left gets an empty block
+            if self.remaining <= 0:
+                return ["    " * indent + "{ }"]
+            lines = self.statement(indent + 1, level)
+            # a while loop is two statements, the reset of its counter and the loop
+            if len(lines) == 1 or not lines[0].endswith(';'):
+                return lines
+            return ["    " * indent + "{"] + lines + ["    " * indent + "}"]
+        return ["    " * indent + "{"] + self.block(indent + 1, level) + ["    " * indent + "}"]
+
+
+def generate_program(seed=0, **knobs):
+    return ProgramGenerator(seed, **dict(DEFAULTS, **knobs)).program()
+
+
+def main(argv):
+    knobs = {}
+    seed = 0
+    i = 0
+    while i < len(argv):
+        name = argv[i][2:]
+        if not argv[i].startswith('--') or (name != 'seed' and name not in DEFAULTS) or i + 1 == len(argv) \
+                or not argv[i + 1].isdigit():
+            print("Usage: cpl_generator.py [--seed N] [--declarations N] [--statements N] [--width N] [--depth N] "
+                  "[--nesting N] [--boolean N]", file=sys.stderr)
+            return 1
+        if name == 'seed':
+            seed = int(argv[i + 1])
+        else:
+            knobs[name] = int(argv[i + 1])
+        i += 2
+    sys.stdout.write(generate_program(seed, **knobs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
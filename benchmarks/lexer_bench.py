@@ -0,0 +1,70 @@
+# Throughput of the PLY lexer (lexer.py) and of the fast tokenizer (tokenizer.py) in MB/s on multi-megabyte inputs:
+# many copies of a program with short comments, and a program with one huge comment block. The tokens of the two are
+# compared, the script exits with a non-zero code if they differ.
+#
+# Usage: python benchmarks/lexer_bench.py [megabytes]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lexer import lexer  # noqa: E402
+from tokenizer import tokenize  # noqa: E402
+
+PROGRAM = """
+/* the sum of the numbers
+   that are read */
+N, num, sum1 : int;
+average: float;
+{
+    sum1 = 0;
+    input(N);
+    while (N > 0 && sum1 <= 1000000) { /* one number */
+        input(num);
+        if (num != 0 || N == 1) sum1 = sum1 + num * 2 - 1; else sum1 = sum1 / 3;
+        N = N - 1;
+    }
+    average = staticcastfloat(sum1) / 2.5;
+    output(average);
+}
+"""
+
+
+def many_programs(size):
+    return PROGRAM * (size // len(PROGRAM) + 1)
+
+
+def huge_comment(size):
+    return "a: int;\n{ /*" + "a comment * line / with stars\n" * (size // 30) + "*/ output(a); }\n"
+
+
+def ply_tokens(data):
+    copy = lexer.clone()
+    copy.input(data)
+    return [(token.type, token.value, token.lineno, token.lexpos) for token in iter(copy.token, None)]
+
+
+def run(name, data):
+    megabytes = len(data) / 1e6
+    start = time.perf_counter()
+    expected = ply_tokens(data)
+    ply_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = tokenize(data)
+    fast_seconds = time.perf_counter() - start
+    same = [result.token(index) for index in range(len(result))] == expected
+    print(f"{name:<16}{megabytes:6.1f} MB {len(result):>9} tokens   PLY {megabytes / ply_seconds:7.2f} MB/s   "
+          f"fast {megabytes / fast_seconds:7.2f} MB/s   {ply_seconds / fast_seconds:5.1f}x   "
+          f"{'same tokens' if same else 'DIFFERENT TOKENS'}")
+    return same
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 4 * 10 ** 6
+    ok = run("many programs", many_programs(size))
+    ok = run("huge comment", huge_comment(size)) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
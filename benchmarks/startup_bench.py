@@ -0,0 +1,57 @@
+# Measures the cold start of the compiler: the time it takes a new Python process to import the lexer and the parser
+# and compile a tiny program, once with the shipped tables and once with the tables removed, so the lexer regex and
+# the LALR tables have to be built from scratch like they were before the tables were shipped.
+#
+# Usage: python benchmarks/startup_bench.py [runs]
+import glob
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLES = ['cpq_lextab.py', 'cpq_parsetab.py']
+PROGRAM = "from compiler import compile_source; compile_source('a: int; { input(a); output(a); }')"
+
+
+def time_run(directory):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', PROGRAM], cwd=directory, check=True)
+    return time.perf_counter() - start
+
+
+def remove_tables(directory):
+    for name in TABLES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    cache = os.path.join(directory, '__pycache__')
+    if os.path.isdir(cache):
+        for name in os.listdir(cache):
+            if name.split('.')[0] + '.py' in TABLES:
+                os.remove(os.path.join(cache, name))
+
+
+def main(runs):
+    with tempfile.TemporaryDirectory() as directory:
+        # every module of the compiler, the tables included
+        for path in glob.glob(os.path.join(ROOT, '*.py')):
+            shutil.copy(path, directory)
+        time_run(directory)  # warm the OS file cache and the bytecode cache
+        cached = [time_run(directory) for _ in range(runs)]
+        rebuilt = []
+        for _ in range(runs):
+            remove_tables(directory)
+            rebuilt.append(time_run(directory))
+    cached_ms = statistics.median(cached) * 1000
+    rebuilt_ms = statistics.median(rebuilt) * 1000
+    print(f"shipped tables:  {cached_ms:8.1f} ms (median of {runs})")
+    print(f"tables rebuilt:  {rebuilt_ms:8.1f} ms (median of {runs})")
+    print(f"speedup:         {rebuilt_ms / cached_ms:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,78 @@
+# Stress test for very large and very deeply nested programs. Every program is compiled in a fresh session and
+# the time and the peak memory (tracemalloc) are reported, a RecursionError or a failed check makes the script exit
+# with a non-zero code.
+#
+# Usage: python benchmarks/stress_nesting.py [operands] [depth]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiler import CompilationSession  # noqa: E402
+
+
+def long_expression(operands):
+    return "a, b: int;\n{ b = " + " + ".join(["a"] * operands) + ";\noutput(b);\n}\n"
+
+
+def long_boolean(operands):
+    condition = " || ".join(["a < b"] * operands)
+    return f"a, b: int;\n{{ if ({condition}) output(a); else output(b); }}\n"
+
+
+def nested_blocks(depth):
+    return "a: int;\n{ input(a);\n" + "{" * depth + "output(a);" + "}" * depth + "\n}\n"
+
+
+def nested_ifs(depth):
+    return "a: int;\n{ input(a);\n" + "if (a > 0) " * depth + "output(a);" + " else output(0);" * depth + "\n}\n"
+
+
+def nested_whiles(depth):
+    return "a: int;\n{ input(a);\n" + "while (a > 0) {" * depth + "a = a - 1;" + "}" * depth + "\n}\n"
+
+
+def nested_parentheses(depth):
+    return "a: int;\n{ output(" + "(a + " * depth + "1" + ")" * depth + "); }\n"
+
+
+def run(name, source, tokens):
+    tracemalloc.start()
+    start = time.perf_counter()
+    session = CompilationSession()
+    session.compile(source)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    instructions = len(session.emitter.instructions)
+    print(f"{name:<28} {elapsed:7.2f} s  {peak / 2 ** 20:8.1f} MiB peak  "
+          f"{peak / tokens:7.0f} B/token  {instructions} instructions")
+    return instructions
+
+
+def main(operands, depth):
+    checks = [
+        ("expression", long_expression(operands), 2 * operands, operands + 1),
+        ("boolean ||", long_boolean(operands // 10), 4 * (operands // 10), None),
+        ("nested blocks", nested_blocks(depth), 2 * depth, 3),
+        ("nested if", nested_ifs(depth), 10 * depth, None),
+        ("nested while", nested_whiles(depth), 12 * depth, None),
+        ("nested parentheses", nested_parentheses(depth), 4 * depth, depth + 2),
+    ]
+    failed = False
+    for name, source, tokens, expected in checks:
+        try:
+            instructions = run(f"{name} ({len(source)} chars)", source, tokens)
+        except RecursionError:
+            print(f"{name}: RecursionError")
+            failed = True
+            continue
+        if expected is not None and instructions != expected:
+            print(f"{name}: expected {expected} instructions")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000, int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
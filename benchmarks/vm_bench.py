@@ -0,0 +1,75 @@
+# Throughput of the QUAD virtual machine (quad_vm.py) and of the programs translated to Python (quad_python.py) in
+# instructions per second, on loop-heavy programs compiled with and without -O. The programs are compiled (and
+# translated) once and run in the same process, so only the execution is timed.
+#
+# Usage: python benchmarks/vm_bench.py [size]
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiler import CompilationSession  # noqa: E402
+from quad_python import compile_program  # noqa: E402
+from quad_vm import QuadVM  # noqa: E402
+
+# The variadic sum of the README, over size numbers
+VARIADIC_SUM = """
+N, num, sum : int;
+{
+    sum = 0;
+    input(N);
+    while (N > 0) {
+        input(num);
+        sum = sum + num;
+        N = N - 1;
+    }
+    output(sum);
+}
+"""
+
+# Nested loops with integer and real arithmetic and an invariant expression
+NESTED_LOOPS = """
+n, m, i, j, s: int;
+x: float;
+{
+    input(n);
+    input(m);
+    s = 0;
+    x = 0.0;
+    i = n;
+    while (i > 0) {
+        j = m;
+        while (j > 0) {
+            s = s + i * j / 3 + (n * m - 1);
+            if (s > 1000000) s = s - 1000000; else s = s + 1;
+            x = x + j * 0.5;
+            j = j - 1;
+        }
+        i = i - 1;
+    }
+    output(s);
+    output(x);
+}
+"""
+
+
+def run(name, source, inputs, optimize):
+    session = CompilationSession(optimize=optimize)
+    session.compile(source)
+    for backend, program in (("vm", QuadVM(session.emitter.instructions)),
+                             ("python", compile_program(session.emitter.instructions))):
+        result = program.run(inputs)
+        label = f"{name}{' -O' if optimize else ''} ({backend})"
+        print(f"{label:<32}{result.steps:>10} instructions {result.seconds:8.3f} s "
+              f"{result.throughput():>14,.0f} instructions/s")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    side = max(1, int(size ** 0.5) // 2)
+    for optimize in (False, True):
+        run("variadic sum", VARIADIC_SUM, [size] + list(range(size)), optimize)
+        run("nested loops", NESTED_LOOPS, [side, side], optimize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# This file builds the control flow graph (CFG) of the IR: the instructions are split into basic blocks, a new block
+# starts at every label and after every JUMP / JMPZ / HALT, and every block knows the blocks that can run after it.
+# It also computes liveness, the identifiers and temps whose current value can still be read later, which the
+# optimization passes use to reuse temps and to remove dead code.
+from quad_ir import *
+
+
+class BasicBlock:
+    __slots__ = ('index', 'instructions', 'successors', 'predecessors', 'live_in', 'live_out')
+
+    def __init__(self, index, instructions):
+        self.index = index
+        self.instructions = instructions
+        self.successors = []
+        self.predecessors = []
+        self.live_in = set()
+        self.live_out = set()
+
+    # The labels at the start of the block
+    def labels(self):
+        return [instruction.label for instruction in self.instructions if instruction.opcode == LABEL]
+
+    def last(self):
+        return self.instructions[-1] if self.instructions else None
+
+
+def split_blocks(instructions):
+    blocks = []
+    current = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        # a label starts a new block unless the current block has nothing but labels
+        if opcode == LABEL and current and current[-1].opcode != LABEL:
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+        current.append(instruction)
+        if opcode in BRANCH_OPCODES:
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+    if current:
+        blocks.append(BasicBlock(len(blocks), current))
+    return blocks
+
+
+def build_cfg(instructions):
+    blocks = split_blocks(instructions)
+    block_of_label = {}
+    for block in blocks:
+        for label in block.labels():
+            block_of_label[label] = block
+    for index, block in enumerate(blocks):
+        last = block.last()
+        following = blocks[index + 1] if index + 1 < len(blocks) else None
+        if last.opcode == JUMP:
+            successors = [block_of_label[last.label]]
+        elif last.opcode == JMPZ:
+            successors = [block_of_label[last.label]]
+            if following is not None and following is not successors[0]:
+                successors.append(following)
+        elif last.opcode == HALT:
+            successors = []
+        else:
+            successors = [following] if following is not None else []
+        block.successors = successors
+        for successor in successors:
+            successor.predecessors.append(block)
+    return blocks
+
+
+def flatten(blocks):
+    return [instruction for block in blocks for instruction in block.instructions]
+
+
+# Backward dataflow: a name is live at a point if some path from that point reads it before writing it.
+# tracked(name) decides which names are followed, for example only the temps.
+# live_before(block, live_out) returns the names live before a block given the ones live after it, it replaces the
+# names every block reads and writes for a dataflow where what an instruction reads depends on what is live after it
+# (dead_code.live_before). fills live_in / live_out of every block
+def compute_liveness(blocks, tracked=None, live_before=None):
+    if live_before is None:
+        uses = []
+        defs = []
+        for block in blocks:
+            block_uses = set()
+            block_defs = set()
+            for instruction in block.instructions:
+                for operand in operands_read(instruction):
+                    if operand not in block_defs and (tracked is None or tracked(operand)):
+                        block_uses.add(operand)
+                dest = instruction.dest
+                if dest is not None and (tracked is None or tracked(dest)):
+                    block_defs.add(dest)
+            uses.append(block_uses)
+            defs.append(block_defs)
+
+        def live_before(block, live_out):
+            return uses[block.index] | (live_out - defs[block.index])
+
+    for block in blocks:
+        block.live_in = set()
+        block.live_out = set()
+    # a worklist of the blocks whose successors' live_in changed, starting from the last block. the live sets only
+    # grow, so a block whose live_in kept its size didn't change and its predecessors don't have to be visited again
+    work = list(blocks)
+    waiting = set(blocks)
+    while work:
+        block = work.pop()
+        waiting.discard(block)
+        live_out = set()
+        for successor in block.successors:
+            live_out |= successor.live_in
+        block.live_out = live_out
+        live_in = live_before(block, live_out)
+        if len(live_in) != len(block.live_in):
+            block.live_in = live_in
+            for predecessor in block.predecessors:
+                if predecessor not in waiting:
+                    waiting.add(predecessor)
+                    work.append(predecessor)
+
+
+# Walks the instructions of a block backwards and yields (instruction, names live right after it)
+def live_after_each(block, tracked=None):
+    live = set(block.live_out)
+    for instruction in reversed(block.instructions):
+        yield instruction, live
+        dest = instruction.dest
+        if dest is not None:
+            live.discard(dest)
+        for operand in operands_read(instruction):
+            if tracked is None or tracked(operand):
+                live.add(operand)
+
+
+def is_temp(operand):
+    return type(operand) is Temp
+
+
+# Depth first search from the first block. returns the blocks in reverse postorder and the edges that go back to a
+# block that is still being searched (a block on the current path), every loop has such an edge
+def depth_first_search(entry):
+    order = []
+    back_edges = []
+    visited = {entry}
+    on_path = {entry}
+    stack = [(entry, iter(entry.successors))]
+    while stack:
+        block, successors = stack[-1]
+        for successor in successors:
+            if successor in on_path:
+                back_edges.append((block, successor))
+            elif successor not in visited:
+                visited.add(successor)
+                on_path.add(successor)
+                stack.append((successor, iter(successor.successors)))
+                break
+        else:
+            stack.pop()
+            on_path.discard(block)
+            order.append(block)
+    order.reverse()
+    return order, back_edges
+
+
+class Loop:
+    __slots__ = ('header', 'blocks', 'children', 'parent', 'reducible', 'first', 'last')
+
+    def __init__(self, header):
+        # the block the loop starts at (the condition of a while), the blocks that are in this loop and not in an inner
+        # one (header included), and the loops nested directly inside it
+        self.header = header
+        self.blocks = [header]
+        self.children = []
+        self.parent = None
+        # False if the loop can be entered somewhere else than its header, passes leave such a loop alone
+        self.reducible = True
+        # range of the loop in a numbering of the loop tree, see contains()
+        self.first = 0
+        self.last = 0
+
+    # True if the other loop is this loop or nested in it, other is None for code that isn't in any loop
+    def contains(self, other):
+        return other is not None and self.first <= other.first < self.last
+
+
+# Finds the natural loops: an edge back to a block on the search path goes back to the start (the header) of a loop,
+# and the loop is every block that reaches the edge without going through its header. loops with the same header are
+# merged. If the first block of the program is in the loop, the loop can be entered somewhere else than its header
+# (the code isn't reducible) and it's marked so. The loops are found inner ones first, and a loop that was found
+# already stands for all its blocks (union-find), so nested loops are walked once whatever their depth.
+# returns the loops (inner ones first) and a dict block -> the innermost loop it is in
+def find_loops(blocks):
+    if not blocks:
+        return [], {}
+    order, back_edges = depth_first_search(blocks[0])
+    latches = {}
+    for block, header in back_edges:
+        latches.setdefault(header, []).append(block)
+    reached = set(order)
+    representative = {}
+
+    def find(block):
+        root = block
+        while root in representative:
+            root = representative[root]
+        while block is not root:
+            parent = representative[block]
+            representative[block] = root
+            block = parent
+        return root
+
+    loops = []
+    loop_of_header = {}
+    block_loop = {}
+    # a loop nested in another one has its header later in the reverse postorder
+    for header in reversed([block for block in order if block in latches]):
+        loop = Loop(header)
+        block_loop[header] = loop
+        seen = {header}
+        work = [find(latch) for latch in latches[header]]
+        while work:
+            block = find(work.pop())
+            if block in seen:
+                continue
+            seen.add(block)
+            if block is blocks[0]:
+                loop.reducible = False
+            if block in loop_of_header:
+                child = loop_of_header[block]
+                child.parent = loop
+                loop.children.append(child)
+                if not child.reducible:
+                    loop.reducible = False
+            else:
+                loop.blocks.append(block)
+                block_loop[block] = loop
+            work.extend(find(predecessor) for predecessor in block.predecessors if predecessor in reached)
+        for block in seen:
+            if block is not header:
+                representative[block] = header
+        loop_of_header[header] = loop
+        loops.append(loop)
+    number_loops(loops)
+    return loops, block_loop
+
+
+def number_loops(loops):
+    counter = 0
+    stack = [(loop, False) for loop in loops if loop.parent is None]
+    while stack:
+        loop, done = stack.pop()
+        if done:
+            loop.last = counter
+            continue
+        loop.first = counter
+        counter += 1
+        stack.append((loop, True))
+        stack.extend((child, False) for child in loop.children)
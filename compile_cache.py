@@ -0,0 +1,262 @@
+# This file implements the compile cache of cpq.py, an on-disk store of the .qud files it wrote before.
+# An entry is found by the hash of everything its output depends on: the source text, the version of the compiler
+# (the hash of the compiler's own source files, the grammar and the token rules included) and the options that change
+# the code (-O, the binary format). On a hit cpq.py skips lexing, parsing and code gen and hard-links (or copies) the
+# cached file to the output path. Only programs without errors are stored, with the text of the reports they can be
+# asked for.
+# The cache has a size cap, when it is over the least recently used entries are removed (a hit updates the time of
+# an entry). The total size of the entries is kept up to date by store and remove, so the entries are only listed when
+# the cache is over the cap. The number of hits, misses and evictions is kept in the cache directory.
+#
+#   <directory>/entries/<key>.qud   the output file (the bytes of the .qbc file with the binary format)
+#   <directory>/entries/<key>.json  the hash of the output file and the reports
+#   <directory>/size                the total size of the entries in bytes
+#   <directory>/stats.json          hits, misses and evictions of all the runs
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+DEFAULT_DIRECTORY = os.environ.get('CPQ_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'cpq'))
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Generated from the other files, they don't change what the compiler does
+GENERATED_MODULES = ('cpq_lextab.py', 'cpq_parsetab.py')
+
+compiler_version_hash = None
+
+
+# Hash of the source files of the compiler, any change to the compiler gets new keys
+def compiler_version():
+    global compiler_version_hash
+    if compiler_version_hash is None:
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(SOURCE_DIR, '*.py'))):
+            if os.path.basename(path) in GENERATED_MODULES:
+                continue
+            digest.update(os.path.basename(path).encode())
+            with open(path, 'rb') as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+        compiler_version_hash = digest.hexdigest()
+    return compiler_version_hash
+
+
+def file_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self, hits=0, misses=0, evictions=0):
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+
+    def record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def add(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+        return (f"{self.hits} hits, {self.misses} misses ({self.hit_rate():.0%} hit rate), "
+                f"{self.evictions} evicted")
+
+
+class CompileCache:
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES
+        self.entries = os.path.join(self.directory, 'entries')
+        # hits, misses and evictions of this process (the callers of fetch record the hits and misses), save_stats
+        # adds them to the totals in the directory
+        self.stats = CacheStats()
+
+    # source is the text of the program, a str or the bytes of the file (file_io.open_source)
+    def key(self, source, optimize=False, binary=False):
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(f"\0optimize={bool(optimize)}\0".encode())
+        if binary:
+            digest.update(b"binary\0")
+        digest.update(source.encode() if isinstance(source, str) else source)
+        return digest.hexdigest()
+
+    def entry_path(self, key, extension):
+        return os.path.join(self.entries, key + extension)
+
+    # The bytes of the files of an entry, 0 for the ones that aren't there
+    def entry_size(self, key):
+        size = 0
+        for extension in ('.json', '.qud'):
+            try:
+                size += os.path.getsize(self.entry_path(key, extension))
+            except OSError:
+                pass
+        return size
+
+    # The total size of the entries in the size file, None if there is none (a cache of an older version, or cleared)
+    def load_size(self):
+        try:
+            with open(os.path.join(self.directory, 'size')) as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def save_size(self, total):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = os.path.join(self.directory, f'size.{os.getpid()}.tmp')
+        with open(temporary, 'w') as file:
+            file.write(str(total))
+        os.replace(temporary, os.path.join(self.directory, 'size'))
+
+    # Adds change to the total in the size file. two processes that change it at the same time can lose one of the
+    # changes, the next time the entries are listed (evict) the total is set right again
+    def add_size(self, change):
+        total = self.load_size()
+        if total is not None and change:
+            self.save_size(max(0, total + change))
+
+    # Returns the reports of the entry (name -> text) and links / copies its .qud file to target ('-' is stdout), or
+    # None on a miss
+    def fetch(self, key, target):
+        qud_path = self.entry_path(key, '.qud')
+        try:
+            with open(self.entry_path(key, '.json')) as file:
+                metadata = json.load(file)
+            # an entry that was changed or half written is dropped
+            if file_hash(qud_path) != metadata['hash']:
+                self.remove(key)
+                raise ValueError
+            os.utime(qud_path)
+            self.materialize(qud_path, target)
+        except (OSError, ValueError, KeyError):
+            return None
+        return metadata['reports']
+
+    # Puts the entry at target, a new file replaces the old one so a hard link to another entry isn't written to
+    @staticmethod
+    def materialize(qud_path, target):
+        if target == '-':
+            with open(qud_path) as file:
+                shutil.copyfileobj(file, sys.stdout)
+            sys.stdout.flush()
+            return
+        # a target that is already a link to the entry stays as it is (a rename over it would do nothing and leave the
+        # temporary link behind)
+        if os.path.exists(target) and os.path.samefile(qud_path, target):
+            return
+        temporary = f"{target}.{os.getpid()}.tmp"
+        try:
+            os.link(qud_path, temporary)
+        except OSError:
+            shutil.copyfile(qud_path, temporary)
+        os.replace(temporary, target)
+
+    # Stores the .qud file that was just written for key, with the text of its reports
+    def store(self, key, qud_path, reports):
+        os.makedirs(self.entries, exist_ok=True)
+        metadata = {'hash': file_hash(qud_path), 'reports': reports}
+        # an entry that is stored again replaces the old one
+        old_size = self.entry_size(key)
+        # written under temporary names and renamed, a process that reads the entry at the same time sees all of it
+        # or nothing
+        temporary = self.entry_path(key, f'.{os.getpid()}.tmp')
+        shutil.copyfile(qud_path, temporary)
+        os.replace(temporary, self.entry_path(key, '.qud'))
+        with open(temporary, 'w') as file:
+            json.dump(metadata, file)
+        os.replace(temporary, self.entry_path(key, '.json'))
+        self.add_size(self.entry_size(key) - old_size)
+
+    def remove(self, key):
+        self.add_size(-self.delete(key))
+
+    # Deletes the files of an entry without changing the size file, returns how many bytes they had
+    def delete(self, key):
+        size = 0
+        for extension in ('.json', '.qud'):
+            path = self.entry_path(key, extension)
+            try:
+                size += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return size
+
+    # The entries as (time of last use, size, key), oldest first
+    def list_entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.entries, '*.qud')):
+            key = os.path.basename(path)[:-4]
+            try:
+                status = os.stat(path)
+                size = status.st_size + os.path.getsize(self.entry_path(key, '.json'))
+            except FileNotFoundError:
+                # removed by another process, or being stored right now
+                continue
+            entries.append((status.st_mtime, size, key))
+        entries.sort()
+        return entries
+
+    # Removes the least recently used entries until the cache fits in max_bytes, returns how many were removed.
+    # the entries are only listed when the size file says the cache is over the cap (or there is no size file), scan
+    # lists them anyway and sets the total right
+    def evict(self, scan=False):
+        known = self.load_size()
+        if not scan and known is not None and known <= self.max_bytes:
+            return 0
+        entries = self.list_entries()
+        total = sum(size for used, size, key in entries)
+        removed = 0
+        for used, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self.delete(key)
+            total -= size
+            removed += 1
+        # an empty cache that has no size file yet doesn't get a directory
+        if entries or known is not None:
+            self.save_size(total)
+        self.stats.evictions += removed
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # The totals of all the runs so far
+    def load_stats(self):
+        try:
+            with open(os.path.join(self.directory, 'stats.json')) as file:
+                return CacheStats(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return CacheStats()
+
+    # Adds the stats of this process to the totals in the directory and starts counting again
+    def save_stats(self):
+        totals = self.load_stats()
+        totals.add(self.stats)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = os.path.join(self.directory, f'stats.json.{os.getpid()}.tmp')
+        with open(temporary, 'w') as file:
+            json.dump(vars(totals), file)
+        os.replace(temporary, os.path.join(self.directory, 'stats.json'))
+        self.stats = CacheStats()
+        return totals
+
+    def summary(self):
+        entries = self.list_entries()
+        size = sum(size for used, size, key in entries)
+        return f"{self.directory}: {len(entries)} entries, {size / 1024:,.0f} KB of {self.max_bytes / 1024:,.0f} KB"
@@ -0,0 +1,93 @@
+# This file implements the instrumentation of a compile: the wall time and the memory allocated by every phase
+# (lexing, parsing, code gen, the optimizations, writing the file) and counters of what the compile produced (tokens,
+# AST nodes, temps, labels, instructions). A CompilationSession records them when it is given a CompileStats, and
+# cpq.py --stats writes them to stderr as JSON, one line per file.
+# The memory is traced with tracemalloc, which makes the phases slower, so it can be turned off.
+# Other programs get the stats of every file cpq.py compiles (in batch mode too, the workers send them back) from a
+# hook: add_hook(function) and function(file_path, stats) is called with the dict of as_dict for every file.
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+
+hooks = []
+
+
+def add_hook(function):
+    hooks.append(function)
+
+
+def remove_hook(function):
+    hooks.remove(function)
+
+
+# Hands the stats of a compiled file to the hooks, and writes them to stream (if it's given) as a line of JSON
+def publish(file_path, stats, stream=None):
+    for function in hooks:
+        function(file_path, stats)
+    if stream is not None:
+        stream.write(json.dumps(dict(file=file_path, **stats)) + "\n")
+
+
+class CompileStats:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        # phase name -> {'seconds', 'allocated', 'peak'} in the order the phases ran. allocated is the memory the
+        # phase allocated and didn't free (what it built), peak the most it had allocated at once (bytes)
+        self.phases = {}
+        self.counters = {}
+        # True if the file was taken from the compile cache, False if it wasn't found there, None without a cache
+        self.cached = None
+
+    @contextmanager
+    def phase(self, name):
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.phases.setdefault(name, {'seconds': 0.0})
+            record['seconds'] += time.perf_counter() - start
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated'] = record.get('allocated', 0) + current - before
+                record['peak'] = max(record.get('peak', 0), peak - before)
+            if tracing:
+                tracemalloc.stop()
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    # Adds the phases and the counters of an as_dict of a compile done somewhere else (a worker, the compile server)
+    def merge(self, stats):
+        self.phases.update(stats['phases'])
+        self.counters.update(stats['counters'])
+
+    def seconds(self):
+        return sum(record['seconds'] for record in self.phases.values())
+
+    # The stats as a dict that can be sent between processes and written as JSON
+    def as_dict(self):
+        return {'cached': self.cached, 'seconds': self.seconds(), 'phases': self.phases, 'counters': self.counters}
+
+
+# Adds up the dicts of as_dict of many files: the time and the allocated memory of every phase and the counters are
+# summed, the peaks are the largest one
+def total(stats_list):
+    result = {'files': 0, 'cached': 0, 'seconds': 0.0, 'phases': {}, 'counters': {}}
+    for stats in stats_list:
+        result['files'] += 1
+        result['cached'] += bool(stats['cached'])
+        result['seconds'] += stats['seconds']
+        for name, record in stats['phases'].items():
+            summed = result['phases'].setdefault(name, {})
+            for key, value in record.items():
+                summed[key] = max(summed.get(key, 0), value) if key == 'peak' else summed.get(key, 0) + value
+        for name, value in stats['counters'].items():
+            result['counters'][name] = result['counters'].get(name, 0) + value
+    return result
@@ -0,0 +1,182 @@
+# This file defines the CompilationSession class, which owns every piece of state that is needed to compile a single
+# CPL program: the symbol table, the temp and label counters and a private lexer.
+# A new session is created for every program, so one process can compile any number of programs back to back
+# without the variables, temps and labels of one program leaking into the next one.
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
+import io
+import sys
+
+from constant_folding import fold_constants
+from dead_code import eliminate_dead_code
+from ast_nodes import count_nodes
+from compile_stats import CompileStats
+from cpq_parser import ParseError, parser
+from emitter import Emitter
+from loop_invariants import hoist_loop_invariants
+from header import run_iteratively
+import peephole
+from value_numbering import eliminate_common_subexpressions
+from temp_alloc import allocate_temps, analyze_temps
+from quad_ir import Temp
+from semantic import SemanticError, analyze
+from tokenizer import FastLexer
+
+
+class CompilationSession:
+    def __init__(self, error_stream=None, optimize=False, peephole_rules=None, stats=None):
+        self.symbol_table = {}
+        self.temp_counter = 0
+        self.label_counter = 0
+        # Semantic errors are collected in errors and written to error_stream (stderr by default)
+        self.errors = []
+        self.error_stream = error_stream
+        # With optimize constant folding runs on the AST before code gen, then the peephole optimizer, local value
+        # numbering, dead code elimination, loop-invariant code motion and the temp allocator run on the code before
+        # it is written. peephole_rules replaces the default set of peephole rules
+        self.optimize = optimize
+        self.peephole_rules = peephole_rules
+        # TempReport of the temp allocator and the number of instructions dead code elimination removed,
+        # filled by code_gen when optimizing
+        self.temp_report = None
+        self.dead_code_removed = None
+        # code gen appends the instructions of the whole program to this single buffer
+        self.emitter = Emitter()
+        # Every session gets its own lexer so the line numbers and the input buffer aren't shared. the fast tokenizer
+        # gives the same tokens as the PLY lexer of lexer.py
+        self.lexer = FastLexer()
+        # A CompileStats (compile_stats.py) that records the time and the memory of every phase and the counters of
+        # the compile, or None
+        self.stats = stats
+
+    # The context of one phase of the compile, it's recorded only if the session has stats
+    def phase(self, name):
+        return self.stats.phase(name) if self.stats is not None else nullcontext()
+
+    def gen_temp(self):
+        self.temp_counter += 1
+        return Temp(f"t{self.temp_counter}")
+
+    def gen_label(self):
+        self.label_counter += 1
+        return f"L{self.label_counter}"
+
+    # Generates the QUAD code of a parsed program into self.emitter. The semantic analysis runs first and reports all
+    # the semantic errors of the program, if there are any no code is generated and SemanticError is raised
+    def code_gen(self, ast):
+        with self.phase('semantic'):
+            errors = analyze(ast, self)
+        if errors:
+            raise SemanticError(f"{errors} semantic errors")
+        if self.optimize:
+            with self.phase('fold'):
+                fold_constants(ast, self.symbol_table)
+        with self.phase('code_gen'):
+            run_iteratively(ast.code_gen(self))
+        if self.stats is not None:
+            self.stats.count('instructions_emitted', len(self.emitter.instructions))
+        if self.optimize:
+            # every pass is a phase of its own, so the stats show which one a slow -O compile spends its time in
+            with self.phase('peephole'):
+                instructions = peephole.optimize(self.emitter.instructions, self.peephole_rules)
+            with self.phase('value_numbering'):
+                instructions = eliminate_common_subexpressions(instructions)
+            with self.phase('dead_code'):
+                instructions, self.dead_code_removed = eliminate_dead_code(instructions)
+            with self.phase('loop_invariants'):
+                instructions = hoist_loop_invariants(instructions, self.gen_temp, self.gen_label)
+            with self.phase('peephole'):
+                self.emitter.instructions = peephole.optimize(instructions, self.peephole_rules)
+            with self.phase('temp_alloc'):
+                self.temp_report = allocate_temps(self.emitter.instructions)
+        if self.stats is not None:
+            self.stats.count('temps', self.temp_counter)
+            self.stats.count('labels', self.label_counter)
+            self.stats.count('instructions', len(self.emitter.instructions))
+
+    # Returns how many temps the generated code uses and how many of them are live at the same time
+    def report_temps(self):
+        if self.temp_report is not None:
+            return self.temp_report
+        return analyze_temps(self.emitter.instructions)
+
+    def report_dead_code(self):
+        if self.dead_code_removed is None:
+            return "dead code: not optimized"
+        return f"dead code: {self.dead_code_removed} instructions removed"
+
+    # The reports that cpq.py can ask for, by the name of their option
+    def report(self, name):
+        return str(self.REPORTS[name](self))
+
+    REPORTS = {
+        'temps': report_temps,
+        'dead-code': report_dead_code,
+    }
+
+    def report_error(self, message):
+        self.errors.append(message)
+        (self.error_stream or sys.stderr).write(message)
+
+    # Lexing and parsing, the fast tokenizer reads all the tokens before the parser starts. a program that can't be
+    # parsed raises ParseError, so code gen never gets a missing tree
+    def parse(self, source):
+        with self.phase('lex'):
+            self.lexer.input(source)
+        with self.phase('parse'):
+            ast = parser.parse(lexer=self.lexer)
+        if ast is None:
+            raise ParseError("syntax errors, no program to compile")
+        if self.stats is not None:
+            self.stats.count('tokens', len(self.lexer.tokens))
+            self.stats.count('ast_nodes', count_nodes(ast))
+        return ast
+
+    # Runs the whole pipeline: lexing , parsing and code gen. returns the QUAD code as a string,
+    # the instructions of the IR are kept in self.emitter.instructions
+    def compile(self, source):
+        ast = self.parse(source)
+        self.code_gen(ast)
+        return self.emitter.getvalue()
+
+
+# Compiles a single program in a fresh session
+def compile_source(source, optimize=False):
+    return CompilationSession(optimize=optimize).compile(source)
+
+
+# Compiles the text of a program in a fresh session, what the compiler prints to stdout / stderr (the syntax and the
+# semantic errors) is written to the output / errors streams instead. returns the session, the QUAD code is in
+# session.emitter.instructions
+def compile_captured(source, optimize, output, errors, stats=None):
+    with redirect_stdout(output), redirect_stderr(errors):
+        session = CompilationSession(error_stream=errors, optimize=optimize, stats=stats)
+        session.code_gen(session.parse(source))
+        return session
+
+
+# Compiles a single program and returns everything cpq.py needs to write its output, as a dict that can be sent
+# between processes: the QUAD code (None if it couldn't be generated), what the compiler printed to stdout and to
+# stderr, the exception that stopped it and the text of every report (CompilationSession.REPORTS).
+# with text=False the code is the list of instructions of the IR instead of its text, for a caller in the same process
+# that writes it out (file_io.write_quad) without building the text of the whole program in memory.
+# with stats=True the dict also has the stats of the compile (CompileStats.as_dict), of the phases that ran
+def compile_with_diagnostics(source, optimize=False, text=True, stats=False):
+    output = io.StringIO()
+    errors = io.StringIO()
+    compile_stats = CompileStats() if stats else None
+    try:
+        session = compile_captured(source, optimize, output, errors, compile_stats)
+        if text:
+            with session.phase('format'):
+                quad = session.emitter.getvalue()
+        else:
+            quad = session.emitter.instructions
+    except Exception as error:
+        result = {'quad': None, 'stdout': output.getvalue(), 'stderr': errors.getvalue(),
+                  'exception': f"{type(error).__name__}: {error}", 'reports': {}}
+    else:
+        result = {'quad': quad, 'stdout': output.getvalue(), 'stderr': errors.getvalue(), 'exception': None,
+                  'reports': {name: session.report(name) for name in session.REPORTS}}
+    if compile_stats is not None:
+        result['stats'] = compile_stats.as_dict()
+    return result
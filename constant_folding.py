@@ -0,0 +1,305 @@
+# This file implements constant folding and constant propagation on the AST. It runs after parsing and before
+# code gen (when the session optimizes) and rewrites the tree in place:
+# - an operation whose operands are both numbers is replaced by its result, with the same int / float promotion as
+#   get_expression_type and the same integer division as the QUAD IDIV instruction (the quotient is truncated).
+#   a division by zero is left for the program to fail at run time.
+# - an identifier whose value is known at that point of the program is replaced by the value. an identifier is
+#   known after it was assigned a number, and forgotten after input(), after an assignment of an unknown value,
+#   after an if whose branches leave it with different values, and for all the identifiers assigned inside a while.
+# - relops between numbers are decided at compile time, and an if or a while whose condition is known is replaced
+#   by the statement that runs (a while that never runs is removed). a constant that decides a || or a && only
+#   replaces it when the operands before it can't fail, those run first and can divide by zero.
+import math
+
+from ast_nodes import *
+from header import get_expression_type, left_chain, run_iteratively
+
+
+def fold_constants(program, symbol_table):
+    if program.stmt_block is not None:
+        run_iteratively(ConstantFolder(symbol_table).fold(program.stmt_block))
+
+
+class ConstantFolder:
+    def __init__(self, symbol_table):
+        self.symbol_table = symbol_table
+        # identifier -> the number it holds at the current point of the program
+        self.constants = {}
+        # id of a while node -> the identifiers assigned in it, filled for all the nested loops at the outermost one
+        self.loop_assignments = {}
+
+    # Every fold method returns the node that replaces the folded node, the ones that have children are generators
+    # run by run_iteratively like code_gen
+    def fold(self, node):
+        return getattr(self, 'fold_' + type(node).__name__)(node)
+
+    # Statements
+
+    def fold_StmtListNode(self, node):
+        for index, stmt in enumerate(node.stmts):
+            node.stmts[index] = yield self.fold(stmt)
+        return node
+
+    def fold_AssignmentStmtNode(self, node):
+        node.expression = yield self.fold(node.expression)
+        value = constant_value(node.expression)
+        identifier_type = self.symbol_table.get(node.identifier)
+        # an int can be assigned to a float identifier, a float assigned to an int identifier isn't followed
+        if value is not None and (identifier_type == "float" or (identifier_type == "int" and type(value) is int)):
+            self.constants[node.identifier] = float(value) if identifier_type == "float" else value
+        else:
+            self.constants.pop(node.identifier, None)
+        return node
+
+    def fold_InputStmtNode(self, node):
+        self.constants.pop(node.identifier, None)
+        return node
+
+    def fold_OutputStmtNode(self, node):
+        node.expression = yield self.fold(node.expression)
+        return node
+
+    def fold_IfStmtNode(self, node):
+        node.boolexpr = yield self.fold(node.boolexpr)
+        if isinstance(node.boolexpr, BoolConstantNode):
+            stmt = node.true_stmt if node.boolexpr.value else node.false_stmt
+            return (yield self.fold(stmt))
+        constants_before = dict(self.constants)
+        node.true_stmt = yield self.fold(node.true_stmt)
+        constants_true = self.constants
+        self.constants = constants_before
+        node.false_stmt = yield self.fold(node.false_stmt)
+        # after the if only the values that both branches agree on are known
+        self.constants = {identifier: value for identifier, value in self.constants.items()
+                          if identifier in constants_true and constants_true[identifier] == value}
+        return node
+
+    def fold_WhileStmtNode(self, node):
+        # the identifiers assigned in the loop can have any value in the condition , in the body and after the loop
+        if id(node) not in self.loop_assignments:
+            self.loop_assignments.update(assigned_identifiers(node)[1])
+        for identifier in self.loop_assignments[id(node)]:
+            self.constants.pop(identifier, None)
+        node.boolexpr = yield self.fold(node.boolexpr)
+        if isinstance(node.boolexpr, BoolConstantNode) and not node.boolexpr.value:
+            return StmtListNode()
+        constants_before = dict(self.constants)
+        node.stmt = yield self.fold(node.stmt)
+        self.constants = constants_before
+        return node
+
+    # Boolean expressions, a condition whose value is known becomes a BoolConstantNode
+
+    def fold_OrExprNode(self, node):
+        chain = left_chain(node, OrExprNode, 'boolterm1')
+        boolterms = [chain[-1].boolterm1] + [link.boolterm2 for link in reversed(chain) if link.boolterm2 is not None]
+        remaining = []
+        for boolterm in boolterms:
+            boolterm = yield self.fold(boolterm)
+            if isinstance(boolterm, BoolConstantNode):
+                # true || x is true , false || x is x. the boolterms before a true one still run
+                if boolterm.value:
+                    if not any(map(can_fail, remaining)):
+                        return BoolConstantNode(True)
+                    remaining.append(boolterm)
+                    break
+                continue
+            remaining.append(boolterm)
+        if not remaining:
+            return BoolConstantNode(False)
+        result = remaining[0]
+        for boolterm in remaining[1:]:
+            result = OrExprNode(result, boolterm)
+        return result
+
+    def fold_AndExprNode(self, node):
+        chain = left_chain(node, AndExprNode, 'boolfactor1')
+        boolfactors = ([chain[-1].boolfactor1] +
+                       [link.boolfactor2 for link in reversed(chain) if link.boolfactor2 is not None])
+        remaining = []
+        for boolfactor in boolfactors:
+            boolfactor = yield self.fold(boolfactor)
+            if isinstance(boolfactor, BoolConstantNode):
+                # false && x is false , true && x is x. the boolfactors before a false one still run
+                if not boolfactor.value:
+                    if not any(map(can_fail, remaining)):
+                        return BoolConstantNode(False)
+                    remaining.append(boolfactor)
+                    break
+                continue
+            remaining.append(boolfactor)
+        if not remaining:
+            return BoolConstantNode(True)
+        result = remaining[0]
+        for boolfactor in remaining[1:]:
+            result = AndExprNode(result, boolfactor)
+        return result
+
+    def fold_NotExprNode(self, node):
+        node.boolexpr = yield self.fold(node.boolexpr)
+        if isinstance(node.boolexpr, BoolConstantNode):
+            return BoolConstantNode(not node.boolexpr.value)
+        return node
+
+    def fold_RelExprNode(self, node):
+        node.expression1 = yield self.fold(node.expression1)
+        node.expression2 = yield self.fold(node.expression2)
+        value1 = constant_value(node.expression1)
+        value2 = constant_value(node.expression2)
+        if value1 is None or value2 is None:
+            return node
+        return BoolConstantNode(RELOPS[node.relop](value1, value2))
+
+    def fold_BoolConstantNode(self, node):
+        return node
+
+    # Arithmetic expressions, a result that is known becomes a FactorNode of the number
+
+    def fold_ExpressionNode(self, node):
+        # a + b - c ... is folded with a loop from the bottom of the chain, like code_gen does
+        chain = left_chain(node, ExpressionNode, 'left')
+        left = yield self.fold(chain[-1].left)
+        for link in reversed(chain):
+            link.left = left
+            link.right = yield self.fold(link.right)
+            value = compute(link.addop, constant_value(link.left), constant_value(link.right))
+            left = link if value is None else FactorNode(value)
+        return left
+
+    def fold_TermNode(self, node):
+        chain = left_chain(node, TermNode, 'left')
+        left = yield self.fold(chain[-1].left)
+        for link in reversed(chain):
+            link.left = left
+            link.right = yield self.fold(link.right)
+            value = compute(link.mulop, constant_value(link.left), constant_value(link.right))
+            left = link if value is None else FactorNode(value)
+        return left
+
+    def fold_FactorNode(self, node):
+        if isinstance(node.attribute, str) and node.attribute in self.constants:
+            return FactorNode(self.constants[node.attribute])
+        return node
+
+    def fold_CastIntExpressionNode(self, node):
+        node.expression = yield self.fold(node.expression)
+        value = constant_value(node.expression)
+        return node if value is None else FactorNode(int(value))
+
+    def fold_CastFloatExpressionNode(self, node):
+        node.expression = yield self.fold(node.expression)
+        value = constant_value(node.expression)
+        return node if value is None else FactorNode(float(value))
+
+
+RELOPS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+# Returns the number an expression stands for, or None if it isn't a number
+def constant_value(node):
+    if isinstance(node, FactorNode) and not isinstance(node.attribute, str):
+        return node.attribute
+    return None
+
+
+# Computes value1 op value2 like the QUAD instruction code gen would emit for it, or returns None if it can't be done
+# at compile time
+def compute(operator, value1, value2):
+    if value1 is None or value2 is None:
+        return None
+    exp_type = get_expression_type(type_name(value1), type_name(value2))
+    if exp_type == "float":
+        value1, value2 = float(value1), float(value2)
+    if operator == '/':
+        if value2 == 0:
+            return None
+        if exp_type == "int":
+            # IDIV truncates the quotient
+            quotient = abs(value1) // abs(value2)
+            return quotient if (value1 < 0) == (value2 < 0) else -quotient
+    result = ARITHMETIC[operator](value1, value2)
+    # a float that can't be written as a QUAD number (inf, nan, 1e-05) is left to be computed at run time
+    if exp_type == "float" and (not math.isfinite(result) or 'e' in repr(result)):
+        return None
+    return result
+
+
+ARITHMETIC = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+}
+
+
+def type_name(value):
+    return "float" if isinstance(value, float) else "int"
+
+
+# True if evaluating an expression (arithmetic or boolean) can fail at run time, which is a division whose divisor
+# isn't a number other than 0
+def can_fail(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, TermNode) and node.mulop == '/' and not constant_value(node.right):
+            return True
+        for name in EXPRESSION_CHILDREN.get(type(node), ()):
+            child = getattr(node, name)
+            if child is not None:
+                stack.append(child)
+    return False
+
+
+EXPRESSION_CHILDREN = {
+    OrExprNode: ('boolterm1', 'boolterm2'),
+    AndExprNode: ('boolfactor1', 'boolfactor2'),
+    NotExprNode: ('boolexpr',),
+    RelExprNode: ('expression1', 'expression2'),
+    ExpressionNode: ('left', 'right'),
+    TermNode: ('left', 'right'),
+    CastIntExpressionNode: ('expression',),
+    CastFloatExpressionNode: ('expression',),
+}
+
+
+# Returns the identifiers assigned (or read by input) anywhere inside a statement, and the same set for every while
+# inside it (id of the node -> set). the statements are walked once, children before their parent, so nested loops
+# don't walk their bodies again and again
+def assigned_identifiers(stmt):
+    assigned = {}
+    loops = {}
+    stack = [(stmt, False)]
+    while stack:
+        node, children_done = stack.pop()
+        children = statement_children(node)
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        identifiers = set()
+        if isinstance(node, (AssignmentStmtNode, InputStmtNode)):
+            identifiers.add(node.identifier)
+        for child in children:
+            identifiers |= assigned.pop(id(child))
+        assigned[id(node)] = identifiers
+        if isinstance(node, WhileStmtNode):
+            loops[id(node)] = identifiers
+    return assigned[id(stmt)], loops
+
+
+def statement_children(node):
+    if isinstance(node, StmtListNode):
+        return node.stmts
+    if isinstance(node, IfStmtNode):
+        return [node.true_stmt, node.false_stmt]
+    if isinstance(node, WhileStmtNode):
+        return [node.stmt]
+    return []
@@ -1,34 +1,196 @@
-from cpq_parser import parse_input
+from contextlib import nullcontext
+from functools import partial
+from types import SimpleNamespace
+import glob
+import os
 import sys
 
+import compile_stats
+
+USAGE = ("Usage: cpq.py [-O] [--temps] [--dead-code] [--binary] [cache options] [-o <file.qud | ->] <filename>.ou\n"
+         "       cpq.py [-O] [--temps] [--dead-code] [--binary] [cache options] [-j <workers>] "
+         "<file.ou | directory | glob> ...\n"
+         "  -O                  optimize: constant folding, the peephole optimizer, value numbering,\n"
+         "                      dead code elimination, loop-invariant code motion and temp allocation\n"
+         "  --temps             report how many temps the code uses and the most that are live at once\n"
+         "  --dead-code         report how many instructions dead code elimination removed (with -O)\n"
+         "  --binary            write the code in the binary format (<filename>.qbc) instead of the text\n"
+         "  -o <file.qud | ->   where to write the code of a single file (default <filename>.qud), - is stdout\n"
+         "  --no-cache          always compile, don't use the compile cache\n"
+         "  --cache-dir <dir>   directory of the compile cache (default $CPQ_CACHE_DIR or ~/.cache/cpq)\n"
+         "  --cache-size <MB>   size cap of the compile cache, the least recently used entries are removed\n"
+         "  --cache-stats       write the hits / misses of the compile cache to stderr\n"
+         "  --stats             write the time and the memory of every phase and the counts of tokens, AST nodes,\n"
+         "                      temps, labels and instructions to stderr as JSON, a line per file")
+
+# Options that ask for a report of the session (CompilationSession.REPORTS) on stderr
+REPORT_OPTIONS = {'--temps': 'temps', '--dead-code': 'dead-code'}
 
-if __name__ == "__main__":
-    # Check if a filename is provided as a command-line argument
-    if len(sys.argv) != 2:
-        print("Usage: cpq.py <filename>.ou")
-        sys.exit(1)
 
-    # Get the filename from command-line argument
-    file_path = sys.argv[1]
+# Splits the command line arguments into the options and the input paths
+def parse_arguments(argv):
+    options = SimpleNamespace(jobs=None, optimize=False, reports=[], paths=[], cache=True, cache_dir=None,
+                              cache_size=None, cache_stats=False, output=None, stats=False, binary=False)
+    i = 0
+    while i < len(argv):
+        if argv[i] in ('-j', '--jobs'):
+            if i + 1 == len(argv) or not argv[i + 1].isdigit() or int(argv[i + 1]) < 1:
+                print(USAGE)
+                sys.exit(1)
+            options.jobs = int(argv[i + 1])
+            i += 2
+        elif argv[i] == '-O':
+            options.optimize = True
+            i += 1
+        elif argv[i] in REPORT_OPTIONS:
+            options.reports.append(REPORT_OPTIONS[argv[i]])
+            i += 1
+        elif argv[i] == '--no-cache':
+            options.cache = False
+            i += 1
+        elif argv[i] == '--cache-stats':
+            options.cache_stats = True
+            i += 1
+        elif argv[i] == '--stats':
+            options.stats = True
+            i += 1
+        elif argv[i] == '--binary':
+            options.binary = True
+            i += 1
+        elif argv[i] == '-o':
+            if i + 1 == len(argv):
+                print(USAGE)
+                sys.exit(1)
+            options.output = argv[i + 1]
+            i += 2
+        elif argv[i] in ('--cache-dir', '--cache-size'):
+            if i + 1 == len(argv) or (argv[i] == '--cache-size' and not argv[i + 1].isdigit()):
+                print(USAGE)
+                sys.exit(1)
+            if argv[i] == '--cache-dir':
+                options.cache_dir = argv[i + 1]
+            else:
+                options.cache_size = int(argv[i + 1]) * 1024 * 1024
+            i += 2
+        else:
+            options.paths.append(argv[i])
+            i += 1
+    return options
 
 
+# The compile cache the options ask for, None with --no-cache
+def open_cache(options):
+    if not options.cache:
+        return None
+    from compile_cache import CompileCache
+    return CompileCache(options.cache_dir, options.cache_size)
+
+
+# compile_text compiles the text of the program, see batch.compile_file. output is the path of the .qud file, '-' is
+# stdout (the syntax errors go to stderr then, so stdout has only the code). stats is a CompileStats that gets the
+# phases of the compile, or None. with binary the code is written in the binary format (quad_binary.py), to
+# <filename>.qbc by default
+def compile_single(file_path, optimize=False, reports=(), cache=None, compile_text=None, output=None, stats=None,
+                   binary=False):
+    from file_io import open_output, open_source, write_binary, write_quad
+
+    def phase(name):
+        return stats.phase(name) if stats is not None else nullcontext()
+
     # Check if the extensions of the file is .ou
     if not file_path.endswith('.ou'):
         print("Error: The file extension must be .ou")
         sys.exit(1)
     file_name=file_path[:-3]
-    
-    # Open the file for reading
-    with open(file_path, "r") as file:
-        content = file.read()
-        ast = parse_input(content)
-        try:
-            quad = ast.code_gen()
-            with open(f'{file_name}.qud', 'w') as file:
-                file.write(quad)
-                file.write('Yahel Megidish')
+    target = output or file_name + ('.qbc' if binary else '.qud')
+
+    # Map the file for reading, the compiler reads the text from the mapped bytes
+    with open_source(file_path) as content:
+        # A program compiled before is taken from the cache, without importing the compiler at all
+        if cache is not None:
+            with phase('cache'):
+                key = cache.key(content, optimize, binary)
+                cached_reports = cache.fetch(key, target)
+            cache.stats.record(cached_reports is not None)
+            if stats is not None:
+                stats.cached = cached_reports is not None
+            if cached_reports is not None:
                 sys.stderr.write('Yahel Megidish')
+                for name in reports:
+                    sys.stderr.write(f"\n{cached_reports[name]}")
+                return
+        if compile_text is None:
+            from compiler import compile_with_diagnostics
+            compile_text = partial(compile_with_diagnostics, text=False)
 
-        except:
-            sys.stderr.write('\nError could not create output file.')
+        # the syntax errors go to stdout and the semantic errors to stderr
+        result = compile_text(content, optimize, stats=stats is not None)
+    if stats is not None and 'stats' in result:
+        stats.merge(result['stats'])
+    (sys.stderr if target == '-' else sys.stdout).write(result['stdout'])
+    sys.stderr.write(result['stderr'])
+    try:
+        if result['quad'] is None:
+            raise RuntimeError(result['exception'])
+        # the code is streamed from the instructions to a temporary file that replaces the .qud file once all of it
+        # was written
+        with phase('write'), open_output(target, binary) as file:
+            (write_binary if binary else write_quad)(file, result['quad'])
+        sys.stderr.write('Yahel Megidish')
+        for name in reports:
+            sys.stderr.write(f"\n{result['reports'][name]}")
+        # only programs without errors are cached, the messages of the others have to be printed every time
+        if cache is not None and target != '-' and not result['stdout'] and not result['stderr']:
+            cache.store(key, target, result['reports'])
+            cache.evict()
 
+    except:
+        sys.stderr.write('\nError could not create output file.')
+
+
+# A single file keeps the original behaviour, anything else is compiled in batch mode
+def is_single(options):
+    paths = options.paths
+    return len(paths) == 1 and options.jobs is None and not os.path.isdir(paths[0]) and not glob.has_magic(paths[0])
+
+
+# Returns the exit code. compile_text compiles the text of a program (the client of the compile server passes its own)
+def main(argv, compile_text=None):
+    options = parse_arguments(argv)
+    # Check if a filename is provided as a command-line argument
+    if not options.paths:
+        print(USAGE)
+        return 1
+
+    # -o names the output of a single file, the binary format isn't written to stdout
+    if options.output is not None and (not is_single(options) or (options.binary and options.output == '-')):
+        print(USAGE)
+        return 1
+
+    cache = open_cache(options)
+    # the stats are collected for --stats and for the hooks of compile_stats.py
+    collect_stats = options.stats or bool(compile_stats.hooks)
+    if is_single(options):
+        file_stats = compile_stats.CompileStats() if collect_stats else None
+        compile_single(options.paths[0], options.optimize, options.reports, cache, compile_text, options.output,
+                       file_stats, options.binary)
+        if file_stats is not None:
+            if options.stats:
+                sys.stderr.write("\n")
+            compile_stats.publish(options.paths[0], file_stats.as_dict(), sys.stderr if options.stats else None)
+        failed = 0
+    else:
+        from batch import run_batch
+        failed = run_batch(options.paths, options.jobs, optimize=options.optimize, reports=options.reports,
+                           cache=cache, compile_text=compile_text, collect_stats=collect_stats,
+                           write_stats=options.stats, binary=options.binary)
+    if cache is not None:
+        this_run = cache.stats
+        totals = cache.save_stats()
+        if options.cache_stats:
+            sys.stderr.write(f"\ncache: {this_run} (all runs: {totals})\n{cache.summary()}\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,75 @@
+# This file is a drop-in replacement for cpq.py that sends the programs to the compile server (cpq_server.py) instead
+# of compiling them itself, so it never imports the lexer or the parser. It takes the same arguments and writes the
+# same files, messages and exit code as cpq.py (the compile cache works the same too). If no server is running it
+# compiles in the same process like cpq.py would.
+# In batch mode the files are sent by -j threads, each with its own connection, the server compiles them in parallel.
+#
+# Usage: python cpq_client.py <the arguments of cpq.py>   (the server socket is $CPQ_SOCKET or the default one)
+import itertools
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+import cpq
+
+# the server listens there too
+DEFAULT_SOCKET = os.environ.get('CPQ_SOCKET', os.path.join(tempfile.gettempdir(), f'cpq-{os.getuid()}.sock'))
+
+
+class ServerError(Exception):
+    pass
+
+
+class CompileClient:
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.path = path
+        # one connection per thread, a connection has one request at a time here
+        self.local = threading.local()
+        self.ids = itertools.count(1)
+        self.connection()
+
+    def connection(self):
+        if getattr(self.local, 'socket', None) is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(self.path)
+            except OSError:
+                connection.close()
+                raise
+            self.local.socket = connection
+            self.local.reader = connection.makefile('r', encoding='utf-8')
+            self.local.writer = connection.makefile('w', encoding='utf-8')
+        return self.local
+
+    # Same as compiler.compile_with_diagnostics, done by the server. source can be the mmap of the file
+    # (file_io.open_source), it is sent as text
+    def compile(self, source, optimize=False, stats=False):
+        if not isinstance(source, str):
+            source = bytes(source).decode('ascii')
+        connection = self.connection()
+        request_id = next(self.ids)
+        connection.writer.write(json.dumps({'id': request_id, 'source': source, 'optimize': optimize,
+                                            'stats': stats}) + "\n")
+        connection.writer.flush()
+        line = connection.reader.readline()
+        if not line:
+            raise ServerError("the compile server closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ServerError(response['error'])
+        return response
+
+
+def main(argv):
+    try:
+        client = CompileClient()
+    except OSError:
+        return cpq.main(argv)
+    return cpq.main(argv, compile_text=client.compile)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
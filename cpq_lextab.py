@@ -0,0 +1,11 @@
+# cpq_lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'ASSIGN', 'COLON', 'COMMA', 'DIVIDE', 'ELSE', 'EQUAL', 'EQUALORGREATER', 'EQUALORLOWER', 'FLOAT', 'FLOAT_NUM', 'GREATER', 'ID', 'IF', 'INPUT', 'INT', 'INT_NUM', 'LBRACE', 'LESSER', 'LPAREN', 'MINUS', 'MULTIPLY', 'NOT', 'NOTEQUAL', 'OR', 'OUTPUT', 'PLUS', 'RBRACE', 'RPAREN', 'SEMICOLON', 'STATIC_CAST_FLOAT', 'STATIC_CAST_INT', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_newline>\\n+)|(?P<t_ID>[a-zA-Z][a-zA-Z0-9]*)|(?P<t_FLOAT_NUM>\\d+\\.\\d+)|(?P<t_INT_NUM>\\d+)|(?P<t_COMMENT>/\\*(.|\\n)*?\\*/)|(?P<t_OR>\\|\\|)|(?P<t_PLUS>\\+)|(?P<t_MULTIPLY>\\*)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_LBRACE>\\{)|(?P<t_RBRACE>\\})|(?P<t_EQUAL>==)|(?P<t_NOTEQUAL>!=)|(?P<t_EQUALORLOWER><=)|(?P<t_EQUALORGREATER>>=)|(?P<t_AND>&&)|(?P<t_MINUS>-)|(?P<t_DIVIDE>/)|(?P<t_COMMA>,)|(?P<t_COLON>:)|(?P<t_SEMICOLON>;)|(?P<t_ASSIGN>=)|(?P<t_LESSER><)|(?P<t_GREATER>>)|(?P<t_NOT>!)', [None, ('t_newline', 'newline'), ('t_ID', 'ID'), ('t_FLOAT_NUM', 'FLOAT_NUM'), ('t_INT_NUM', 'INT_NUM'), ('t_COMMENT', 'COMMENT'), None, (None, 'OR'), (None, 'PLUS'), (None, 'MULTIPLY'), (None, 'LPAREN'), (None, 'RPAREN'), (None, 'LBRACE'), (None, 'RBRACE'), (None, 'EQUAL'), (None, 'NOTEQUAL'), (None, 'EQUALORLOWER'), (None, 'EQUALORGREATER'), (None, 'AND'), (None, 'MINUS'), (None, 'DIVIDE'), (None, 'COMMA'), (None, 'COLON'), (None, 'SEMICOLON'), (None, 'ASSIGN'), (None, 'LESSER'), (None, 'GREATER'), (None, 'NOT')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
+_signature     = '076a1cc6a704f50201448d164f39a99fdd779932f4fef3716231700466fbdc5e'
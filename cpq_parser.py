@@ -1,10 +1,10 @@
 from lexer import *
 from ply.yacc import yacc
 from ast_nodes import *
-from header import symbol_table
-from sys import stderr
 
-# Define Grammar rules and build the AST
+# Define Grammar rules and build the AST.
+# the rules that just pass their only child up (stmt , stmt_block , expression : term , term : factor) don't create a
+# node for it, the child takes its place in the tree
 def p_program(p):
     '''program :  declarations  stmt_block'''
     p[0] = ProgramNode(p[1],p[2])
@@ -16,6 +16,7 @@ def p_declarations(p):
     if len(p) > 1:
         if p[1] is None:
             p[0] = DeclarationsNode()
+            p[0].add_declaration(p[2])
         else:
             p[1].add_declaration(p[2])
             p[0] = p[1]
@@ -26,17 +27,12 @@ def p_declarations(p):
 def p_declaration(p):
     '''declaration : idlist COLON type SEMICOLON'''
     p[0] = DeclarationNode(p[1], p[3])
-    # Build symbol_table
-    for variable in p[1].ids:
-        if variable in symbol_table:
-            stderr.write(f"Semantic Error: Identifier {variable} was already declared.")
-        symbol_table[variable] = p[3].idtype
 
 
 def p_type(p):
     '''type : INT
             | FLOAT'''
-    p[0] = TypeNode(p[1])
+    p[0] = p[1]
 
 
 def p_idlist(p):
@@ -60,7 +56,7 @@ def p_stmt(p):
             | if_stmt
             | while_stmt
             | stmt_block'''
-    p[0] = StmtNode(p[1])
+    p[0] = p[1]
 
 
 def p_assignment_stmt(p):
@@ -90,21 +86,18 @@ def p_while_stmt(p):
 
 def p_stmt_block(p):
     '''stmt_block : LBRACE stmtlist RBRACE '''
-    p[0] = StmtBlockNode(p[2])
+    p[0] = p[2]
 
 
 def p_stmtlist(p):
     '''stmtlist : stmtlist stmt
                 |'''
     if len(p) > 1:
-        if p[1] is None:
-            p[0] = StmtListNode()
-            p[0].add_stmt(p[2])
-        else:
-            p[1].add_stmt(p[2])
-            p[0] = p[1]
+        p[1].add_stmt(p[2])
+        p[0] = p[1]
+    # an empty block '{}' is an empty list
     else:
-        p[0] = None
+        p[0] = StmtListNode()
 
 
 def p_boolexpr_or(p):
@@ -150,7 +143,7 @@ def p_expression_addop(p):
     if len(p) > 2:
         p[0] = ExpressionNode(p[1],p[2],p[3])
     else:
-        p[0] = ExpressionNode(p[1])
+        p[0] = p[1]
 
 
 def p_addop(p):
@@ -165,7 +158,7 @@ def p_term_mulop(p):
     if len(p) > 2:
         p[0] = TermNode(p[1], p[2], p[3])
     else:
-        p[0] = TermNode(p[1])
+        p[0] = p[1]
 
 
 def p_mulop(p):
@@ -212,13 +205,21 @@ def p_error(p):
         print("Syntax error: Unexpected end of input")
 
 
-# Build the parser
-parser = yacc()
+# Raised for a program the parser couldn't build a tree of, the syntax errors were already printed by p_error
+class ParseError(Exception):
+    pass
+
+
+# Build the parser. the tables are read from cpq_parsetab.py and only generated again when the grammar signature
+# changes, debug=False keeps yacc from writing parser.out
+parser = yacc(debug=False, tabmodule='cpq_parsetab', outputdir=TABLES_DIR)
 
 
-# Function to parse input
-def parse_input(data):
+# Function to parse input, a session passes its own lexer so the shared one is never touched
+def parse_input(data, input_lexer=None):
+    if input_lexer is None:
+        input_lexer = lexer.clone()
     # Tokenize and parse the input
-    lexer.input(data)
-    ast = parser.parse(lexer=lexer)
+    input_lexer.input(data)
+    ast = parser.parse(lexer=input_lexer)
     return ast
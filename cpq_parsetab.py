@@ -0,0 +1,78 @@
+
+# cpq_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'AND ASSIGN COLON COMMA DIVIDE ELSE EQUAL EQUALORGREATER EQUALORLOWER FLOAT FLOAT_NUM GREATER ID IF INPUT INT INT_NUM LBRACE LESSER LPAREN MINUS MULTIPLY NOT NOTEQUAL OR OUTPUT PLUS RBRACE RPAREN SEMICOLON STATIC_CAST_FLOAT STATIC_CAST_INT WHILEprogram :  declarations  stmt_blockdeclarations : declarations declaration\n                    |declaration : idlist COLON type SEMICOLONtype : INT\n            | FLOATidlist : idlist COMMA ID\n              | IDstmt : assignment_stmt\n            | input_stmt\n            | output_stmt\n            | if_stmt\n            | while_stmt\n            | stmt_blockassignment_stmt : ID ASSIGN expression SEMICOLON input_stmt : INPUT LPAREN ID RPAREN SEMICOLON output_stmt : OUTPUT LPAREN expression RPAREN SEMICOLON if_stmt : IF LPAREN boolexpr RPAREN stmt ELSE stmtwhile_stmt : WHILE LPAREN boolexpr RPAREN stmtstmt_block : LBRACE stmtlist RBRACE stmtlist : stmtlist stmt\n                |boolexpr : boolexpr OR boolterm\n                | booltermboolterm : boolterm AND boolfactor\n                | boolfactorboolfactor : NOT LPAREN boolexpr RPAREN\n                  | expression relop expressionrelop : EQUAL\n             | NOTEQUAL\n             | LESSER\n             | GREATER\n             | EQUALORLOWER\n             | EQUALORGREATERexpression : expression addop term\n                  | termaddop : PLUS\n             | MINUSterm : term mulop factor\n            | factormulop : MULTIPLY\n             | DIVIDEfactor : LPAREN expression RPAREN factor : ID factor : INT_NUM factor : FLOAT_NUM factor : STATIC_CAST_INT LPAREN expression RPAREN factor : STATIC_CAST_FLOAT LPAREN expression RPAREN '
+    
+_lr_action_items = {'LBRACE':([0,2,4,5,8,11,12,13,14,15,16,17,18,33,51,63,74,80,81,87,90,92,],[-3,5,-2,-22,5,-20,-21,-9,-10,-11,-12,-13,-14,-4,-15,5,5,-16,-17,-19,5,-18,]),'ID':([0,2,4,5,8,10,11,12,13,14,15,16,17,18,28,29,30,31,32,33,38,51,52,53,54,55,56,57,59,60,63,64,65,66,67,68,69,70,71,72,73,74,80,81,87,90,92,],[-3,7,-2,-22,19,27,-20,-21,-9,-10,-11,-12,-13,-14,34,43,34,34,34,-4,34,-15,34,-37,-38,34,-41,-42,34,34,19,34,34,34,34,-29,-30,-31,-32,-33,-34,19,-16,-17,-19,19,-18,]),'$end':([1,3,11,],[0,-1,-20,]),'RBRACE':([5,8,11,12,13,14,15,16,17,18,51,80,81,87,92,],[-22,11,-20,-21,-9,-10,-11,-12,-13,-14,-15,-16,-17,-19,-18,]),'INPUT':([5,8,11,12,13,14,15,16,17,18,51,63,74,80,81,87,90,92,],[-22,20,-20,-21,-9,-10,-11,-12,-13,-14,-15,20,20,-16,-17,-19,20,-18,]),'OUTPUT':([5,8,11,12,13,14,15,16,17,18,51,63,74,80,81,87,90,92,],[-22,21,-20,-21,-9,-10,-11,-12,-13,-14,-15,21,21,-16,-17,-19,21,-18,]),'IF':([5,8,11,12,13,14,15,16,17,18,51,63,74,80,81,87,90,92,],[-22,22,-20,-21,-9,-10,-11,-12,-13,-14,-15,22,22,-16,-17,-19,22,-18,]),'WHILE':([5,8,11,12,13,14,15,16,17,18,51,63,74,80,81,87,90,92,],[-22,23,-20,-21,-9,-10,-11,-12,-13,-14,-15,23,23,-16,-17,-19,23,-18,]),'COLON':([6,7,27,],[9,-8,-7,]),'COMMA':([6,7,27,],[10,-8,-7,]),'INT':([9,],[25,]),'FLOAT':([9,],[26,]),'ELSE':([11,13,14,15,16,17,18,51,80,81,82,87,92,],[-20,-9,-10,-11,-12,-13,-14,-15,-16,-17,90,-19,-18,]),'ASSIGN':([19,],[28,]),'LPAREN':([20,21,22,23,28,30,31,32,38,41,42,48,52,53,54,55,56,57,59,60,64,65,66,67,68,69,70,71,72,73,],[29,30,31,32,38,38,38,38,38,59,60,66,38,-37,-38,38,-41,-42,38,38,38,38,38,38,-29,-30,-31,-32,-33,-34,]),'SEMICOLON':([24,25,26,34,35,36,37,39,40,61,62,75,76,77,88,89,],[33,-5,-6,-44,51,-36,-40,-45,-46,80,81,-35,-39,-43,-47,-48,]),'INT_NUM':([28,30,31,32,38,52,53,54,55,56,57,59,60,64,65,66,67,68,69,70,71,72,73,],[39,39,39,39,39,39,-37,-38,39,-41,-42,39,39,39,39,39,39,-29,-30,-31,-32,-33,-34,]),'FLOAT_NUM':([28,30,31,32,38,52,53,54,55,56,57,59,60,64,65,66,67,68,69,70,71,72,73,],[40,40,40,40,40,40,-37,-38,40,-41,-42,40,40,40,40,40,40,-29,-30,-31,-32,-33,-34,]),'STATIC_CAST_INT':([28,30,31,32,38,52,53,54,55,56,57,59,60,64,65,66,67,68,69,70,71,72,73,],[41,41,41,41,41,41,-37,-38,41,-41,-42,41,41,41,41,41,41,-29,-30,-31,-32,-33,-34,]),'STATIC_CAST_FLOAT':([28,30,31,32,38,52,53,54,55,56,57,59,60,64,65,66,67,68,69,70,71,72,73,],[42,42,42,42,42,42,-37,-38,42,-41,-42,42,42,42,42,42,42,-29,-30,-31,-32,-33,-34,]),'NOT':([31,32,64,65,66,],[48,48,48,48,48,]),'MULTIPLY':([34,36,37,39,40,75,76,77,88,89,],[-44,56,-40,-45,-46,56,-39,-43,-47,-48,]),'DIVIDE':([34,36,37,39,40,75,76,77,88,89,],[-44,57,-40,-45,-46,57,-39,-43,-47,-48,]),'PLUS':([34,35,36,37,39,40,44,49,58,75,76,77,78,79,86,88,89,],[-44,53,-36,-40,-45,-46,53,53,53,-35,-39,-43,53,53,53,-47,-48,]),'MINUS':([34,35,36,37,39,40,44,49,58,75,76,77,78,79,86,88,89,],[-44,54,-36,-40,-45,-46,54,54,54,-35,-39,-43,54,54,54,-47,-48,]),'RPAREN':([34,36,37,39,40,43,44,45,46,47,50,58,75,76,77,78,79,83,84,85,86,88,89,91,],[-44,-36,-40,-45,-46,61,62,63,-24,-26,74,77,-35,-39,-43,88,89,-23,-25,91,-28,-47,-48,-27,]),'EQUAL':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,68,-35,-39,-43,-47,-48,]),'NOTEQUAL':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,69,-35,-39,-43,-47,-48,]),'LESSER':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,70,-35,-39,-43,-47,-48,]),'GREATER':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,71,-35,-39,-43,-47,-48,]),'EQUALORLOWER':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,72,-35,-39,-43,-47,-48,]),'EQUALORGREATER':([34,36,37,39,40,49,75,76,77,88,89,],[-44,-36,-40,-45,-46,73,-35,-39,-43,-47,-48,]),'AND':([34,36,37,39,40,46,47,75,76,77,83,84,86,88,89,91,],[-44,-36,-40,-45,-46,65,-26,-35,-39,-43,65,-25,-28,-47,-48,-27,]),'OR':([34,36,37,39,40,45,46,47,50,75,76,77,83,84,85,86,88,89,91,],[-44,-36,-40,-45,-46,64,-24,-26,64,-35,-39,-43,-23,-25,64,-28,-47,-48,-27,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'declarations':([0,],[2,]),'stmt_block':([2,8,63,74,90,],[3,18,18,18,18,]),'declaration':([2,],[4,]),'idlist':([2,],[6,]),'stmtlist':([5,],[8,]),'stmt':([8,63,74,90,],[12,82,87,92,]),'assignment_stmt':([8,63,74,90,],[13,13,13,13,]),'input_stmt':([8,63,74,90,],[14,14,14,14,]),'output_stmt':([8,63,74,90,],[15,15,15,15,]),'if_stmt':([8,63,74,90,],[16,16,16,16,]),'while_stmt':([8,63,74,90,],[17,17,17,17,]),'type':([9,],[24,]),'expression':([28,30,31,32,38,59,60,64,65,66,67,],[35,44,49,49,58,78,79,49,49,49,86,]),'term':([28,30,31,32,38,52,59,60,64,65,66,67,],[36,36,36,36,36,75,36,36,36,36,36,36,]),'factor':([28,30,31,32,38,52,55,59,60,64,65,66,67,],[37,37,37,37,37,37,76,37,37,37,37,37,37,]),'boolexpr':([31,32,66,],[45,50,85,]),'boolterm':([31,32,64,66,],[46,46,83,46,]),'boolfactor':([31,32,64,65,66,],[47,47,47,84,47,]),'addop':([35,44,49,58,78,79,86,],[52,52,52,52,52,52,52,]),'mulop':([36,75,],[55,55,]),'relop':([49,],[67,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> declarations stmt_block','program',2,'p_program','cpq_parser.py',7),
+  ('declarations -> declarations declaration','declarations',2,'p_declarations','cpq_parser.py',12),
+  ('declarations -> <empty>','declarations',0,'p_declarations','cpq_parser.py',13),
+  ('declaration -> idlist COLON type SEMICOLON','declaration',4,'p_declaration','cpq_parser.py',26),
+  ('type -> INT','type',1,'p_type','cpq_parser.py',31),
+  ('type -> FLOAT','type',1,'p_type','cpq_parser.py',32),
+  ('idlist -> idlist COMMA ID','idlist',3,'p_idlist','cpq_parser.py',37),
+  ('idlist -> ID','idlist',1,'p_idlist','cpq_parser.py',38),
+  ('stmt -> assignment_stmt','stmt',1,'p_stmt','cpq_parser.py',51),
+  ('stmt -> input_stmt','stmt',1,'p_stmt','cpq_parser.py',52),
+  ('stmt -> output_stmt','stmt',1,'p_stmt','cpq_parser.py',53),
+  ('stmt -> if_stmt','stmt',1,'p_stmt','cpq_parser.py',54),
+  ('stmt -> while_stmt','stmt',1,'p_stmt','cpq_parser.py',55),
+  ('stmt -> stmt_block','stmt',1,'p_stmt','cpq_parser.py',56),
+  ('assignment_stmt -> ID ASSIGN expression SEMICOLON','assignment_stmt',4,'p_assignment_stmt','cpq_parser.py',61),
+  ('input_stmt -> INPUT LPAREN ID RPAREN SEMICOLON','input_stmt',5,'p_input_stmt','cpq_parser.py',66),
+  ('output_stmt -> OUTPUT LPAREN expression RPAREN SEMICOLON','output_stmt',5,'p_output_stmt','cpq_parser.py',71),
+  ('if_stmt -> IF LPAREN boolexpr RPAREN stmt ELSE stmt','if_stmt',7,'p_if_stmt','cpq_parser.py',76),
+  ('while_stmt -> WHILE LPAREN boolexpr RPAREN stmt','while_stmt',5,'p_while_stmt','cpq_parser.py',81),
+  ('stmt_block -> LBRACE stmtlist RBRACE','stmt_block',3,'p_stmt_block','cpq_parser.py',86),
+  ('stmtlist -> stmtlist stmt','stmtlist',2,'p_stmtlist','cpq_parser.py',91),
+  ('stmtlist -> <empty>','stmtlist',0,'p_stmtlist','cpq_parser.py',92),
+  ('boolexpr -> boolexpr OR boolterm','boolexpr',3,'p_boolexpr_or','cpq_parser.py',105),
+  ('boolexpr -> boolterm','boolexpr',1,'p_boolexpr_or','cpq_parser.py',106),
+  ('boolterm -> boolterm AND boolfactor','boolterm',3,'p_boolterm_and','cpq_parser.py',114),
+  ('boolterm -> boolfactor','boolterm',1,'p_boolterm_and','cpq_parser.py',115),
+  ('boolfactor -> NOT LPAREN boolexpr RPAREN','boolfactor',4,'p_boolfactor_not','cpq_parser.py',123),
+  ('boolfactor -> expression relop expression','boolfactor',3,'p_boolfactor_not','cpq_parser.py',124),
+  ('relop -> EQUAL','relop',1,'p_relop','cpq_parser.py',132),
+  ('relop -> NOTEQUAL','relop',1,'p_relop','cpq_parser.py',133),
+  ('relop -> LESSER','relop',1,'p_relop','cpq_parser.py',134),
+  ('relop -> GREATER','relop',1,'p_relop','cpq_parser.py',135),
+  ('relop -> EQUALORLOWER','relop',1,'p_relop','cpq_parser.py',136),
+  ('relop -> EQUALORGREATER','relop',1,'p_relop','cpq_parser.py',137),
+  ('expression -> expression addop term','expression',3,'p_expression_addop','cpq_parser.py',142),
+  ('expression -> term','expression',1,'p_expression_addop','cpq_parser.py',143),
+  ('addop -> PLUS','addop',1,'p_addop','cpq_parser.py',151),
+  ('addop -> MINUS','addop',1,'p_addop','cpq_parser.py',152),
+  ('term -> term mulop factor','term',3,'p_term_mulop','cpq_parser.py',157),
+  ('term -> factor','term',1,'p_term_mulop','cpq_parser.py',158),
+  ('mulop -> MULTIPLY','mulop',1,'p_mulop','cpq_parser.py',166),
+  ('mulop -> DIVIDE','mulop',1,'p_mulop','cpq_parser.py',167),
+  ('factor -> LPAREN expression RPAREN','factor',3,'p_factor_expression','cpq_parser.py',172),
+  ('factor -> ID','factor',1,'p_factor_id','cpq_parser.py',177),
+  ('factor -> INT_NUM','factor',1,'p_factor_int_num','cpq_parser.py',182),
+  ('factor -> FLOAT_NUM','factor',1,'p_factor_float_num','cpq_parser.py',187),
+  ('factor -> STATIC_CAST_INT LPAREN expression RPAREN','factor',4,'p_cast_int','cpq_parser.py',192),
+  ('factor -> STATIC_CAST_FLOAT LPAREN expression RPAREN','factor',4,'p_cast_float','cpq_parser.py',197),
+]
@@ -0,0 +1,178 @@
+# This file implements the compile server: a long running process that keeps the lexer and the parser tables loaded
+# so a compile doesn't pay for starting Python and importing PLY. The programs are compiled by a pool of worker
+# processes that imported the compiler once when they started (like batch.py), every request gets a fresh
+# CompilationSession, so requests run at the same time without sharing any state.
+#
+# The protocol is JSON lines, one request per line and one response per line, on a Unix socket or on stdin / stdout:
+#   {"id": 1, "source": "<CPL program>", "optimize": false, "stats": false}
+#   {"id": 1, "quad": "<QUAD code or null>", "stdout": "<syntax errors>", "stderr": "<semantic errors>",
+#    "exception": "<what stopped the compiler or null>", "reports": {"temps": "...", "dead-code": "..."}}
+# with "stats": true the response has the stats of the compile too, "stats": {...} (compile_stats.py)
+#   {"id": 2, "command": "shutdown"} stops the server, the response is {"id": 2, "shutdown": true}
+# A connection can send many requests without waiting, the responses come back in the order of the requests.
+# A request that can't be read gets {"id": ..., "error": "<message>"}. cpq_client.py is a client with the command
+# line of cpq.py.
+#
+# Usage: python cpq_server.py [--stdio] [--socket <path>] [-j <workers>]
+from concurrent.futures import Future, ProcessPoolExecutor
+import io
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+
+from batch import init_worker
+from compiler import compile_with_diagnostics
+from cpq_client import DEFAULT_SOCKET
+
+USAGE = "Usage: cpq_server.py [--stdio] [--socket <path>] [-j <workers>]"
+
+
+# Returns (request, None) for a compile request, (request, response) for one that is answered right away
+def read_request(line):
+    try:
+        request = json.loads(line)
+    except ValueError as error:
+        return {}, {'id': None, 'error': f"invalid JSON: {error}"}
+    if not isinstance(request, dict):
+        return {}, {'id': None, 'error': "a request must be a JSON object"}
+    request_id = request.get('id')
+    if request.get('command') is not None:
+        if request['command'] == 'shutdown':
+            return request, {'id': request_id, 'shutdown': True}
+        return request, {'id': request_id, 'error': f"unknown command {request['command']!r}"}
+    if not isinstance(request.get('source'), str):
+        return request, {'id': request_id, 'error': "a request must have the source text of the program"}
+    return request, None
+
+
+def answered(response):
+    future = Future()
+    future.set_result(response)
+    return future
+
+
+# Serves the requests of one connection until it ends or asks for a shutdown (returns True then).
+# the lines are read here and compiled by the executor while a thread writes the responses in order
+def serve(reader, writer, executor):
+    responses = queue.Queue()
+
+    def write_responses():
+        while True:
+            item = responses.get()
+            if item is None:
+                return
+            request_id, future = item
+            try:
+                response = future.result()
+                if 'id' not in response:
+                    response = dict(response, id=request_id)
+            except Exception as error:
+                # a worker that died (BrokenProcessPool) or a request too big to send to it
+                response = {'id': request_id, 'error': f"{type(error).__name__}: {error}"}
+            writer.write(json.dumps(response) + "\n")
+            writer.flush()
+
+    writer_thread = threading.Thread(target=write_responses)
+    writer_thread.start()
+    shutdown = False
+    try:
+        for line in reader:
+            if not line.strip():
+                continue
+            request, response = read_request(line)
+            if response is not None:
+                responses.put((request.get('id'), answered(response)))
+                if response.get('shutdown'):
+                    shutdown = True
+                    break
+                continue
+            future = executor.submit(compile_with_diagnostics, request['source'], bool(request.get('optimize')),
+                                     stats=bool(request.get('stats')))
+            responses.put((request.get('id'), future))
+    finally:
+        responses.put(None)
+        writer_thread.join()
+    return shutdown
+
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+        writer = io.TextIOWrapper(self.wfile, encoding='utf-8')
+        try:
+            if serve(reader, writer, self.server.executor):
+                # shutdown() waits for serve_forever to return, it can't be called from the thread of a request
+                threading.Thread(target=self.server.shutdown).start()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, executor):
+        self.executor = executor
+        super().__init__(path, CompileHandler)
+
+
+# A socket file is left behind by a server that was killed, it is removed unless a server still answers on it
+def remove_stale_socket(path):
+    if not os.path.exists(path):
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return False
+    except OSError:
+        os.remove(path)
+        return True
+    finally:
+        probe.close()
+
+
+def main(argv):
+    stdio = False
+    path = DEFAULT_SOCKET
+    jobs = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--stdio':
+            stdio = True
+            i += 1
+        elif argv[i] == '--socket' and i + 1 < len(argv):
+            path = argv[i + 1]
+            i += 2
+        elif argv[i] in ('-j', '--jobs') and i + 1 < len(argv) and argv[i + 1].isdigit() and int(argv[i + 1]) > 0:
+            jobs = int(argv[i + 1])
+            i += 2
+        else:
+            print(USAGE)
+            return 1
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1, initializer=init_worker) as executor:
+        # starts the workers now, before the threads of the server exist, so every one of them is warm when the
+        # first request comes
+        executor.submit(int).result()
+        if stdio:
+            serve(sys.stdin, sys.stdout, executor)
+            return 0
+        if not remove_stale_socket(path):
+            sys.stderr.write(f"a compile server is already running on {path}\n")
+            return 1
+        with CompileServer(path, executor) as server:
+            os.chmod(path, 0o600)
+            sys.stderr.write(f"cpq server listening on {path}\n")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
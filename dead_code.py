@@ -0,0 +1,92 @@
+# This file implements dead code elimination on the control flow graph of the IR (cfg.py):
+# - a JMPZ on a number always or never jumps, it becomes a JUMP or is removed.
+# - the blocks that can't be reached from the first block are removed, with their labels.
+# - an instruction that writes a variable or a temp whose value is never read afterwards (on any path) is removed.
+#   a read by an instruction that is removed doesn't count, so a chain of stores that only feed each other (a counter
+#   that only counts itself in a loop, say) goes away too, and all the dead stores are found with one dataflow.
+# Input and output are what the program does, so IINP / RINP / IPRT / RPRT are never removed, and neither is a
+# division whose divisor isn't a known number (a division by zero has to fail at run time like it did before).
+from cfg import build_cfg, compute_liveness, flatten
+from quad_ir import *
+
+
+# Returns the instructions without the dead code and the number of instructions that were removed
+def eliminate_dead_code(instructions):
+    count = len(instructions)
+    instructions = decide_branches(instructions)
+    blocks = remove_unreachable_blocks(build_cfg(instructions))
+    compute_liveness(blocks, live_before=live_before)
+    remove_dead_stores(blocks)
+    # the blocks point at each other, their live sets would wait for the garbage collector
+    for block in blocks:
+        block.live_in = block.live_out = None
+    instructions = flatten(blocks)
+    return instructions, count - len(instructions)
+
+
+def decide_branches(instructions):
+    result = []
+    for instruction in instructions:
+        if instruction.opcode == JMPZ and not isinstance(instruction.src1, str):
+            if instruction.src1 != 0:
+                continue
+            instruction = Instruction(JUMP, label=instruction.label)
+        result.append(instruction)
+    return result
+
+
+# Keeps the blocks that some path from the first block reaches. a block that falls through to the next one keeps it,
+# so removing blocks never changes where the remaining ones fall through to
+def remove_unreachable_blocks(blocks):
+    reached = set()
+    stack = [blocks[0]] if blocks else []
+    while stack:
+        block = stack.pop()
+        if block not in reached:
+            reached.add(block)
+            stack.extend(block.successors)
+    blocks = [block for block in blocks if block in reached]
+    for index, block in enumerate(blocks):
+        block.index = index
+        block.predecessors = [predecessor for predecessor in block.predecessors if predecessor in reached]
+    return blocks
+
+
+# An instruction that only computes its dest and can't fail, it can be removed (or moved, loop_invariants.py).
+# value_numbering.py and loop_invariants.py use it too
+def is_removable(instruction):
+    opcode = instruction.opcode
+    if opcode not in PURE_OPCODES:
+        return False
+    # IDIV / RDIV by a number that isn't 0 can't fail
+    return opcode not in (IDIV, RDIV) or (not isinstance(instruction.src2, str) and instruction.src2 != 0)
+
+
+# The names live before the instructions of a block, given the names live after it. an instruction that would be
+# removed (its dest isn't live after it) reads nothing, so with it the live sets of compute_liveness are the ones of
+# the code that is left once the dead stores are removed
+def live_before(block, live):
+    live = set(live)
+    for instruction in reversed(block.instructions):
+        if instruction.dest not in live and is_removable(instruction):
+            continue
+        if instruction.dest is not None:
+            live.discard(instruction.dest)
+        live.update(operands_read(instruction))
+    return live
+
+
+# Removes the instructions whose dest isn't live after them, walking every block backwards from its live_out
+def remove_dead_stores(blocks):
+    for block in blocks:
+        live = set(block.live_out)
+        kept = []
+        for instruction in reversed(block.instructions):
+            if instruction.dest not in live and is_removable(instruction):
+                continue
+            if instruction.dest is not None:
+                live.discard(instruction.dest)
+            live.update(operands_read(instruction))
+            kept.append(instruction)
+        kept.reverse()
+        block.instructions = kept
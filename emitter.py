@@ -0,0 +1,23 @@
+# This file defines the Emitter, the single buffer all the code_gen functions append their QUAD instructions to.
+# Every instruction is appended once as an Instruction record of the IR (quad_ir.py) and the whole program is turned
+# into text (or written to a file) only once at the end, so code gen takes time and memory linear in the size of the
+# program instead of copying the code of every sub tree again at every level of the tree.
+from quad_ir import Instruction, LABEL, program_text, write_program
+
+
+class Emitter:
+    def __init__(self):
+        self.instructions = []
+
+    # Appends one instruction of the IR
+    def emit(self, opcode, dest=None, src1=None, src2=None, label=None):
+        self.instructions.append(Instruction(opcode, dest, src1, src2, label))
+
+    def label(self, label):
+        self.instructions.append(Instruction(LABEL, label=label))
+
+    def getvalue(self):
+        return program_text(self.instructions)
+
+    def write(self, file):
+        write_program(self.instructions, file)
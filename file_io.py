@@ -0,0 +1,73 @@
+# This file reads the .ou files and writes the .qud (or .qbc) files of cpq.py and batch.py without holding a whole
+# file in a string. A source file is memory-mapped and the tokenizer scans the mapped bytes, so the text of the program
+# is never copied into a str. A .qud file is written line by line from the instructions of the IR into a temporary file
+# next to the output, which is renamed over the output only once all of it was written: a compile that fails never
+# leaves a partial file, and a .qud file that is a hard link to a cache entry is replaced instead of written into.
+from contextlib import contextmanager
+import mmap
+import os
+import re
+import sys
+import threading
+
+from quad_binary import encode
+from quad_ir import SIGNATURE, parse_program, write_program
+
+# A file with one of these bytes is read as text instead: a non-ASCII character is a single character for the PLY
+# lexer (in the positions of the tokens and in the illegal character messages) but several bytes, and text mode
+# reads \r\n as \n
+TEXT_ONLY_BYTES = re.compile(rb'[\r\x80-\xff]')
+
+
+# The text of a source file for compile_text, valid inside the with block: a read-only mmap of the file, or a str
+# for an empty file (it can't be mapped) and for the files of TEXT_ONLY_BYTES
+@contextmanager
+def open_source(path):
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield ''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if TEXT_ONLY_BYTES.search(data) is None:
+                yield data
+                return
+    with open(path, 'r') as file:
+        yield file.read()
+
+
+# Opens the .qud file (the .qbc file with binary) at path for writing, '-' is stdout. the code is written to a
+# temporary file in the same directory that replaces path when the with block ends, or is removed if the block raises
+@contextmanager
+def open_output(path, binary=False):
+    if path == '-':
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    directory, name = os.path.split(path)
+    # a name of its own for every thread, the client of the compile server writes the files of a batch from threads
+    temporary = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporary, 'wb' if binary else 'w') as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+# Writes the code of a program, the instructions of the IR or the text of a .qud file, and the signature line
+def write_quad(file, code):
+    if isinstance(code, str):
+        file.write(code)
+    else:
+        write_program(code, file)
+    file.write(SIGNATURE)
+
+
+# Writes the code of a program, the instructions of the IR or the text of a .qud file, in the binary format
+# (quad_binary.py) to a file opened with binary=True
+def write_binary(file, code):
+    file.write(encode(parse_program(code) if isinstance(code, str) else code))
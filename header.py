@@ -1,19 +1,6 @@
-symbol_table = {}
-
-temp_counter = 0  # Initialize temp_counter globally
-label_counter = 0  # Initialize label_counter globally
-
-
-def gen_temp():
-    global temp_counter  # Declare temp_counter as global
-    temp_counter += 1
-    return f"t{temp_counter}"
-
-
-def gen_label():
-    global label_counter  # Declare temp_counter as global
-    label_counter += 1
-    return f"L{label_counter}"
+# The symbol table and the temp / label counters used to live here as module globals, they are now owned by
+# CompilationSession (compiler.py) so that every compiled program starts from a clean state.
+from types import GeneratorType
 
 
 def get_expression_type(type1,type2):
@@ -21,3 +8,35 @@ def get_expression_type(type1,type2):
         return "float"
     else:
         return "int"
+
+
+# Runs a walk over the AST with an explicit stack instead of Python recursion.
+# the walk of a node is a generator that yields the walk of a child (another generator) and gets the child's result
+# back, a child whose walk isn't a generator (a leaf) is already its own result
+def run_iteratively(walk):
+    stack = [walk]
+    result = None
+    while stack:
+        try:
+            child = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+            continue
+        if isinstance(child, GeneratorType):
+            stack.append(child)
+            result = None
+        else:
+            result = child
+    return result
+
+
+# Returns the chain of nodes of the same class on the left side of node, starting with node itself.
+# for example a + b + c gives [(a + b) + c, a + b]
+def left_chain(node, node_class, child):
+    chain = [node]
+    while True:
+        left = getattr(chain[-1], child)
+        if not isinstance(left, node_class):
+            return chain
+        chain.append(left)
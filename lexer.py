@@ -1,4 +1,11 @@
 from ply.lex import lex
+import hashlib
+import os
+import sys
+
+# The lexer and parser tables are generated into the directory of the source files (never the working directory)
+TABLES_DIR = os.path.dirname(os.path.abspath(__file__))
+LEXTAB = 'cpq_lextab'
 
 # List of token names
 tokens = (
@@ -91,10 +98,43 @@ reserved = {
 }
 
 
-# Build the lexer
-lexer = lex()
-
-
+# Hash of everything the lexer table is built from, used to know when the saved table is out of date
+def rules_signature():
+    module = sys.modules[__name__]
+    parts = [repr(tokens), repr(sorted(reserved.items())), t_ignore]
+    for name in sorted(vars(module)):
+        if name.startswith('t_'):
+            rule = getattr(module, name)
+            parts.append(f"{name}={rule.__doc__ if callable(rule) else rule}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+# Loads the precomputed lexer table, the rules are only compiled again if they changed since the table was written
+def build_lexer():
+    signature = rules_signature()
+    try:
+        lextab = __import__(LEXTAB)
+        up_to_date = getattr(lextab, '_signature', None) == signature
+    except ImportError:
+        up_to_date = False
+    if up_to_date:
+        return lex(optimize=1, lextab=LEXTAB)
+    new_lexer = lex()
+    write_lextab(new_lexer, signature)
+    return new_lexer
+
+
+def write_lextab(new_lexer, signature):
+    try:
+        new_lexer.writetab(LEXTAB, TABLES_DIR)
+        with open(os.path.join(TABLES_DIR, LEXTAB + '.py'), 'a') as file:
+            file.write(f"_signature     = {signature!r}\n")
+    except IOError:
+        # The tables are only a cache, a read only installation just builds the lexer every time
+        pass
+    sys.modules.pop(LEXTAB, None)
 
 
+# Build the lexer
+lexer = build_lexer()
 
@@ -0,0 +1,167 @@
+# This file implements loop-invariant code motion. A computation inside a loop whose operands aren't assigned
+# anywhere in the loop gives the same value on every trip, so it is moved to a preheader, code placed right before the
+# label the loop starts at, and runs once before the loop:
+#       L1:                          ISUB t2 n 1
+#       IGRT t1 i 0                  L1:
+#       JMPZ L2 t1                   IGRT t1 i 0
+#       ISUB t2 n 1       ->         JMPZ L2 t1
+#       IMLT x t2 i                  IMLT x t2 i
+#       ...                          ...
+#       JUMP L1                      JUMP L1
+# The loops are found on the CFG (cfg.find_loops), inner loops first so what is moved out of an inner loop can move
+# out of the loops around it too. A temp is moved with its instruction when it is written once and only read inside
+# the loop. Any other invariant computation (an assignment to a variable, which may be read after a loop that never
+# ran) is computed into a new temp in the preheader and the loop copies it. A division that may be by zero isn't
+# moved, it could fail before a loop that never runs.
+from collections import defaultdict
+
+from cfg import build_cfg, compute_liveness, find_loops
+from dead_code import is_removable
+from peephole import INT_RESULT_OPCODES
+from quad_ir import *
+
+
+# new_temp and new_label create the temps and the labels of the preheaders (CompilationSession.gen_temp / gen_label)
+def hoist_loop_invariants(instructions, new_temp, new_label):
+    blocks = build_cfg(instructions)
+    loops, block_loop = find_loops(blocks)
+    if not loops:
+        return instructions
+    compute_liveness(blocks)
+    motion = LoopInvariantMotion(blocks, block_loop, new_temp)
+    for loop in loops:
+        motion.collect_written_names(loop)
+        if motion.can_have_preheader(loop):
+            motion.hoist(loop)
+    return motion.layout(new_label)
+
+
+class LoopInvariantMotion:
+    def __init__(self, blocks, block_loop, new_temp):
+        self.blocks = blocks
+        self.block_loop = block_loop
+        self.new_temp = new_temp
+        # header block -> the instructions of the preheader of its loop
+        self.preheaders = {}
+        self.loop_of_header = {}
+        # id of an instruction -> the innermost loop it is in (None outside loops), the instructions of a preheader
+        # are in the loop around the loop they were moved out of
+        self.location = {}
+        # name -> the instructions that write it / read it
+        self.writes = defaultdict(list)
+        self.reads = defaultdict(list)
+        # loop -> the names written anywhere in it (nested loops and their preheaders included)
+        self.written_names = {}
+        for block in blocks:
+            loop = block_loop.get(block)
+            for instruction in block.instructions:
+                self.location[id(instruction)] = loop
+                if instruction.dest is not None:
+                    self.writes[instruction.dest].append(instruction)
+                for operand in operands_read(instruction):
+                    self.reads[operand].append(instruction)
+
+    # The preheader goes right before the header, code that falls through from inside the loop into the header would
+    # run it on every trip
+    def can_have_preheader(self, loop):
+        if not loop.reducible:
+            return False
+        index = loop.header.index
+        if index == 0:
+            return True
+        previous = self.blocks[index - 1]
+        falls_through = not previous.instructions or previous.last().opcode not in (JUMP, HALT)
+        return not (falls_through and loop.contains(self.block_loop.get(previous)))
+
+    # Builds the names written in a loop from its own blocks and the names of its children, which are done by then
+    # (the loops come inner ones first). the set of the largest child is taken over and the others are added to it,
+    # so deeply nested loops don't copy the names of their inner loops again and again
+    def collect_written_names(self, loop):
+        children = [self.written_names.pop(child) for child in loop.children]
+        names = max(children, key=len, default=set())
+        for child, child_names in zip(loop.children, children):
+            if child_names is not names:
+                names |= child_names
+            names.update(instruction.dest for instruction in self.preheaders.get(child.header, ()))
+        for block in loop.blocks:
+            names.update(instruction.dest for instruction in block.instructions)
+        names.discard(None)
+        self.written_names[loop] = names
+
+    def is_invariant(self, instruction, loop):
+        # a division that can fail has to fail where it is, if the loop runs at all
+        if not is_removable(instruction):
+            return False
+        written_names = self.written_names[loop]
+        return not any(operand in written_names for operand in operands_read(instruction))
+
+    # A temp written once, only read in the loop and never read in the loop before it is written can be computed
+    # before the loop instead
+    def can_move(self, instruction, loop):
+        dest = instruction.dest
+        return (type(dest) is Temp and len(self.writes[dest]) == 1 and dest not in loop.header.live_in
+                and all(loop.contains(self.location[id(read)]) for read in self.reads[dest]))
+
+    def hoist(self, loop):
+        preheader = []
+        code = [block.instructions for block in loop.blocks]
+        code += [self.preheaders[child.header] for child in loop.children if child.header in self.preheaders]
+        changed = True
+        while changed:
+            changed = False
+            for instructions in code:
+                kept = []
+                for instruction in instructions:
+                    if self.is_invariant(instruction, loop):
+                        if self.can_move(instruction, loop):
+                            preheader.append(instruction)
+                            self.location[id(instruction)] = loop.parent
+                            # the temp is written only there, it isn't written in the loop anymore
+                            self.written_names[loop].discard(instruction.dest)
+                            changed = True
+                            continue
+                        if instruction.opcode not in (IASN, RASN):
+                            preheader.append(self.compute_into_temp(instruction, loop))
+                            changed = True
+                    kept.append(instruction)
+                instructions[:] = kept
+        if preheader:
+            self.preheaders[loop.header] = preheader
+            self.loop_of_header[loop.header] = loop
+
+    # Returns an instruction that computes the value of the instruction into a new temp before the loop, the
+    # instruction becomes a copy of the temp
+    def compute_into_temp(self, instruction, loop):
+        temp = self.new_temp()
+        hoisted = Instruction(instruction.opcode, temp, instruction.src1, instruction.src2)
+        self.location[id(hoisted)] = loop.parent
+        self.writes[temp].append(hoisted)
+        instruction.opcode = IASN if instruction.opcode in INT_RESULT_OPCODES else RASN
+        instruction.src1 = temp
+        instruction.src2 = None
+        self.reads[temp].append(instruction)
+        return hoisted
+
+    # Returns the instructions with every preheader placed before the header of its loop. jumps from outside the loop
+    # to its header go to a new label at the start of the preheader
+    def layout(self, new_label):
+        result = []
+        for block in self.blocks:
+            preheader = self.preheaders.get(block)
+            if preheader:
+                loop = self.loop_of_header[block]
+                labels = set(block.labels())
+                entries = []
+                for predecessor in block.predecessors:
+                    jump = predecessor.last()
+                    if (jump is not None and jump.opcode in (JUMP, JMPZ) and jump.label in labels
+                            and not loop.contains(self.block_loop.get(predecessor))):
+                        entries.append(jump)
+                if entries:
+                    label = new_label()
+                    result.append(Instruction(LABEL, label=label))
+                    for jump in entries:
+                        jump.label = label
+                result.extend(preheader)
+            result.extend(block.instructions)
+        return result
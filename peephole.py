@@ -0,0 +1,238 @@
+# This file implements the peephole optimizer that runs on the IR (quad_ir.py) between code gen and writing the .qud
+# file. The optimizer is a list of rules, every rule is a function that gets the list of instructions and returns a
+# new list, or None if it found nothing to change. The rules run again and again until none of them changes anything,
+# so a rule can rely on the others to clean up after it. Pass your own list of rules to optimize() to change the set.
+from collections import Counter
+
+from quad_ir import *
+
+# Opcodes whose result is an integer / a real number, used to know when a copy can be folded into its source
+INT_RESULT_OPCODES = frozenset((IASN, IINP, IEQL, INQL, ILSS, IGRT, IADD, ISUB, IMLT, IDIV,
+                                REQL, RNQL, RLSS, RGRT, RTOI))
+REAL_RESULT_OPCODES = frozenset((RASN, RINP, RADD, RSUB, RMLT, RDIV, ITOR))
+
+MAX_ROUNDS = 100
+
+
+def optimize(instructions, rules=None):
+    if rules is None:
+        rules = DEFAULT_RULES
+    for _ in range(MAX_ROUNDS):
+        changed = False
+        for rule in rules:
+            result = rule(instructions)
+            if result is not None:
+                instructions = result
+                changed = True
+        if not changed:
+            break
+    return instructions
+
+
+# Helpers used by the rules
+
+# Counts how many jumps go to every label
+def label_references(instructions):
+    return Counter(instruction.label for instruction in instructions if instruction.opcode in (JUMP, JMPZ))
+
+
+# Counts how many times every temp is read
+def temp_reads(instructions):
+    reads = Counter()
+    for instruction in instructions:
+        if type(instruction.src1) is Temp:
+            reads[instruction.src1] += 1
+        if type(instruction.src2) is Temp:
+            reads[instruction.src2] += 1
+    return reads
+
+
+# Counts how many instructions write every temp
+def temp_writes(instructions):
+    return Counter(instruction.dest for instruction in instructions if type(instruction.dest) is Temp)
+
+
+# Returns the first instruction at or after index that isn't a label
+def next_instruction(instructions, index):
+    while index < len(instructions) and instructions[index].opcode == LABEL:
+        index += 1
+    return instructions[index] if index < len(instructions) else None
+
+
+# The rules
+
+# JUMP Lx that is followed only by labels up to Lx: is removed
+def remove_jump_to_next(instructions):
+    result = []
+    changed = False
+    for index, instruction in enumerate(instructions):
+        if instruction.opcode == JUMP:
+            following = index + 1
+            while following < len(instructions) and instructions[following].opcode == LABEL:
+                if instructions[following].label == instruction.label:
+                    break
+                following += 1
+            if following < len(instructions) and instructions[following].opcode == LABEL:
+                changed = True
+                continue
+        result.append(instruction)
+    return result if changed else None
+
+
+# Labels that no jump goes to are removed
+def remove_unused_labels(instructions):
+    references = label_references(instructions)
+    result = [instruction for instruction in instructions
+              if instruction.opcode != LABEL or instruction.label in references]
+    return result if len(result) != len(instructions) else None
+
+
+# The instructions after a JUMP or a HALT can't run until the next label
+def remove_unreachable(instructions):
+    result = []
+    reachable = True
+    for instruction in instructions:
+        if instruction.opcode == LABEL:
+            reachable = True
+        if reachable:
+            result.append(instruction)
+        if instruction.opcode in (JUMP, HALT):
+            reachable = False
+    return result if len(result) != len(instructions) else None
+
+
+# A jump to a label that is followed by JUMP Ly goes straight to Ly
+def thread_jumps(instructions):
+    targets = {}
+    for index, instruction in enumerate(instructions):
+        if instruction.opcode == LABEL:
+            following = next_instruction(instructions, index + 1)
+            if following is not None and following.opcode == JUMP:
+                targets[instruction.label] = following.label
+    final = final_targets(targets)
+    changed = False
+    for instruction in instructions:
+        if instruction.opcode in (JUMP, JMPZ) and final.get(instruction.label, instruction.label) != instruction.label:
+            instruction.label = final[instruction.label]
+            changed = True
+    return instructions if changed else None
+
+
+# Follows every chain of jumps to the label where it ends, the labels on a chain share the work so a long chain is
+# followed once. a loop of jumps is left alone
+def final_targets(targets):
+    final = {}
+    for label in targets:
+        path = []
+        on_path = set()
+        while label in targets and label not in final and label not in on_path:
+            path.append(label)
+            on_path.add(label)
+            label = targets[label]
+        if label in on_path:
+            end = None
+        else:
+            end = final.get(label, label)
+        for label_on_path in path:
+            final[label_on_path] = label_on_path if end is None else end
+    return final
+
+
+# The 0 / 1 value of a boolean expression that is only used by the following JMPZ:
+#       IASN t 1
+#       JUMP Lskip
+#   Lfalse:
+#       IASN t 0
+#   Lskip:
+#       JMPZ Lx t
+# the true path just continues after the JMPZ and the false path jumps to Lx, so the six instructions are removed
+# and the jumps to Lfalse go straight to Lx.
+# code gen branches on the conditions of if and while directly, so it never emits this and the rule isn't one of
+# DEFAULT_RULES. it is kept for QUAD written by hand (or by an older compiler), pass it in the list of rules
+def branch_on_boolean(instructions):
+    reads = temp_reads(instructions)
+    references = label_references(instructions)
+    retarget = {}
+    result = []
+    index = 0
+    changed = False
+    while index < len(instructions):
+        window = instructions[index:index + 6]
+        if len(window) == 6 and is_boolean_branch(window, reads, references):
+            retarget[window[2].label] = window[5].label
+            index += 6
+            changed = True
+            continue
+        result.append(instructions[index])
+        index += 1
+    if not changed:
+        return None
+    for instruction in result:
+        if instruction.opcode in (JUMP, JMPZ):
+            # Lx can itself be the false label of another removed window
+            for _ in range(len(retarget)):
+                if instruction.label not in retarget:
+                    break
+                instruction.label = retarget[instruction.label]
+    return result
+
+
+def is_boolean_branch(window, reads, references):
+    assign_true, jump_skip, label_false, assign_false, label_skip, branch = window
+    temp = assign_true.dest
+    return (type(temp) is Temp and reads[temp] == 1
+            and assign_true.opcode == IASN and assign_true.src1 == 1
+            and jump_skip.opcode == JUMP and jump_skip.label == label_skip.label
+            and label_false.opcode == LABEL
+            and assign_false.opcode == IASN and assign_false.dest == temp and assign_false.src1 == 0
+            and label_skip.opcode == LABEL and references[label_skip.label] == 1
+            and branch.opcode == JMPZ and branch.src1 == temp
+            and branch.label != label_false.label)
+
+
+# Labels that follow each other are merged into the first one
+def merge_adjacent_labels(instructions):
+    retarget = {}
+    result = []
+    for instruction in instructions:
+        if instruction.opcode == LABEL and result and result[-1].opcode == LABEL:
+            retarget[instruction.label] = result[-1].label
+            continue
+        result.append(instruction)
+    if not retarget:
+        return None
+    for instruction in result:
+        if instruction.opcode in (JUMP, JMPZ) and instruction.label in retarget:
+            instruction.label = retarget[instruction.label]
+    return result
+
+
+# A temp that is computed only to be copied into a variable is computed straight into the variable:
+#   IADD t1 a b
+#   IASN x t1      ->   IADD x a b
+def fold_temp_copies(instructions):
+    reads = temp_reads(instructions)
+    writes = temp_writes(instructions)
+    result = []
+    changed = False
+    for instruction in instructions:
+        if result and instruction.opcode in (IASN, RASN) and type(instruction.src1) is Temp:
+            previous = result[-1]
+            result_types = INT_RESULT_OPCODES if instruction.opcode == IASN else REAL_RESULT_OPCODES
+            if (previous.dest == instruction.src1 and reads[instruction.src1] == 1
+                    and writes[instruction.src1] == 1 and previous.opcode in result_types):
+                previous.dest = instruction.dest
+                changed = True
+                continue
+        result.append(instruction)
+    return result if changed else None
+
+
+DEFAULT_RULES = [
+    fold_temp_copies,
+    thread_jumps,
+    remove_unreachable,
+    remove_jump_to_next,
+    merge_adjacent_labels,
+    remove_unused_labels,
+]
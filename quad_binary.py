@@ -0,0 +1,269 @@
+# This file implements the binary format of QUAD programs (.qbc), an alternative to the .qud text that can be run
+# without parsing it: the labels are already resolved to instruction offsets and the operands to slots, numbered like
+# the slots of the VM (quad_vm.py). All the sections have a fixed size given by the header, so a program is loaded from
+# bytes or from a memory-mapped file without copying the code (BinaryProgram, open_binary).
+# The text and the binary format hold the same IR, converting one to the other and back gives the same instructions:
+# the names and the places of the labels are kept in a table of their own, and identifiers, temps, ints and floats
+# are tagged in the pool. (A number in the text is written again the way format_instruction writes it, so "2.50"
+# comes back as "2.5".)
+#
+# Layout, all the numbers are little-endian:
+#   header    magic "QBC\0", version (u16), flags (u16, 0), instructions, slots, labels, strings (u32 each)
+#   opcodes   one byte per instruction (the opcodes of quad_ir.py, labels aren't instructions), padded to 4 bytes
+#   operands  dest, src1, src2 of every instruction (u32): the slot of an operand, NONE for an operand the
+#             instruction doesn't have. a JUMP / JMPZ has the offset of the instruction it goes to in dest and the
+#             string index of the name of its label in src2
+#   tags      one byte per slot (VARIABLE, TEMP, INT, FLOAT), padded to 8 bytes
+#   values    8 bytes per slot: the index of the name in strings (u64) for a variable or a temp, the int (i64) or the
+#             float (f64) of a constant
+#   labels    string index and instruction offset (u32 each) of every label, in the order of the code
+#   strings   length (u32) and UTF-8 bytes of every name
+#
+# Usage: python quad_binary.py <file.qud> <file.qbc>   or   python quad_binary.py <file.qbc> <file.qud>
+from array import array
+from contextlib import contextmanager
+import mmap
+import struct
+import sys
+
+from quad_ir import *
+
+MAGIC = b'QBC\0'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+LABEL_ENTRY = struct.Struct('<II')
+LENGTH = struct.Struct('<I')
+NONE = 0xFFFFFFFF
+
+# Tags of the slots
+VARIABLE, TEMP, INT, FLOAT = range(4)
+VALUE_FORMATS = {VARIABLE: '<Q', TEMP: '<Q', INT: '<q', FLOAT: '<d'}
+
+JUMP_OPCODES = (JUMP, JMPZ)
+
+
+def padded(size, alignment):
+    return -size % alignment
+
+
+# The u32 words of a section as a list of numbers, a view of the section itself when the machine is little-endian
+def u32_words(view):
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    words = array('I', view)
+    words.byteswap()
+    return words
+
+
+def u32_bytes(words):
+    words = array('I', words)
+    if sys.byteorder != 'little':
+        words.byteswap()
+    return words.tobytes()
+
+
+# Returns the bytes of the .qbc file of instructions (the IR of a program, with its labels).
+# raises ValueError for a jump to a label that isn't in the program and for an int that doesn't fit in 64 bits
+def encode(instructions):
+    offset_of_label = {}
+    labels = []
+    offset = 0
+    for instruction in instructions:
+        if instruction.opcode == LABEL:
+            offset_of_label[instruction.label] = offset
+            labels.append((instruction.label, offset))
+        else:
+            offset += 1
+
+    strings = []
+    string_of = {}
+    # the slots are numbered like the slots of QuadVM: a variable by its name, a constant by its type and value
+    slot_of = {}
+    tags = bytearray()
+    values = bytearray()
+
+    def string(name):
+        if name not in string_of:
+            string_of[name] = len(strings)
+            strings.append(name)
+        return string_of[name]
+
+    def slot(operand):
+        if operand is None:
+            return NONE
+        key = operand if isinstance(operand, str) else (type(operand), operand)
+        if key not in slot_of:
+            slot_of[key] = len(tags)
+            if isinstance(operand, str):
+                tag = TEMP if isinstance(operand, Temp) else VARIABLE
+                value = string(str(operand))
+            else:
+                tag = FLOAT if isinstance(operand, float) else INT
+                value = operand
+            try:
+                values.extend(struct.pack(VALUE_FORMATS[tag], value))
+            except struct.error:
+                raise ValueError(f"the number {operand} doesn't fit in 64 bits") from None
+            tags.append(tag)
+        return slot_of[key]
+
+    opcodes = bytearray()
+    operands = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        if opcode == LABEL:
+            continue
+        if opcode in JUMP_OPCODES:
+            if instruction.label not in offset_of_label:
+                raise ValueError(f"jump to an unknown label {instruction.label}")
+            operands += (offset_of_label[instruction.label], slot(instruction.src1), string(instruction.label))
+        else:
+            operands += (slot(instruction.dest), slot(instruction.src1), slot(instruction.src2))
+        opcodes.append(opcode)
+    label_entries = [LABEL_ENTRY.pack(string(name), offset) for name, offset in labels]
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(opcodes), len(tags), len(labels), len(strings)),
+             opcodes, bytes(padded(len(opcodes), 4)), u32_bytes(operands)]
+    size = sum(len(part) for part in parts)
+    parts += [tags, bytes(padded(size + len(tags), 8)), values]
+    parts += label_entries
+    for name in strings:
+        data = name.encode()
+        parts += [LENGTH.pack(len(data)), data]
+    return b"".join(parts)
+
+
+# A .qbc program loaded from bytes, a bytearray, an mmap or a memoryview. the opcodes and the operands are views of
+# the data, the pool and the names are decoded once
+class BinaryProgram:
+    def __init__(self, data):
+        view = memoryview(data)
+        if len(view) < HEADER.size:
+            raise ValueError("not a .qbc file")
+        magic, version, flags, count, slots, labels, strings = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("not a .qbc file")
+        if version != VERSION:
+            raise ValueError(f"unsupported .qbc version {version}")
+        try:
+            offset = HEADER.size
+            # opcodes[index] is the opcode of the instruction at index, operands[3 * index:3 * index + 3] its
+            # dest, src1 and src2
+            self.opcodes = view[offset:offset + count]
+            offset += count + padded(count, 4)
+            self.operands = u32_words(view[offset:offset + 12 * count])
+            offset += 12 * count
+            tags = bytes(view[offset:offset + slots])
+            offset += slots + padded(offset + slots, 8)
+            values = [struct.unpack_from(VALUE_FORMATS[tag], view, offset + 8 * index)[0]
+                      for index, tag in enumerate(tags)]
+            offset += 8 * slots
+            label_entries = [LABEL_ENTRY.unpack_from(view, offset + LABEL_ENTRY.size * index)
+                             for index in range(labels)]
+            offset += LABEL_ENTRY.size * labels
+            self.strings = []
+            for _ in range(strings):
+                (length,) = LENGTH.unpack_from(view, offset)
+                offset += LENGTH.size
+                self.strings.append(bytes(view[offset:offset + length]).decode())
+                offset += length
+            if len(self.opcodes) != count or len(self.operands) != 3 * count or offset > len(view):
+                raise ValueError
+            # the operand of every slot: a name (a Temp for a temp) or a number
+            self.pool = [self.strings[value] if tag == VARIABLE else Temp(self.strings[value]) if tag == TEMP
+                         else value for tag, value in zip(tags, values)]
+            # (name, offset) of every label
+            self.labels = [(self.strings[name], label_offset) for name, label_offset in label_entries]
+        except (ValueError, IndexError, KeyError, struct.error):
+            self.release()
+            view.release()
+            raise ValueError("the .qbc file is truncated or damaged") from None
+        self.view = view
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    # The values the slots have when the program starts, like QuadVM.initial_slots
+    def initial_slots(self):
+        return [0 if isinstance(operand, str) else operand for operand in self.pool]
+
+    # The IR of the program, with its labels back in place
+    def instructions(self):
+        pool = self.pool
+        operands = self.operands
+        labels = iter(self.labels)
+        label = next(labels, None)
+        instructions = []
+        for index, opcode in enumerate(self.opcodes):
+            while label is not None and label[1] == index:
+                instructions.append(Instruction(LABEL, label=label[0]))
+                label = next(labels, None)
+            dest, src1, src2 = operands[3 * index:3 * index + 3]
+            src1 = None if src1 == NONE else pool[src1]
+            if opcode in JUMP_OPCODES:
+                instructions.append(Instruction(opcode, src1=src1, label=self.strings[src2]))
+            else:
+                instructions.append(Instruction(opcode, None if dest == NONE else pool[dest], src1,
+                                                None if src2 == NONE else pool[src2]))
+        # labels after the last instruction
+        while label is not None:
+            instructions.append(Instruction(LABEL, label=label[0]))
+            label = next(labels, None)
+        return instructions
+
+    # Releases the views of the data, an mmap can only be closed once they are released
+    def release(self):
+        for name in ('opcodes', 'operands', 'view'):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+
+
+# The program of a .qbc file, valid inside the with block: the file is memory-mapped and the program is a view of it
+@contextmanager
+def open_binary(path):
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        program = BinaryProgram(data)
+        try:
+            yield program
+        finally:
+            program.release()
+
+
+def text_to_binary(text):
+    return encode(parse_program(text))
+
+
+def binary_to_text(data):
+    program = BinaryProgram(data)
+    try:
+        return program_text(program.instructions())
+    finally:
+        program.release()
+
+
+def main(argv):
+    if len(argv) != 2 or {argv[0].rsplit('.', 1)[-1], argv[1].rsplit('.', 1)[-1]} != {'qud', 'qbc'}:
+        print("Usage: quad_binary.py <file.qud> <file.qbc>   or   quad_binary.py <file.qbc> <file.qud>")
+        return 1
+    from file_io import open_output, write_quad
+    source, target = argv
+    try:
+        if source.endswith('.qud'):
+            with open(source) as file:
+                data = text_to_binary(file.read())
+            with open_output(target, binary=True) as file:
+                file.write(data)
+        else:
+            with open_binary(source) as program:
+                instructions = program.instructions()
+            with open_output(target) as file:
+                write_quad(file, instructions)
+    except (OSError, ValueError) as error:
+        sys.stderr.write(f"Error: {error}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,146 @@
+# This file defines the in-memory representation of QUAD code (the IR) that code_gen produces.
+# Every instruction is a small Instruction record: an integer opcode and up to three operands (dest, src1, src2)
+# plus a label for the jumps. Operands are identifiers (str), temps (Temp) or numbers (int / float), so passes that
+# analyse or optimize the code work on these records instead of parsing text.
+# The IR is turned into the text of a .qud file only in one place, the serializer at the bottom of this file.
+
+# Opcodes
+(IASN, IPRT, IINP, IEQL, INQL, ILSS, IGRT, IADD, ISUB, IMLT, IDIV,
+ RASN, RPRT, RINP, REQL, RNQL, RLSS, RGRT, RADD, RSUB, RMLT, RDIV,
+ ITOR, RTOI, JUMP, JMPZ, HALT, LABEL) = range(28)
+
+OPCODE_NAMES = (
+    'IASN', 'IPRT', 'IINP', 'IEQL', 'INQL', 'ILSS', 'IGRT', 'IADD', 'ISUB', 'IMLT', 'IDIV',
+    'RASN', 'RPRT', 'RINP', 'REQL', 'RNQL', 'RLSS', 'RGRT', 'RADD', 'RSUB', 'RMLT', 'RDIV',
+    'ITOR', 'RTOI', 'JUMP', 'JMPZ', 'HALT', 'LABEL'
+)
+
+OPCODE_BY_NAME = {name: opcode for opcode, name in enumerate(OPCODE_NAMES)}
+
+
+# Returns the integer or the real version of an instruction, name is the opcode without its I / R prefix
+def typed_opcode(name, exp_type):
+    return OPCODE_BY_NAME[("R" if exp_type == "float" else "I") + name]
+
+
+# A temp created by code gen. it's a str so it is written like any identifier, but passes can tell it apart
+# from the variables of the program
+class Temp(str):
+    __slots__ = ()
+
+
+class Instruction:
+    __slots__ = ('opcode', 'dest', 'src1', 'src2', 'label')
+
+    def __init__(self, opcode, dest=None, src1=None, src2=None, label=None):
+        self.opcode = opcode
+        self.dest = dest
+        self.src1 = src1
+        self.src2 = src2
+        self.label = label
+
+    def __repr__(self):
+        return f"Instruction({format_instruction(self)!r})"
+
+
+# Instructions that end a basic block, and the ones that read input or write output (they can't be removed or moved)
+BRANCH_OPCODES = frozenset((JUMP, JMPZ, HALT))
+IO_OPCODES = frozenset((IPRT, RPRT, IINP, RINP))
+# Instructions that only compute their dest from their operands (IDIV / RDIV can still fail on a divisor of 0)
+PURE_OPCODES = frozenset((IASN, IEQL, INQL, ILSS, IGRT, IADD, ISUB, IMLT, IDIV,
+                          RASN, REQL, RNQL, RLSS, RGRT, RADD, RSUB, RMLT, RDIV, ITOR, RTOI))
+
+
+# The line cpq.py writes at the end of every .qud file, after the code
+SIGNATURE = 'Yahel Megidish'
+
+
+# Serializer: the text of a single instruction in the .qud format
+def format_instruction(instruction):
+    opcode = instruction.opcode
+    if opcode == LABEL:
+        return f"{instruction.label}:"
+    if opcode == JUMP:
+        return f"JUMP {instruction.label}"
+    if opcode == JMPZ:
+        return f"JMPZ {instruction.label} {instruction.src1}"
+    parts = [OPCODE_NAMES[opcode]]
+    for operand in (instruction.dest, instruction.src1, instruction.src2):
+        if operand is not None:
+            parts.append(str(operand))
+    return " ".join(parts)
+
+
+def write_program(instructions, file):
+    file.writelines(format_instruction(instruction) + "\n" for instruction in instructions)
+
+
+def program_text(instructions):
+    return "".join(format_instruction(instruction) + "\n" for instruction in instructions)
+
+
+# The operands an instruction reads (the one it writes is always dest), used by the passes that analyse the IR.
+# only identifiers and temps are returned, numbers and labels aren't
+def operands_read(instruction):
+    src1 = instruction.src1
+    src2 = instruction.src2
+    if isinstance(src1, str):
+        if isinstance(src2, str):
+            return (src1, src2)
+        return (src1,)
+    if isinstance(src2, str):
+        return (src2,)
+    return ()
+
+
+# Parser: the instructions of the text of a .qud file, the opposite of program_text. identifiers and temps are both
+# read as str (the text doesn't tell them apart), the signature line at the end is skipped.
+# raises ValueError for a line that isn't an instruction
+def parse_program(text):
+    instructions = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        parts = line.split()
+        if not parts or line.strip() == SIGNATURE:
+            continue
+        if len(parts) == 1 and parts[0].endswith(':'):
+            instructions.append(Instruction(LABEL, label=parts[0][:-1]))
+            continue
+        opcode = OPCODE_BY_NAME.get(parts[0])
+        if opcode is None or opcode == LABEL:
+            raise ValueError(f"line {line_number}: unknown instruction {parts[0]}")
+        operands = parts[1:]
+        try:
+            if opcode == JUMP:
+                (label,) = operands
+                instructions.append(Instruction(JUMP, label=label))
+            elif opcode == JMPZ:
+                label, condition = operands
+                instructions.append(Instruction(JMPZ, src1=parse_operand(condition), label=label))
+            elif opcode == HALT:
+                () = operands
+                instructions.append(Instruction(HALT))
+            elif opcode in (IPRT, RPRT):
+                (value,) = operands
+                instructions.append(Instruction(opcode, src1=parse_operand(value)))
+            elif opcode in (IINP, RINP):
+                (dest,) = operands
+                instructions.append(Instruction(opcode, dest))
+            elif opcode in (IASN, RASN, ITOR, RTOI):
+                dest, value = operands
+                instructions.append(Instruction(opcode, dest, parse_operand(value)))
+            else:
+                dest, value1, value2 = operands
+                instructions.append(Instruction(opcode, dest, parse_operand(value1), parse_operand(value2)))
+        except ValueError:
+            raise ValueError(f"line {line_number}: wrong number of operands for {parts[0]}") from None
+    return instructions
+
+
+# A number in the text is an int or a float, anything else is an identifier (even inf or nan)
+def parse_operand(text):
+    if not (text[0].isdigit() or text[0] in '+-.'):
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
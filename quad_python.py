@@ -0,0 +1,190 @@
+# This file translates a QUAD program into Python code, a faster way to run it than the instruction loop of quad_vm.py.
+# The whole program becomes one Python function: the variables of the program are local variables of the function,
+# every basic block (cfg.py) becomes the straight line Python code of its instructions, and the jumps set the index
+# of the next block for a dispatch loop around the blocks. The loop finds a block with a tree of comparisons on its
+# index (a few comparisons even for thousands of blocks), so the cost of dispatching is paid once per block instead
+# of once per instruction:
+#       L1:                          else:                      (block 1)
+#       IGRT t1 N 0         ->           v_t1 = v_N > 0
+#       JMPZ L2 t1                       block = 2 if not v_t1 else 3
+# The translation is cached by the hash of the program text, so running the same program again skips it.
+from collections import OrderedDict
+import hashlib
+import math
+import time
+
+from cfg import split_blocks
+from quad_ir import *
+from quad_vm import QuadRuntimeError, RunResult, int_divide, read_number
+
+# Python operators of the binary instructions
+OPERATORS = {
+    IADD: '+', ISUB: '-', IMLT: '*', RADD: '+', RSUB: '-', RMLT: '*', RDIV: '/',
+    IEQL: '==', INQL: '!=', ILSS: '<', IGRT: '>', REQL: '==', RNQL: '!=', RLSS: '<', RGRT: '>',
+}
+
+# program hash -> CompiledProgram, the least recently used ones are dropped
+CACHE_SIZE = 128
+cache = OrderedDict()
+
+
+# Returns the CompiledProgram of the instructions, from the cache if the same program was compiled before
+def compile_program(instructions):
+    key = hashlib.sha256(program_text(instructions).encode()).hexdigest()
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = CompiledProgram(instructions)
+        cache[key] = compiled
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return compiled
+
+
+class CompiledProgram:
+    def __init__(self, instructions):
+        writer = PythonWriter(split_blocks(instructions))
+        # the generated Python code, kept to read or debug it
+        self.source = writer.write()
+        self.first_instruction = writer.first_instruction
+        namespace = {}
+        exec(compile(self.source, '<quad>', 'exec'), namespace)
+        self.function = namespace['run_program']
+
+    @classmethod
+    def from_text(cls, text):
+        return compile_program(parse_program(text))
+
+    # Same as QuadVM.run
+    def run(self, inputs=(), output=None, max_steps=None):
+        outputs = None
+        if output is None:
+            outputs = []
+            emit = outputs.append
+        else:
+            def emit(value):
+                output.write(f"{value}\n")
+        limit = max_steps if max_steps is not None else math.inf
+        # the function leaves the step count and the current block here, also when it stops with an error
+        state = [0, 0]
+        start = time.perf_counter()
+        try:
+            self.function(iter(inputs), emit, read_number, int_divide, limit, state)
+        except ZeroDivisionError:
+            raise QuadRuntimeError(f"instruction {self.first_instruction[state[1]]}: division by zero "
+                                   f"(in the block that starts there)") from None
+        except (OverflowError, ValueError) as error:
+            # the same errors as QuadVM.run
+            raise QuadRuntimeError(f"instruction {self.first_instruction[state[1]]}: {error} "
+                                   f"(in the block that starts there)") from None
+        if state[0] > limit:
+            raise QuadRuntimeError(f"stopped after {state[0]} instructions (max_steps)")
+        return RunResult(outputs, state[0], time.perf_counter() - start)
+
+
+class PythonWriter:
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.block_of_label = {}
+        for block in blocks:
+            for label in block.labels():
+                self.block_of_label[label] = block.index
+        # the number of instructions of every block (labels aren't instructions) and the number of the first one
+        self.lengths = [sum(1 for instruction in block.instructions if instruction.opcode != LABEL) for block in blocks]
+        self.first_instruction = []
+        count = 0
+        for length in self.lengths:
+            self.first_instruction.append(count + 1)
+            count += length
+        self.variables = set()
+
+    def write(self):
+        bodies = [self.write_block(block) for block in self.blocks]
+        lines = ["def run_program(inputs, emit, read_number, int_divide, limit, state):"]
+        lines += [f"    {variable} = 0" for variable in sorted(self.variables)]
+        lines += ["    steps = 0",
+                  "    block = 0",
+                  "    try:",
+                  "        while block >= 0:"]
+        if bodies:
+            lines += self.dispatch(bodies, 0, len(bodies), "            ")
+        else:
+            lines.append("            break")
+        lines += ["    finally:",
+                  "        state[0] = steps",
+                  "        state[1] = block"]
+        return "\n".join(lines) + "\n"
+
+    # The tree of comparisons that finds the code of the block, for the blocks first <= index < last
+    def dispatch(self, bodies, first, last, indent):
+        if last - first == 1:
+            return [indent + line for line in bodies[first]]
+        middle = (first + last) // 2
+        return ([f"{indent}if block < {middle}:"] + self.dispatch(bodies, first, middle, indent + "    ") +
+                [f"{indent}else:"] + self.dispatch(bodies, middle, last, indent + "    "))
+
+    # A variable of the program is v_ and its name, so it can't clash with Python names
+    def operand(self, operand):
+        if isinstance(operand, str):
+            if not operand.isidentifier():
+                raise ValueError(f"{operand} isn't a valid name")
+            variable = f"v_{operand}"
+            self.variables.add(variable)
+            return variable
+        if isinstance(operand, float) and not math.isfinite(operand):
+            return f"float('{operand}')"
+        return repr(operand)
+
+    def write_block(self, block):
+        length = self.lengths[block.index]
+        body = [f"steps += {length}"] if length else []
+        # the number of the current instruction, used by the input error messages like quad_vm
+        pc = self.first_instruction[block.index] - 1
+        next_block = block.index + 1 if block.index + 1 < len(self.blocks) else -1
+        ends = False
+        for instruction in block.instructions:
+            opcode = instruction.opcode
+            if opcode == LABEL:
+                continue
+            pc += 1
+            dest = self.operand(instruction.dest) if instruction.dest is not None else None
+            src1 = self.operand(instruction.src1) if instruction.src1 is not None else None
+            src2 = self.operand(instruction.src2) if instruction.src2 is not None else None
+            if opcode in OPERATORS:
+                body.append(f"{dest} = {src1} {OPERATORS[opcode]} {src2}")
+            elif opcode == IDIV:
+                body.append(f"{dest} = int_divide({src1}, {src2})")
+            elif opcode in (IASN, RASN):
+                body.append(f"{dest} = {src1}")
+            elif opcode == ITOR:
+                body.append(f"{dest} = float({src1})")
+            elif opcode == RTOI:
+                body.append(f"{dest} = int({src1})")
+            elif opcode in (IINP, RINP):
+                convert = 'int' if opcode == IINP else 'float'
+                body.append(f"{dest} = read_number({convert}, next(inputs, None), {pc})")
+            elif opcode in (IPRT, RPRT):
+                body.append(f"emit({'int' if opcode == IPRT else 'float'}({src1}))")
+            elif opcode == JUMP:
+                body.append(f"block = {self.target(instruction.label)}")
+                ends = True
+            elif opcode == JMPZ:
+                body.append(f"block = {self.target(instruction.label)} if not {src1} else {next_block}")
+                ends = True
+            elif opcode == HALT:
+                body.append("block = -1")
+                ends = True
+        if not ends:
+            body.append(f"block = {next_block}")
+        # a program that doesn't end is stopped at its jumps back, the loops
+        last = block.last()
+        if last is not None and last.opcode in (JUMP, JMPZ) and self.target(last.label) <= block.index:
+            body.append("if steps > limit:")
+            body.append("    break")
+        return body
+
+    def target(self, label):
+        if label not in self.block_of_label:
+            raise ValueError(f"jump to an unknown label {label}")
+        return self.block_of_label[label]
@@ -0,0 +1,249 @@
+# This file runs one QUAD program over many independent inputs at once with NumPy (needed only by this file).
+# Every run is a lane: a variable of the program is an array with one value per lane, and an instruction computes all
+# the lanes in one NumPy operation (IADD of two variables is one addition of two arrays), so the cost of interpreting
+# an instruction is paid once for all the runs instead of once per run.
+# The runs go in lockstep on the basic blocks of the program. Every lane has its own current block, a JMPZ sends the
+# lanes where its operand is 0 to its label and the others to the next block. The block run next is the first one
+# (in program order) that some lane is at, with only the lanes that are there (a mask), the others wait for them.
+# The lanes of a loop run it while the lanes that already left it wait after it, so the lanes meet again after
+# branches and loops, and a block that all the lanes are at runs without a mask.
+# A lane that fails (division by zero, no more input, max_steps) stops with an error, the other lanes go on.
+# The values are int64 / float64, unlike quad_vm.py an integer that gets too big wraps around.
+import operator
+import time
+
+import numpy as np
+
+from peephole import REAL_RESULT_OPCODES
+from quad_ir import *
+from quad_vm import BINARY, CONVERT, COPY, INPUT, JUMP_ALWAYS, JUMP_IF_ZERO, PRINT, STOP, QuadVM, int_divide
+
+
+# IDIV truncates the quotient like quad_vm.int_divide
+def divide_arrays(values1, values2):
+    quotient = np.abs(values1) // np.abs(values2)
+    return np.where((values1 < 0) == (values2 < 0), quotient, -quotient)
+
+
+def to_int(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = np.trunc(values)
+    return values.astype(np.int64)
+
+
+def to_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+CONVERSIONS = {int: to_int, float: to_float}
+
+
+class BatchResult:
+    def __init__(self, outputs, counts, real, steps, errors, seconds):
+        # outputs[run, k] is the k-th value that run printed, counts[run] the number of values it printed (the rest of
+        # the row is 0). if the program prints both integers and reals, real[run, k] tells which one was printed
+        self.outputs = outputs
+        self.counts = counts
+        self.real = real
+        # the number of instructions every run executed, and run -> message of the runs that failed
+        self.steps = steps
+        self.errors = errors
+        self.seconds = seconds
+
+    # The values one run printed, like RunResult.outputs of quad_vm.py
+    def row(self, run):
+        values = self.outputs[run, :self.counts[run]].tolist()
+        if self.real is None:
+            return values
+        return [float(value) if real else int(value) for value, real in zip(values, self.real[run].tolist())]
+
+    def throughput(self):
+        total = int(self.steps.sum())
+        return total / self.seconds if self.seconds > 0 else float('inf')
+
+    def __str__(self):
+        return (f"{len(self.steps)} runs, {int(self.steps.sum())} instructions in {self.seconds:.3f} s "
+                f"({self.throughput():,.0f} instructions/s), {len(self.errors)} failed")
+
+
+class VectorVM(QuadVM):
+    # instructions is the IR of a program, decoded like QuadVM and then split into blocks of the decoded instructions
+    def __init__(self, instructions):
+        self.real_slots = set()
+        super().__init__(instructions)
+        # slot -> the value of a constant, read as a number instead of an array
+        self.constants = {slot: self.initial_slots[slot] for key, slot in self.slot_of.items() if type(key) is tuple}
+        # int / float, the types the program prints
+        self.print_types = {function for kind, function, dest, src1, src2 in self.code if kind == PRINT}
+        self.blocks, self.block_of_index = self.split(self.code)
+
+    def decode(self, instructions):
+        code = super().decode(instructions)
+        for instruction in instructions:
+            if instruction.opcode in REAL_RESULT_OPCODES:
+                self.real_slots.add(self.slot_of[instruction.dest])
+        return code
+
+    # Returns the blocks as (first index, instructions, index of the first instruction after the block) and a dict
+    # index of an instruction that starts a block -> the number of its block
+    @staticmethod
+    def split(code):
+        starts = {0}
+        for index, (kind, function, dest, src1, src2) in enumerate(code):
+            if kind in (JUMP_ALWAYS, JUMP_IF_ZERO, STOP):
+                starts.add(index + 1)
+                if kind != STOP:
+                    starts.add(dest)
+        starts = sorted(start for start in starts if start < len(code))
+        block_of_index = {start: number for number, start in enumerate(starts)}
+        # the end of the program is a block number too, the lanes that finished are there
+        block_of_index[len(code)] = len(starts)
+        ends = starts[1:] + [len(code)]
+        blocks = [(start, code[start:end], end) for start, end in zip(starts, ends)]
+        return blocks, block_of_index
+
+    # inputs is a 2-D array, row i holds the numbers run i reads (in order). returns a BatchResult
+    def run_batch(self, inputs, max_steps=None):
+        inputs = np.asarray(inputs)
+        if inputs.ndim != 2:
+            raise ValueError("the inputs must be a 2-D array, one row per run")
+        runs = inputs.shape[0]
+        runner = BatchRunner(self, inputs, max_steps)
+        start = time.perf_counter()
+        runner.run()
+        seconds = time.perf_counter() - start
+        counts = runner.counts
+        width = int(counts.max()) if runs else 0
+        real = runner.real[:, :width] if runner.real is not None else None
+        return BatchResult(runner.outputs[:, :width], counts, real, runner.steps, runner.errors, seconds)
+
+
+# The state of one run_batch call, so a VectorVM can run several batches
+class BatchRunner:
+    def __init__(self, vm, inputs, max_steps):
+        self.vm = vm
+        self.inputs = inputs
+        runs = inputs.shape[0]
+        self.slots = []
+        for slot in range(len(vm.initial_slots)):
+            if slot in vm.constants:
+                self.slots.append(None)
+            else:
+                dtype = np.float64 if slot in vm.real_slots else np.int64
+                self.slots.append(np.zeros(runs, dtype=dtype))
+        self.block = np.zeros(runs, dtype=np.int64)
+        self.steps = np.zeros(runs, dtype=np.int64)
+        # the number of inputs every run has read
+        self.taken = np.zeros(runs, dtype=np.int64)
+        self.counts = np.zeros(runs, dtype=np.int64)
+        self.outputs = np.zeros((runs, 4), dtype=np.float64 if float in vm.print_types else np.int64)
+        self.real = np.zeros((runs, 4), dtype=bool) if len(vm.print_types) == 2 else None
+        self.errors = {}
+        self.limit = max_steps
+
+    def read(self, slot, lanes):
+        if slot in self.vm.constants:
+            return self.vm.constants[slot]
+        return self.slots[slot][lanes]
+
+    # Stops the lanes (an array of run numbers) with an error
+    def fail(self, lanes, message):
+        for lane in lanes.tolist():
+            self.errors[lane] = message
+        self.block[lanes] = len(self.vm.blocks)
+
+    # The lanes (a slice of all the lanes or an array of run numbers) where good is True, as an array
+    @staticmethod
+    def keep(lanes, good, runs):
+        if isinstance(lanes, slice):
+            lanes = np.arange(runs)
+        return lanes[good]
+
+    def run(self):
+        vm = self.vm
+        runs = len(self.block)
+        end = len(vm.blocks)
+        while runs:
+            current = int(self.block.min())
+            if current == end:
+                break
+            at_block = self.block == current
+            count = int(np.count_nonzero(at_block))
+            lanes = slice(None) if count == runs else np.flatnonzero(at_block)
+            self.run_block(current, lanes, runs)
+
+    def run_block(self, number, lanes, runs):
+        vm = self.vm
+        first, code, after = vm.blocks[number]
+        self.steps[lanes] += len(code)
+        next_block = vm.block_of_index[after]
+        target = next_block
+        for index, (kind, function, dest, src1, src2) in enumerate(code, first + 1):
+            if kind == BINARY:
+                values1 = self.read(src1, lanes)
+                values2 = self.read(src2, lanes)
+                if function is int_divide or function is operator.truediv:
+                    zero = np.asarray(values2 == 0)
+                    if zero.any():
+                        zero = np.broadcast_to(zero, self.steps[lanes].shape)
+                        self.fail(self.keep(lanes, zero, runs), f"instruction {index}: division by zero")
+                        lanes = self.keep(lanes, ~zero, runs)
+                        if not len(lanes):
+                            return
+                        values1 = self.read(src1, lanes)
+                        values2 = self.read(src2, lanes)
+                    if function is int_divide:
+                        self.slots[dest][lanes] = divide_arrays(values1, values2)
+                    else:
+                        self.slots[dest][lanes] = np.true_divide(values1, values2)
+                else:
+                    self.slots[dest][lanes] = function(values1, values2)
+            elif kind == COPY:
+                self.slots[dest][lanes] = self.read(src1, lanes)
+            elif kind == CONVERT:
+                self.slots[dest][lanes] = CONVERSIONS[function](self.read(src1, lanes))
+            elif kind == INPUT:
+                taken = self.taken[lanes]
+                empty = taken >= self.inputs.shape[1]
+                if empty.any():
+                    self.fail(self.keep(lanes, empty, runs), f"instruction {index}: no more input")
+                    lanes = self.keep(lanes, ~empty, runs)
+                    if not len(lanes):
+                        return
+                    taken = taken[~empty]
+                self.slots[dest][lanes] = CONVERSIONS[function](self.inputs[np.arange(runs)[lanes], taken])
+                self.taken[lanes] += 1
+            elif kind == PRINT:
+                self.emit(lanes, CONVERSIONS[function](self.read(src1, lanes)), function is float, runs)
+            elif kind == JUMP_ALWAYS:
+                target = vm.block_of_index[dest]
+            elif kind == JUMP_IF_ZERO:
+                target = np.where(self.read(src1, lanes) == 0, vm.block_of_index[dest], next_block)
+            else:
+                target = len(vm.blocks)
+        self.block[lanes] = target
+        # a program that doesn't end is stopped at its jumps back, the loops
+        if self.limit is not None and code and code[-1][0] in (JUMP_ALWAYS, JUMP_IF_ZERO) \
+                and vm.block_of_index[code[-1][2]] <= number:
+            over = self.steps[lanes] > self.limit
+            if over.any():
+                self.fail(self.keep(lanes, over, runs), f"stopped after more than {self.limit} instructions (max_steps)")
+
+    def emit(self, lanes, values, real, runs):
+        columns = self.counts[lanes]
+        width = self.outputs.shape[1]
+        if len(columns) and int(columns.max()) >= width:
+            self.outputs = np.concatenate([self.outputs, np.zeros_like(self.outputs)], axis=1)
+            if self.real is not None:
+                self.real = np.concatenate([self.real, np.zeros_like(self.real)], axis=1)
+        rows = np.arange(runs)[lanes]
+        self.outputs[rows, columns] = values
+        if self.real is not None:
+            self.real[rows, columns] = real
+        self.counts[lanes] += 1
+
+
+# Runs the text of a .qud file over the rows of inputs, returns a BatchResult
+def run_vectorized(text, inputs, max_steps=None):
+    return VectorVM(parse_program(text)).run_batch(inputs, max_steps)
@@ -0,0 +1,277 @@
+# This file implements a virtual machine that runs QUAD programs in the same process, to test and benchmark the
+# output of the compiler without an external interpreter.
+# The program is decoded once: the labels are resolved to instruction indexes, every variable and every constant gets
+# a slot in a list (so an operand is read with one index instead of a dict lookup by name), and every opcode is looked
+# up once in a table that gives the kind of instruction and the Python function that computes it. run() then executes
+# the decoded tuples in a tight loop and can be called any number of times with different inputs.
+#
+# Usage: python quad_vm.py [--stats] [--max-steps N] [--python] <file.qud | file.qbc> [inputs file]
+#   the inputs are read from the file (or stdin) as numbers separated by white space, the outputs are written to
+#   stdout one per line. --stats writes the number of instructions executed and the throughput to stderr,
+#   --python runs the program translated to Python functions (quad_python.py) instead of this instruction loop.
+#   a .qbc file (quad_binary.py) is loaded without parsing it
+import operator
+import sys
+import time
+
+from quad_ir import *
+
+# Kinds of decoded instructions
+BINARY, JUMP_IF_ZERO, COPY, JUMP_ALWAYS, CONVERT, INPUT, PRINT, STOP = range(8)
+
+
+class QuadRuntimeError(Exception):
+    pass
+
+
+# IDIV truncates the quotient
+def int_divide(value1, value2):
+    quotient = abs(value1) // abs(value2)
+    return quotient if (value1 < 0) == (value2 < 0) else -quotient
+
+
+# opcode -> (kind, function), the comparisons give a bool which is 1 / 0 for the rest of the program
+DISPATCH = {
+    IASN: (COPY, None),
+    RASN: (COPY, None),
+    IADD: (BINARY, operator.add),
+    ISUB: (BINARY, operator.sub),
+    IMLT: (BINARY, operator.mul),
+    IDIV: (BINARY, int_divide),
+    RADD: (BINARY, operator.add),
+    RSUB: (BINARY, operator.sub),
+    RMLT: (BINARY, operator.mul),
+    RDIV: (BINARY, operator.truediv),
+    IEQL: (BINARY, operator.eq),
+    INQL: (BINARY, operator.ne),
+    ILSS: (BINARY, operator.lt),
+    IGRT: (BINARY, operator.gt),
+    REQL: (BINARY, operator.eq),
+    RNQL: (BINARY, operator.ne),
+    RLSS: (BINARY, operator.lt),
+    RGRT: (BINARY, operator.gt),
+    ITOR: (CONVERT, float),
+    RTOI: (CONVERT, int),
+    IINP: (INPUT, int),
+    RINP: (INPUT, float),
+    IPRT: (PRINT, int),
+    RPRT: (PRINT, float),
+    JUMP: (JUMP_ALWAYS, None),
+    JMPZ: (JUMP_IF_ZERO, None),
+    HALT: (STOP, None),
+}
+
+
+class RunResult:
+    def __init__(self, outputs, steps, seconds):
+        # the values the program printed (None if they were written to a stream), the number of instructions
+        # executed and the time it took
+        self.outputs = outputs
+        self.steps = steps
+        self.seconds = seconds
+
+    def throughput(self):
+        return self.steps / self.seconds if self.seconds > 0 else float('inf')
+
+    def __str__(self):
+        return f"{self.steps} instructions in {self.seconds:.3f} s ({self.throughput():,.0f} instructions/s)"
+
+
+class QuadVM:
+    # instructions is the IR of a program (CompilationSession.emitter.instructions or quad_ir.parse_program)
+    def __init__(self, instructions):
+        # variable name or (type, constant) -> its slot, and the values of the slots when the program starts
+        self.slot_of = {}
+        self.initial_slots = []
+        self.code = self.decode(instructions)
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(parse_program(text))
+
+    # A program of the binary format (quad_binary.BinaryProgram): its slots and jump offsets are already the ones of
+    # the VM, every instruction is only looked up in the dispatch table
+    @classmethod
+    def from_binary(cls, program):
+        from quad_binary import NONE
+        vm = cls.__new__(cls)
+        vm.slot_of = {operand if isinstance(operand, str) else (type(operand), operand): slot
+                      for slot, operand in enumerate(program.pool)}
+        vm.initial_slots = program.initial_slots()
+        operands = program.operands
+        code = []
+        for index, opcode in enumerate(program.opcodes):
+            kind, function = DISPATCH[opcode]
+            dest, src1, src2 = operands[3 * index:3 * index + 3]
+            if kind in (JUMP_ALWAYS, JUMP_IF_ZERO):
+                src2 = NONE
+            code.append((kind, function, None if dest == NONE else dest, None if src1 == NONE else src1,
+                         None if src2 == NONE else src2))
+        vm.code = code
+        return vm
+
+    # Every variable starts as 0 and every constant has a slot that holds its value
+    def slot(self, operand):
+        if operand is None:
+            return None
+        key = operand if isinstance(operand, str) else (type(operand), operand)
+        if key not in self.slot_of:
+            self.slot_of[key] = len(self.initial_slots)
+            self.initial_slots.append(0 if isinstance(operand, str) else operand)
+        return self.slot_of[key]
+
+    def decode(self, instructions):
+        index_of_label = {}
+        index = 0
+        for instruction in instructions:
+            if instruction.opcode == LABEL:
+                index_of_label[instruction.label] = index
+            else:
+                index += 1
+        code = []
+        for instruction in instructions:
+            opcode = instruction.opcode
+            if opcode == LABEL:
+                continue
+            kind, function = DISPATCH[opcode]
+            if kind in (JUMP_ALWAYS, JUMP_IF_ZERO):
+                if instruction.label not in index_of_label:
+                    raise ValueError(f"jump to an unknown label {instruction.label}")
+                dest = index_of_label[instruction.label]
+            else:
+                dest = self.slot(instruction.dest)
+            code.append((kind, function, dest, self.slot(instruction.src1), self.slot(instruction.src2)))
+        return code
+
+    # Runs the program. inputs is any iterable of numbers or of strings of numbers (see read_inputs for a stream),
+    # the outputs are collected in the result or written one per line to output if it's given.
+    # max_steps stops a program that doesn't end with a QuadRuntimeError (checked at the jumps)
+    def run(self, inputs=(), output=None, max_steps=None):
+        code = self.code
+        slots = list(self.initial_slots)
+        inputs = iter(inputs)
+        outputs = None
+        if output is None:
+            outputs = []
+            emit = outputs.append
+        else:
+            def emit(value):
+                output.write(f"{value}\n")
+        limit = max_steps if max_steps is not None else float('inf')
+        end = len(code)
+        pc = 0
+        steps = 0
+        start = time.perf_counter()
+        try:
+            while pc < end:
+                kind, function, dest, src1, src2 = code[pc]
+                pc += 1
+                steps += 1
+                if kind == BINARY:
+                    slots[dest] = function(slots[src1], slots[src2])
+                elif kind == JUMP_IF_ZERO:
+                    if not slots[src1]:
+                        pc = dest
+                        if steps >= limit:
+                            raise QuadRuntimeError(f"stopped after {steps} instructions (max_steps)")
+                elif kind == COPY:
+                    slots[dest] = slots[src1]
+                elif kind == JUMP_ALWAYS:
+                    pc = dest
+                    if steps >= limit:
+                        raise QuadRuntimeError(f"stopped after {steps} instructions (max_steps)")
+                elif kind == CONVERT:
+                    slots[dest] = function(slots[src1])
+                elif kind == PRINT:
+                    emit(function(slots[src1]))
+                elif kind == INPUT:
+                    slots[dest] = read_number(function, next(inputs, None), pc)
+                else:
+                    break
+        except ZeroDivisionError:
+            raise QuadRuntimeError(f"instruction {pc}: division by zero") from None
+        except (OverflowError, ValueError) as error:
+            # an int too large for a float (ITOR, real arithmetic on it), or RTOI of inf / nan
+            raise QuadRuntimeError(f"instruction {pc}: {error}") from None
+        seconds = time.perf_counter() - start
+        return RunResult(outputs, steps, seconds)
+
+
+def read_number(convert, value, pc):
+    if value is None:
+        raise QuadRuntimeError(f"instruction {pc}: no more input")
+    try:
+        return convert(value)
+    except ValueError:
+        pass
+    try:
+        # IINP of "2.5" reads 2 like RTOI would
+        return convert(float(value))
+    except ValueError:
+        raise QuadRuntimeError(f"instruction {pc}: input {value!r} isn't a number") from None
+
+
+# The numbers of a text stream separated by white space, read line by line as the program asks for them
+def read_inputs(stream):
+    for line in stream:
+        yield from line.split()
+
+
+# Runs the text of a .qud file, returns a RunResult
+def run_program(text, inputs=(), output=None, max_steps=None):
+    return QuadVM.from_text(text).run(inputs, output, max_steps)
+
+
+def main(argv):
+    stats = False
+    python = False
+    max_steps = None
+    paths = []
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--stats':
+            stats = True
+        elif argv[i] == '--python':
+            python = True
+        elif argv[i] == '--max-steps' and i + 1 < len(argv) and argv[i + 1].isdigit():
+            max_steps = int(argv[i + 1])
+            i += 1
+        else:
+            paths.append(argv[i])
+        i += 1
+    if len(paths) not in (1, 2):
+        print("Usage: quad_vm.py [--stats] [--max-steps N] [--python] <file.qud | file.qbc> [inputs file]")
+        return 1
+    if paths[0].endswith('.qbc'):
+        from quad_binary import open_binary
+        with open_binary(paths[0]) as program:
+            if python:
+                from quad_python import compile_program
+                vm = compile_program(program.instructions())
+            else:
+                vm = QuadVM.from_binary(program)
+    else:
+        with open(paths[0]) as file:
+            if python:
+                from quad_python import CompiledProgram
+                vm = CompiledProgram.from_text(file.read())
+            else:
+                vm = QuadVM.from_text(file.read())
+    input_stream = open(paths[1]) if len(paths) == 2 else sys.stdin
+    try:
+        result = vm.run(read_inputs(input_stream), sys.stdout, max_steps)
+    except QuadRuntimeError as error:
+        sys.stderr.write(f"Runtime error: {error}\n")
+        return 1
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+    if stats:
+        sys.stderr.write(f"{result}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    # run main of the imported module, so QuadRuntimeError is the same class as the one quad_python.py raises
+    from quad_vm import main
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+# This file implements the semantic analysis of a program, a single pass that runs after parsing and before constant
+# folding and code gen:
+# - the declarations fill the symbol table of the session (identifier -> "int" / "float"), an identifier that is
+#   declared twice is an error.
+# - every identifier the statements use (assigned, read by input or used in an expression) must be declared.
+# - every expression node gets its type (exp_type) and every assignment and input gets the type of its identifier
+#   (id_type), computed once here with the int / float promotion of get_expression_type.
+# All the errors of the program are reported in the one walk, code gen only runs on a program without errors, so it
+# only emits instructions from the annotations and never looks an identifier up.
+# Constant folding keeps the types: a folded operation becomes a number of the type of the operation.
+from ast_nodes import *
+from header import get_expression_type, left_chain, run_iteratively
+
+
+class SemanticError(Exception):
+    pass
+
+
+# Fills session.symbol_table, annotates the tree and reports the errors with session.report_error.
+# returns the number of errors
+def analyze(program, session):
+    errors = len(session.errors)
+    if program.declarations is not None:
+        program.declarations.build_symbol_table(session)
+    if program.stmt_block is not None:
+        run_iteratively(SemanticAnalyzer(session).analyze(program.stmt_block))
+    return len(session.errors) - errors
+
+
+class SemanticAnalyzer:
+    def __init__(self, session):
+        self.session = session
+        self.symbol_table = session.symbol_table
+
+    # Every analyze method annotates its node, the ones that have children are generators run by run_iteratively
+    # like code_gen
+    def analyze(self, node):
+        return getattr(self, 'analyze_' + type(node).__name__)(node)
+
+    # The type of a declared identifier, an undeclared one is reported and has no type
+    def identifier_type(self, identifier):
+        id_type = self.symbol_table.get(identifier)
+        if id_type is None:
+            self.session.report_error(f"Semantic Error, Identifier {identifier} wasn't defined.")
+        return id_type
+
+    # Statements
+
+    def analyze_StmtListNode(self, node):
+        for stmt in node.stmts:
+            yield self.analyze(stmt)
+
+    def analyze_AssignmentStmtNode(self, node):
+        node.id_type = self.identifier_type(node.identifier)
+        yield self.analyze(node.expression)
+
+    def analyze_InputStmtNode(self, node):
+        node.id_type = self.identifier_type(node.identifier)
+
+    def analyze_OutputStmtNode(self, node):
+        yield self.analyze(node.expression)
+
+    def analyze_IfStmtNode(self, node):
+        yield self.analyze(node.boolexpr)
+        yield self.analyze(node.true_stmt)
+        yield self.analyze(node.false_stmt)
+
+    def analyze_WhileStmtNode(self, node):
+        yield self.analyze(node.boolexpr)
+        yield self.analyze(node.stmt)
+
+    # Boolean expressions, a chain of || or && is walked with a loop like code_gen does
+
+    def analyze_OrExprNode(self, node):
+        chain = left_chain(node, OrExprNode, 'boolterm1')
+        yield self.analyze(chain[-1].boolterm1)
+        for link in reversed(chain):
+            if link.boolterm2 is not None:
+                yield self.analyze(link.boolterm2)
+
+    def analyze_AndExprNode(self, node):
+        chain = left_chain(node, AndExprNode, 'boolfactor1')
+        yield self.analyze(chain[-1].boolfactor1)
+        for link in reversed(chain):
+            if link.boolfactor2 is not None:
+                yield self.analyze(link.boolfactor2)
+
+    def analyze_NotExprNode(self, node):
+        yield self.analyze(node.boolexpr)
+
+    def analyze_RelExprNode(self, node):
+        yield self.analyze(node.expression1)
+        yield self.analyze(node.expression2)
+        node.exp_type = get_expression_type(node.expression1.exp_type, node.expression2.exp_type)
+
+    def analyze_BoolConstantNode(self, node):
+        pass
+
+    # Arithmetic expressions
+
+    def analyze_ExpressionNode(self, node):
+        chain = left_chain(node, ExpressionNode, 'left')
+        yield self.analyze(chain[-1].left)
+        for link in reversed(chain):
+            yield self.analyze(link.right)
+            link.exp_type = get_expression_type(link.left.exp_type, link.right.exp_type)
+
+    def analyze_TermNode(self, node):
+        chain = left_chain(node, TermNode, 'left')
+        yield self.analyze(chain[-1].left)
+        for link in reversed(chain):
+            yield self.analyze(link.right)
+            link.exp_type = get_expression_type(link.left.exp_type, link.right.exp_type)
+
+    def analyze_FactorNode(self, node):
+        # a number already has its type
+        if isinstance(node.attribute, str):
+            node.exp_type = self.identifier_type(node.attribute)
+
+    def analyze_CastIntExpressionNode(self, node):
+        yield self.analyze(node.expression)
+        node.exp_type = "int"
+
+    def analyze_CastFloatExpressionNode(self, node):
+        yield self.analyze(node.expression)
+        node.exp_type = "float"
@@ -0,0 +1,76 @@
+# This file implements the temp allocator. code gen creates a new temp for every intermediate result, so a big
+# program ends up with thousands of temps although only a few of them hold a value at the same time.
+# The allocator computes the liveness of the temps on the CFG (cfg.py), builds the interference graph (two temps
+# interfere if one is written while the other is still live) and colors it greedily, temps with the same color share
+# one name. The temps are renamed t1, t2, ... by color, so the program uses as few temps as the coloring found.
+from cfg import build_cfg, compute_liveness, is_temp, live_after_each
+from quad_ir import Temp
+
+
+class TempReport:
+    def __init__(self, temps, peak_live, allocated=None):
+        # number of distinct temps in the code, the most temps live at the same point,
+        # and the number of temps after allocation (None if the temps weren't allocated)
+        self.temps = temps
+        self.peak_live = peak_live
+        self.allocated = allocated
+
+    def __str__(self):
+        text = f"temps: {self.temps} distinct, at most {self.peak_live} live at once"
+        if self.allocated is not None:
+            text += f", {self.allocated} after allocation"
+        return text
+
+
+def analyze_temps(instructions):
+    blocks = build_cfg(instructions)
+    compute_liveness(blocks, is_temp)
+    temps = set()
+    peak_live = 0
+    for block in blocks:
+        for instruction, live in live_after_each(block, is_temp):
+            if is_temp(instruction.dest):
+                temps.add(instruction.dest)
+            peak_live = max(peak_live, len(live))
+    return TempReport(len(temps), peak_live)
+
+
+# Renames the temps of the instructions in place so temps that are never live at the same time share a name.
+# returns a TempReport
+def allocate_temps(instructions):
+    blocks = build_cfg(instructions)
+    compute_liveness(blocks, is_temp)
+    interference = {}
+    peak_live = 0
+    for block in blocks:
+        for instruction, live in live_after_each(block, is_temp):
+            peak_live = max(peak_live, len(live))
+            dest = instruction.dest
+            if is_temp(dest):
+                neighbors = interference.setdefault(dest, set())
+                for other in live:
+                    if other != dest:
+                        neighbors.add(other)
+                        interference.setdefault(other, set()).add(dest)
+    # Color the temps in the order they first appear, every temp takes the smallest color its neighbors don't have
+    colors = {}
+    for instruction in instructions:
+        for operand in (instruction.dest, instruction.src1, instruction.src2):
+            if is_temp(operand) and operand not in colors:
+                used = {colors[neighbor] for neighbor in interference.get(operand, ()) if neighbor in colors}
+                color = 0
+                while color in used:
+                    color += 1
+                colors[operand] = color
+    names = {}
+    for temp, color in colors.items():
+        if color not in names:
+            names[color] = Temp(f"t{color + 1}")
+    for instruction in instructions:
+        if is_temp(instruction.dest):
+            instruction.dest = names[colors[instruction.dest]]
+        if is_temp(instruction.src1):
+            instruction.src1 = names[colors[instruction.src1]]
+        if is_temp(instruction.src2):
+            instruction.src2 = names[colors[instruction.src2]]
+    return TempReport(len(colors), peak_live, len(names))
@@ -0,0 +1,37 @@
+# The programs compiled with -O have to do what the programs compiled without it do, a division by zero included
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiler import compile_source  # noqa: E402
+from quad_vm import QuadRuntimeError, run_program  # noqa: E402
+
+# The constant that decides the && / || comes after an operand that divides by the input
+DECIDED_AFTER_DIVISION = """
+c: int;
+{
+    input(c);
+    if (c / c >= 1 && 9 == 4) output(1); else output(2);
+    if (10 / c > 1 || 3 == 3) output(3); else output(4);
+    output(5);
+}
+"""
+
+
+def outcome(source, optimize, inputs):
+    try:
+        return run_program(compile_source(source, optimize), inputs).outputs
+    except QuadRuntimeError as error:
+        return str(error).split(': ', 1)[1]
+
+
+def test_deciding_constant_keeps_the_division_before_it():
+    assert outcome(DECIDED_AFTER_DIVISION, False, [0]) == "division by zero"
+    assert outcome(DECIDED_AFTER_DIVISION, True, [0]) == "division by zero"
+    assert outcome(DECIDED_AFTER_DIVISION, True, [3]) == outcome(DECIDED_AFTER_DIVISION, False, [3])
+
+
+def test_deciding_constant_first_still_folds():
+    source = "c: int;\n{\n    input(c);\n    if (9 == 4 && c / c >= 1) output(1); else output(2);\n}\n"
+    assert "IDIV" not in compile_source(source, True)
+    assert outcome(source, True, [0]) == [2]
@@ -0,0 +1,191 @@
+# This file implements a fast tokenizer for CPL that gives exactly the tokens of the PLY lexer (lexer.py).
+# The whole input is scanned with a single compiled pattern: the rules of lexer.py in the order PLY tries them (taken
+# from the PLY lexer itself, so the two can't disagree on which rule wins) and a group for an illegal character, with
+# the ignored characters before a token in the same match, so re.finditer walks the input with one match per token.
+# The tokens are kept in parallel arrays instead of a LexToken object per token: the type (an index in
+# lexer.tokens), the value, the line number and the position. Names are interned, so every use of a variable shares
+# one string. The comment rule of lexer.py, /\*(.|\n)*?\*/ , backtracks once per character of the comment; here it is
+# written as /\*[^*]*\*+(?:[^/*][^*]*\*+)*/ , which matches the same text (up to the first */) in one pass.
+# Illegal characters are collected instead of printed. FastLexer feeds the tokens to the PLY parser and prints the
+# illegal characters at the same points the PLY lexer would.
+# The input is a str or an ASCII bytes-like object (cpq.py passes the mmap of the source file), a bytes input is
+# scanned with the same pattern compiled for bytes and only the text of the tokens is decoded.
+from array import array
+import re
+import sys
+
+import lexer as lexer_rules
+from lexer import lexer, reserved, t_ignore, tokens
+
+# Patterns that replace the ones of lexer.py, they have to match exactly the same text
+FAST_PATTERNS = {
+    't_COMMENT': r'/\*[^*]*\*+(?:[^/*][^*]*\*+)*/',
+}
+
+# What the tokenizer does with a match of each group, a token that always has the same text has its type code instead
+NEWLINE, COMMENT, NAME, REAL, INTEGER, ERROR = range(-6, 0)
+KINDS = {'t_newline': NEWLINE, 't_COMMENT': COMMENT, 't_ID': NAME, 't_FLOAT_NUM': REAL, 't_INT_NUM': INTEGER}
+
+TYPE_CODES = {name: code for code, name in enumerate(tokens)}
+
+
+# Builds the pattern from the rules of the PLY lexer, in the order of its master regex. The ignored characters before
+# a token are part of its match, and so are the ones after a newline, so most tokens take a single match.
+# returns the pattern and a list group number -> kind or type code
+def build_pattern():
+    ignored = '[' + re.escape(t_ignore) + ']'
+    groups = []
+    kinds = {}
+    for regex, index_functions in lexer.lexre:
+        for name, index in sorted(regex.groupindex.items(), key=lambda item: item[1]):
+            rule = getattr(lexer_rules, name)
+            pattern = FAST_PATTERNS.get(name) or (rule.__doc__ if callable(rule) else rule)
+            if name == 't_newline':
+                pattern = f'(?:{pattern})(?:{ignored}|{pattern})*'
+            groups.append((name, pattern))
+            kinds[name] = KINDS[name] if name in KINDS else TYPE_CODES[index_functions[index][1]]
+    # an illegal character, the ignored ones can't be illegal (or the spaces at the end would be)
+    groups.append(('error', f'(?!{ignored})[\\s\\S]'))
+    kinds['error'] = ERROR
+    # re.VERBOSE like PLY compiles the rules
+    pattern = re.compile(f'{ignored}*(?:' + '|'.join(f'(?P<{name}>{regex})' for name, regex in groups) + ')',
+                         re.VERBOSE)
+    actions = [None] * (pattern.groups + 1)
+    for name, index in pattern.groupindex.items():
+        actions[index] = kinds[name]
+    return pattern, actions
+
+
+PATTERN, ACTIONS = build_pattern()
+BYTES_PATTERN = re.compile(PATTERN.pattern.encode('ascii'), re.VERBOSE)
+RESERVED_CODES = {word: TYPE_CODES[token_type] for word, token_type in reserved.items()}
+TYPE_NAMES = tokens
+ID = TYPE_CODES['ID']
+INT_NUM = TYPE_CODES['INT_NUM']
+FLOAT_NUM = TYPE_CODES['FLOAT_NUM']
+
+
+class TokenArrays:
+    def __init__(self):
+        # token i is tokens[types[i]] with the value values[i], at line lines[i] and position positions[i]
+        self.types = array('B')
+        self.values = []
+        self.lines = array('l')
+        self.positions = array('q')
+        # (position, line, character) of every illegal character
+        self.errors = []
+
+    def __len__(self):
+        return len(self.types)
+
+    # Token i as (type, value, line, position), like the type, value, lineno and lexpos of a PLY LexToken
+    def token(self, index):
+        return tokens[self.types[index]], self.values[index], self.lines[index], self.positions[index]
+
+
+def tokenize(data):
+    result = TokenArrays()
+    append_type = result.types.append
+    append_value = result.values.append
+    append_line = result.lines.append
+    append_position = result.positions.append
+    actions = ACTIONS
+    reserved_codes = RESERVED_CODES
+    intern = sys.intern
+    if isinstance(data, str):
+        pattern, newline, decode = PATTERN, '\n', str
+    else:
+        pattern, newline, decode = BYTES_PATTERN, b'\n', bytes.decode
+    # the text of the tokens that always have the same text by group, shared by all of them
+    texts = [None] * len(actions)
+    # text of a name in the input -> the interned str
+    names = {}
+    line = 1
+    for match in pattern.finditer(data):
+        index = match.lastindex
+        kind = actions[index]
+        if kind >= 0:
+            text = texts[index]
+            if text is None:
+                text = texts[index] = decode(match.group(index))
+            append_type(kind)
+            append_value(text)
+        elif kind == NAME:
+            text = match.group(index)
+            name = names.get(text)
+            if name is None:
+                name = names[text] = intern(decode(text))
+            append_type(reserved_codes.get(name, ID))
+            append_value(name)
+        elif kind == NEWLINE:
+            line += match.group(index).count(newline)
+            continue
+        elif kind == INTEGER:
+            append_type(INT_NUM)
+            append_value(int(match.group(index)))
+        elif kind == REAL:
+            append_type(FLOAT_NUM)
+            append_value(float(match.group(index)))
+        elif kind == COMMENT:
+            line += match.group(index).count(newline)
+            continue
+        else:
+            result.errors.append((match.start(index), line, decode(match.group(index))))
+            continue
+        append_line(line)
+        append_position(match.start(index))
+    return result
+
+
+class Token:
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, token_type, value, lineno, lexpos):
+        self.type = token_type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+# A lexer object for the PLY parser (input / token / clone) that reads the arrays of tokenize
+class FastLexer:
+    def __init__(self):
+        self.input('')
+
+    def clone(self):
+        return FastLexer()
+
+    def input(self, data):
+        self.tokens = tokenize(data)
+        self.index = 0
+        self.lineno = 1
+        self.error_index = 0
+        self.next_error = self.error_position(0)
+
+    def error_position(self, index):
+        errors = self.tokens.errors
+        return errors[index][0] if index < len(errors) else float('inf')
+
+    # The PLY lexer prints an illegal character when it reaches it, right before it returns the next token
+    def print_errors(self, before):
+        errors = self.tokens.errors
+        while self.next_error < before:
+            print("Illegal character '%s'" % errors[self.error_index][2])
+            self.error_index += 1
+            self.next_error = self.error_position(self.error_index)
+
+    def token(self):
+        tokens = self.tokens
+        index = self.index
+        if index == len(tokens.types):
+            self.print_errors(float('inf'))
+            return None
+        position = tokens.positions[index]
+        if self.next_error < position:
+            self.print_errors(position)
+        self.index = index + 1
+        self.lineno = tokens.lines[index]
+        return Token(TYPE_NAMES[tokens.types[index]], tokens.values[index], self.lineno, position)
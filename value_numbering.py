@@ -0,0 +1,132 @@
+# This file implements local value numbering, which removes computations that are repeated inside a basic block:
+#   IMLT t1 a b              IMLT t1 a b
+#   IADD x t1 c              IADD x t1 c
+#   IMLT t2 a b       ->     ISUB y t1 c
+#   ISUB y t2 c
+# Every value computed in a block gets a number, two instructions with the same opcode on the same numbers compute
+# the same value, so the second one becomes a copy of a name that still holds the value and the reads of its temp
+# read that name instead. A name that is assigned (or read by IINP / RINP) gets a new number, and everything is
+# forgotten at the start of every block (at labels), so only values computed in the same straight line code are reused.
+from cfg import split_blocks, flatten
+from dead_code import is_removable
+from peephole import INT_RESULT_OPCODES, temp_reads
+from quad_ir import *
+
+# Opcodes whose operands can be swapped , and relops that are the same test with the operands swapped
+COMMUTATIVE_OPCODES = frozenset((IADD, IMLT, IEQL, INQL, RADD, RMLT, REQL, RNQL))
+SWAPPED_OPCODES = {IGRT: ILSS, RGRT: RLSS}
+
+
+def eliminate_common_subexpressions(instructions):
+    blocks = split_blocks(instructions)
+    for block in blocks:
+        block.instructions = BlockNumbering().run(block.instructions)
+    return remove_unread_temps(flatten(blocks))
+
+
+class BlockNumbering:
+    def __init__(self):
+        # name -> number of the value it holds, value key -> number, number -> names that hold it (oldest first)
+        self.numbers = {}
+        self.values = {}
+        self.holders = {}
+        # number -> "int" / "float" for the values whose type is known from the instruction that computed them
+        self.types = {}
+        # number -> the number written in the code, for the values that are constants
+        self.constants = {}
+
+    def number_of(self, operand):
+        if isinstance(operand, str):
+            if operand not in self.numbers:
+                self.assign(operand, self.new_number())
+            return self.numbers[operand]
+        # numbers are values too, 5 and 5.0 are different values
+        number = self.lookup(('const', type(operand), operand), "float" if isinstance(operand, float) else "int")
+        self.constants[number] = operand
+        return number
+
+    def new_number(self, exp_type=None):
+        number = len(self.types)
+        self.types[number] = exp_type
+        self.holders[number] = []
+        return number
+
+    def lookup(self, key, exp_type):
+        if key not in self.values:
+            self.values[key] = self.new_number(exp_type)
+        return self.values[key]
+
+    # The name now holds the value with this number and no longer holds its old value
+    def assign(self, name, number):
+        old_number = self.numbers.get(name)
+        if old_number is not None:
+            self.holders[old_number].remove(name)
+        self.numbers[name] = number
+        self.holders[number].append(name)
+
+    # A temp that holds a constant is replaced by the constant, any other temp is read from the oldest name that holds
+    # the same value, so the copies into temps can be removed
+    def replace_operand(self, operand):
+        if type(operand) is Temp:
+            number = self.number_of(operand)
+            if number in self.constants:
+                return self.constants[number]
+            return self.holders[number][0]
+        return operand
+
+    # Returns the instructions of the block with the repeated computations replaced
+    def run(self, instructions):
+        result = []
+        for instruction in instructions:
+            opcode = instruction.opcode
+            instruction.src1 = self.replace_operand(instruction.src1)
+            instruction.src2 = self.replace_operand(instruction.src2)
+            if opcode in (IINP, RINP):
+                self.assign(instruction.dest, self.new_number())
+            elif opcode in PURE_OPCODES:
+                instruction = self.number_instruction(instruction)
+                if instruction is None:
+                    continue
+            result.append(instruction)
+        return result
+
+    # Numbers the value an instruction computes, returns the instruction, a copy that replaces it or None if the dest
+    # already holds the value
+    def number_instruction(self, instruction):
+        opcode = instruction.opcode
+        exp_type = "int" if opcode in INT_RESULT_OPCODES else "float"
+        number1 = self.number_of(instruction.src1)
+        if opcode in (IASN, RASN) and self.types[number1] == exp_type:
+            # a copy holds the same value, unless it converts an int to a float or a value whose type isn't known
+            self.assign(instruction.dest, number1)
+            return instruction
+        number2 = self.number_of(instruction.src2) if instruction.src2 is not None else None
+        if opcode in SWAPPED_OPCODES:
+            opcode, number1, number2 = SWAPPED_OPCODES[opcode], number2, number1
+        elif opcode in COMMUTATIVE_OPCODES and number2 < number1:
+            number1, number2 = number2, number1
+        key = (opcode, number1, number2)
+        if key in self.values and self.holders[self.values[key]]:
+            number = self.values[key]
+            if instruction.dest in self.holders[number]:
+                return None
+            source = self.holders[number][0]
+            self.assign(instruction.dest, number)
+            return Instruction(IASN if exp_type == "int" else RASN, instruction.dest, source)
+        number = self.new_number(exp_type)
+        self.values[key] = number
+        self.assign(instruction.dest, number)
+        return instruction
+
+
+# Removes the instructions that compute a temp that is never read, until there are none left. a division that can
+# fail is kept (dead_code.is_removable)
+def remove_unread_temps(instructions):
+    while True:
+        reads = temp_reads(instructions)
+        result = [instruction for instruction in instructions
+                  if not (type(instruction.dest) is Temp and reads[instruction.dest] == 0
+                          and is_removable(instruction))]
+        if len(result) == len(instructions):
+            return result
+        instructions = result